@@ -1,7 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db.models import Count, Avg
-from admin_thumbnails import thumbnail
+from django.db.models import Count, Avg, Q
 from .models import QuestionCategory, Question, AnswerOption, UserProfile, TestSession, TestAnswer
 
 
@@ -12,9 +11,14 @@ class QuestionCategoryAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
     
     def question_count(self, obj):
-        count = obj.questions.filter(is_active=True).count()
-        return format_html('<span style="font-weight: bold;">{}</span>', count)
+        return format_html('<span style="font-weight: bold;">{}</span>', obj.active_question_count)
     question_count.short_description = 'Active Questions'
+    question_count.admin_order_field = 'active_question_count'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            active_question_count=Count('questions', filter=Q(questions__is_active=True))
+        )
 
 class AnswerOptionInline(admin.TabularInline):
     model = AnswerOption
@@ -24,7 +28,6 @@ class AnswerOptionInline(admin.TabularInline):
     fields = ['option_text', 'is_correct', 'order']
     ordering = ['order']
 
-@thumbnail('image')
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     list_display = [
@@ -39,13 +42,13 @@ class QuestionAdmin(admin.ModelAdmin):
     ]
     list_filter = ['category', 'difficulty', 'is_active', 'created_at']
     search_fields = ['question_text', 'explanation']
-    readonly_fields = ('created_at', 'updated_at', 'image_thumbnail')
+    readonly_fields = ('created_at', 'updated_at', 'image_preview')
     fields = [
         'question_text',
         'category',
         'difficulty',
         'image',
-        'image_thumbnail',
+        'image_preview',
         'explanation',
         'is_active',
         'created_by',
@@ -81,14 +84,25 @@ class QuestionAdmin(admin.ModelAdmin):
     answer_count.short_description = 'Answers'
     
     
+    def _variant_img(self, obj, size):
+        # Only the stored variant map is read; the image files are never opened here
+        if not obj.image:
+            return "No image"
+        variant = (obj.image_variants or {}).get(size)
+        if not variant:
+            return "Processing..."
+        return format_html(
+            '<img src="{}" width="{}" height="{}" loading="lazy" />',
+            obj.image.storage.url(variant['default']), variant['width'], variant['height']
+        )
+
     def image_thumbnail(self, obj):
-        if obj.image:
-            return format_html(
-                '<img src="{}" style="max-width: 200px; max-height: 200px;" />',
-                obj.image.url
-            )
-        return "No image"
-    image_thumbnail.short_description = 'Current Image'
+        return self._variant_img(obj, 'thumb')
+    image_thumbnail.short_description = 'Thumbnail'
+
+    def image_preview(self, obj):
+        return self._variant_img(obj, 'small')
+    image_preview.short_description = 'Current Image'
     
     def save_model(self, request, obj, form, change):
         if not change:
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DrivingTestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'driving_test'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,97 @@
+"""
+API authentication.
+
+CachedTokenAuthentication: DRF's TokenAuthentication joins Token and User
+on every request. Here the result is kept per token key in a bounded LRU
+with a TTL, so repeat calls from the same client authenticate without
+touching the database. Deleting a token (logout) or saving a user
+(deactivation, password or permission changes) revokes the affected keys:
+they are dropped from this process's LRU, and a revocation time is written
+to the shared cache. Before trusting an LRU hit, every worker checks that
+marker, so a revoked token is refused everywhere on the next request
+rather than when the other workers' entries expire.
+
+SignedTokenAuthentication: verifies the short-lived signed access tokens
+issued by tokens.py in memory.
+"""
+import copy
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+from .cache import TTLCache
+from .tokens import InvalidToken, verify_access_token
+
+token_cache = TTLCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 300),
+)
+
+
+def revoked_key(key):
+    return f'driving_test:token_revoked:{key}'
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            revoked_at = cache.get(revoked_key(key))
+            if revoked_at is not None and revoked_at >= cached[2]:
+                # Revoked, possibly by another worker, after this entry was cached
+                token_cache.pop(key)
+                cached = None
+        if cached is None:
+            # Taken before the read, so a revocation racing with it still wins
+            cached_at = time.time()
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token, cached_at))
+        else:
+            user, token, _ = cached
+            if not user.is_active:
+                raise AuthenticationFailed('User inactive or deleted.')
+        # Each request gets its own copy so views cannot leak changes into the cache
+        return copy.copy(user), token
+
+
+def revoke_keys(keys):
+    """Drop token keys from this process and mark them revoked for every other worker"""
+    now = time.time()
+    for key in keys:
+        token_cache.pop(key)
+    # Entries cached before now expire within TOKEN_CACHE_TTL, so the markers need not outlive them
+    cache.set_many({revoked_key(key): now for key in keys}, token_cache.ttl)
+
+
+def invalidate_token(key):
+    revoke_keys([key])
+
+
+def invalidate_user(user_id):
+    from rest_framework.authtoken.models import Token
+
+    revoke_keys(list(Token.objects.filter(user_id=user_id).values_list('key', flat=True)))
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticates ``Authorization: Bearer <access token>`` from tokens.py without a query"""
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid bearer header.')
+
+        try:
+            user = verify_access_token(auth[1].decode())
+        except (InvalidToken, UnicodeError) as e:
+            raise AuthenticationFailed(str(e))
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return user, None
+
+    def authenticate_header(self, request):
+        return self.keyword
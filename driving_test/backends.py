@@ -0,0 +1,46 @@
+"""
+Email login backend.
+
+Matches ``LOWER(email)`` on users whose email is not blank, repeating the
+WHERE clause of the partial unique index created in migration 0009 so
+the lookup is served by that index instead of scanning auth_user, and
+checks the password on the row it fetched, so a login is one query.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models import F, Lookup
+from django.db.models.functions import Lower
+
+
+class NotEqual(Lookup):
+    """``lhs <> rhs``; exclude() writes ``NOT (lhs = rhs)``, which SQLite does not match to a partial index"""
+    lookup_name = 'ne'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} <> {rhs}', (*lhs_params, *rhs_params)
+
+
+def users_having_email():
+    """Users with a non-blank email, filtered so LOWER(email) lookups can use the unique index"""
+    return User._default_manager.alias(email_lower=Lower('email')).filter(NotEqual(F('email'), ''))
+
+
+def users_with_email(email):
+    """Case-insensitive email match written to hit the LOWER(email) index"""
+    return users_having_email().filter(email_lower=email.strip().lower())
+
+
+class EmailBackend(ModelBackend):
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        user = users_with_email(email).first()
+        if user is None:
+            # Run the hasher anyway so response time does not reveal which emails exist
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,100 @@
+"""
+Global question bank version.
+
+Every change to a Question, AnswerOption or QuestionCategory bumps a single
+counter. Read endpoints derive their ETags from it, so a client holding a
+current ETag gets a 304 before any question table is queried. The counter
+is also a millisecond timestamp (it never goes backwards), which lets
+delta sync compare it directly against ``updated_at`` columns.
+
+The CatalogVersion row is the only shared copy. Each worker keeps the
+value in memory for CATALOG_VERSION_TTL seconds, so a bump made in one
+process reaches the ETags and memoized listings of every other process
+within that time.
+"""
+import hashlib
+import threading
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .cache import TTLCache
+from .images import accepts_webp
+from .models import CatalogVersion, QuestionCategory
+from .serializers import QuestionCategorySerializer
+
+_version_cache = TTLCache(maxsize=1, ttl=getattr(settings, 'CATALOG_VERSION_TTL', 2))
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _now_ms():
+    return int(timezone.now().timestamp() * 1000)
+
+
+def get_version():
+    """Current catalog version, at most CATALOG_VERSION_TTL seconds old"""
+    version = _version_cache.get('version')
+    if version is None:
+        row, created = CatalogVersion.objects.get_or_create(pk=1, defaults={'version': _now_ms()})
+        version = row.version
+        _version_cache.set('version', version)
+    return version
+
+
+def bump_version():
+    """Advance the catalog version after a change to the question bank"""
+    updated = CatalogVersion.objects.filter(pk=1).update(
+        version=Greatest(F('version') + 1, _now_ms()),
+        updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=1, defaults={'version': _now_ms()})
+    version = CatalogVersion.objects.values_list('version', flat=True).get(pk=1)
+    _version_cache.set('version', version)
+    return version
+
+
+def request_digest(request):
+    """Short digest of the URL a response is served for, so ETags differ between query strings"""
+    variant = f"{request.get_host()}{request.get_full_path()}"
+    return hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()[:16]
+
+
+def catalog_etag(request, *args, **kwargs):
+    """ETag for a catalog read: the version plus a digest of the URL it was served for"""
+    return f'"{get_version()}-{request_digest(request)}"'
+
+
+def catalog_image_etag(request, *args, **kwargs):
+    """
+    ETag for a catalog read that carries image URLs: those point at WebP
+    variants when the Accept header allows it, so the format is part of the
+    tag (views using it also send Vary: Accept)
+    """
+    image_format = 'webp' if accepts_webp(request) else 'default'
+    return f'"{get_version()}-{image_format}-{request_digest(request)}"'
+
+
+def memoize(name, build):
+    """Return build() from process memory until the catalog version changes"""
+    version = get_version()
+    cached = _memo.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    data = build()
+    with _memo_lock:
+        _memo[name] = (version, data)
+    return data
+
+
+def category_list():
+    """Every category with its active question count, memoized per catalog version"""
+    def build():
+        categories = QuestionCategory.objects.annotate(
+            active_question_count=Count('questions', filter=Q(questions__is_active=True))
+        ).order_by('name')
+        return list(QuestionCategorySerializer(categories, many=True).data)
+
+    return memoize('categories', build)
@@ -0,0 +1,27 @@
+"""
+System checks for deployment settings this app relies on.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Token revocation markers must reach every worker through the default cache"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            'The default cache is not shared between worker processes.',
+            hint='Revoked API tokens are then only refused by the worker that revoked them until '
+                 'TOKEN_CACHE_TTL runs out. Point CACHES at Redis or Memcached when running more '
+                 'than one worker process.',
+            id='driving_test.W001',
+        )
+    ]
@@ -0,0 +1,84 @@
+"""
+Everything the app shows when it opens, in one request.
+
+The dashboard has four sections: the user's profile, their stats, the
+first page of their test history and the question categories. Each
+section goes stale on its own:
+
+* stats and history are cached under keys built from the profile's
+  totals, so completing or deleting one of the user's tests moves them
+  to new keys,
+* profile is not cached: it is serialized from the profile row that the
+  per-user keys come from anyway, and the request's user,
+* categories are memoized per catalog version (catalog.category_list).
+
+The cached per-user sections are read in one round trip after the
+profile row. Missing ones are rebuilt from a DashboardData, which loads
+the profile row and the history page at most once and shares them:
+stats reuse the history page's newest tests. A cold dashboard therefore
+costs the same few queries however many tests or categories there are.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from .catalog import category_list
+from .history import first_page_cache_key, history_page
+from .profiles import RECENT_TESTS, get_profile, stats_cache_key, stats_data
+from .serializers import TestSessionSummarySerializer, UserProfileSerializer
+
+SECTIONS = ('profile', 'stats', 'history', 'categories')
+
+
+class DashboardData:
+    """Rows shared by the sections built for one user, each loaded on first use"""
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def profile(self):
+        return get_profile(self.user)
+
+    @cached_property
+    def history(self):
+        return history_page(self.user)
+
+    def build_profile(self):
+        return dict(UserProfileSerializer(self.profile).data)
+
+    def build_stats(self):
+        sessions, _ = self.history
+        return stats_data(self.profile, sessions[:RECENT_TESTS])
+
+    def build_history(self):
+        sessions, next_cursor = self.history
+        return {
+            'results': [dict(row) for row in TestSessionSummarySerializer(sessions, many=True).data],
+            'next_cursor': next_cursor,
+        }
+
+
+def build(user, sections=SECTIONS):
+    """The requested sections of a user's dashboard, each from its cache when possible"""
+    data = DashboardData(user)
+    key_funcs = {
+        'stats': lambda: stats_cache_key(data.profile),
+        'history': lambda: first_page_cache_key(data.profile),
+    }
+    keys = {section: key_funcs[section]() for section in sections if section in key_funcs}
+    cached = cache.get_many(list(keys.values()))
+
+    dashboard = {}
+    rebuilt = {}
+    for section in sections:
+        if section == 'categories':
+            dashboard[section] = category_list()
+        elif section == 'profile':
+            dashboard[section] = data.build_profile()
+        elif keys[section] in cached:
+            dashboard[section] = cached[keys[section]]
+        else:
+            dashboard[section] = rebuilt[keys[section]] = getattr(data, f'build_{section}')()
+    if rebuilt:
+        cache.set_many(rebuilt, getattr(settings, 'USER_STATS_CACHE_TTL', 300))
+    return dashboard
@@ -0,0 +1,171 @@
+"""
+Bulk candidate enrolment.
+
+Rows are validated as a batch first, with a handful of queries for the
+whole file rather than per row. Passwords for the valid rows are then
+hashed in a process pool, because hashing is CPU-bound and threads would
+serialize on the GIL. Finally User, UserProfile and Token rows are
+inserted with bulk_create in one transaction. Per-row post_save signals do
+not run, so the profile and token rows and the daily rollup are
+handled here explicitly.
+"""
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.validators import validate_email
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+from rest_framework.authtoken.models import Token
+from .backends import users_having_email
+from .models import UserProfile
+from .rollups import record_users_joined
+
+FIELDS = ('username', 'email', 'password', 'first_name', 'last_name')
+MAX_ROWS = 20000
+BULK_BATCH_SIZE = 1000
+
+
+def parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    return [{key.strip().lower(): (value or '').strip() for key, value in row.items() if key} for row in reader]
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without Django configured
+    if not apps.ready:
+        django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password for every password, spread over a process pool"""
+    workers = workers or getattr(settings, 'ENROLMENT_HASH_WORKERS', None) or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def _field_error(field, value):
+    """First message from the User model field's own validators, as registration enforces them"""
+    try:
+        User._meta.get_field(field).run_validators(value)
+    except ValidationError as e:
+        return e.messages[0]
+    return None
+
+
+def validate_rows(rows):
+    """Split rows into (valid, errors); errors carry the 1-based row number"""
+    valid, errors = [], []
+    seen_usernames, seen_emails = set(), set()
+    candidates = []
+    for number, row in enumerate(rows, start=1):
+        row = {field: str(row.get(field) or '').strip() for field in FIELDS}
+        row_errors = {}
+        username_error = _field_error('username', row['username'])
+        if not 3 <= len(row['username']) <= 150:
+            row_errors['username'] = 'Username must be 3 to 150 characters'
+        elif username_error:
+            row_errors['username'] = username_error
+        elif row['username'] in seen_usernames:
+            row_errors['username'] = 'Duplicate username in this file'
+        try:
+            validate_email(row['email'])
+            email_error = _field_error('email', row['email'])
+            if email_error:
+                row_errors['email'] = email_error
+            elif row['email'].lower() in seen_emails:
+                row_errors['email'] = 'Duplicate email in this file'
+        except ValidationError:
+            row_errors['email'] = 'Enter a valid email address'
+        if len(row['password']) < 8:
+            row_errors['password'] = 'Password must be at least 8 characters'
+        for field in ('first_name', 'last_name'):
+            name_error = _field_error(field, row[field])
+            if name_error:
+                row_errors[field] = name_error
+
+        seen_usernames.add(row['username'])
+        seen_emails.add(row['email'].lower())
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+        else:
+            candidates.append((number, row))
+
+    # Two queries for the whole batch instead of two per row
+    taken_usernames = set(User.objects.filter(
+        username__in=[row['username'] for _, row in candidates]
+    ).values_list('username', flat=True))
+    taken_emails = set(users_having_email().filter(
+        email_lower__in=[row['email'].lower() for _, row in candidates]
+    ).values_list(Lower('email'), flat=True))
+
+    for number, row in candidates:
+        row_errors = {}
+        if row['username'] in taken_usernames:
+            row_errors['username'] = 'A user with that username already exists'
+        if row['email'].lower() in taken_emails:
+            row_errors['email'] = 'A user with this email already exists'
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+        else:
+            valid.append((number, row))
+
+    errors.sort(key=lambda error: error['row'])
+    return valid, errors
+
+
+def enrol(rows, dry_run=False, workers=None):
+    """Create accounts for every valid row and report the rest"""
+    if len(rows) > MAX_ROWS:
+        raise ValueError(f'At most {MAX_ROWS} candidates per upload')
+
+    valid, errors = validate_rows(rows)
+    result = {'created': 0, 'errors': errors, 'users': []}
+    if dry_run or not valid:
+        result['valid'] = len(valid)
+        return result
+
+    hashes = hash_passwords([row['password'] for _, row in valid], workers=workers)
+    users = [
+        User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            password=encoded,
+        )
+        for (_, row), encoded in zip(valid, hashes)
+    ]
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(users, batch_size=BULK_BATCH_SIZE)
+        if users and users[0].pk is None:
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(User.objects.filter(
+                username__in=[user.username for user in users]
+            ).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user) for user in users], batch_size=BULK_BATCH_SIZE
+        )
+        Token.objects.bulk_create(
+            [Token(user=user, key=Token.generate_key()) for user in users], batch_size=BULK_BATCH_SIZE
+        )
+        record_users_joined(users)
+
+    result['created'] = len(users)
+    result['users'] = [
+        {'row': number, 'user_id': user.pk, 'username': user.username}
+        for (number, _), user in zip(valid, users)
+    ]
+    return result
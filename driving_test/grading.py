@@ -0,0 +1,208 @@
+"""
+Grading of submitted tests with a fixed number of queries.
+
+The questions and options of a submission are loaded together, the
+answers are bulk-created, and the per-question and per-option counters
+are bumped with a few F() updates in the same transaction. The cost of
+grading does not depend on the number of questions in the test.
+The same updates keep the success rate used by rankings.py current.
+The user's per-category counts (UserCategoryStats) are updated in the same
+batch, with a single UPDATE for all categories of the test.
+The rebuild_* functions recompute these counters from TestAnswer in chunks.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Q, Value, When
+from django.utils import timezone
+from .models import (
+    AnswerOption, AnswerOptionAnalytics, Question, QuestionAnalytics, TestAnswer, TestSession, UserCategoryStats
+)
+from .rankings import ranked_rate, ranked_rate_after_attempt
+
+
+def correct_option(question):
+    """The correct option from prefetched options, without another query"""
+    return next((option for option in question.options.all() if option.is_correct), None)
+
+
+def grade(test_session, answers):
+    """
+    Create the session's TestAnswer rows and update the answer counters.
+    Answers to unknown questions, or with an option that does not belong to
+    the question, are skipped, as are repeated answers to the same question.
+    """
+    questions = Question.objects.filter(
+        id__in=[answer.get('question_id') for answer in answers]
+    ).select_related('category').prefetch_related('options').in_bulk()
+
+    graded = []
+    seen = set()
+    for answer in answers:
+        question = questions.get(answer.get('question_id'))
+        if question is None or question.id in seen:
+            continue
+        selected_option = None
+        if answer.get('selected_option_id'):
+            options = {option.id: option for option in question.options.all()}
+            selected_option = options.get(answer['selected_option_id'])
+            if selected_option is None:
+                continue
+        is_correct = bool(selected_option and selected_option.is_correct)
+        seen.add(question.id)
+        graded.append(TestAnswer(
+            test_session=test_session,
+            question=question,
+            selected_option=selected_option,
+            is_correct=is_correct,
+            points_earned=1 if is_correct else 0
+        ))
+
+    with transaction.atomic():
+        TestAnswer.objects.bulk_create(graded)
+        record_answers(graded)
+        record_category_stats(test_session.user_id, graded)
+    return graded
+
+
+def record_answers(answers):
+    """Count new answers in QuestionAnalytics and AnswerOptionAnalytics"""
+    if not answers:
+        return
+    QuestionAnalytics.objects.bulk_create(
+        [QuestionAnalytics(question_id=answer.question_id, category_id=answer.question.category_id)
+         for answer in sorted(answers, key=lambda answer: answer.question_id)],
+        ignore_conflicts=True
+    )
+    correct = [answer.question_id for answer in answers if answer.is_correct]
+    wrong = [answer.question_id for answer in answers if not answer.is_correct]
+    if correct:
+        QuestionAnalytics.objects.filter(question_id__in=correct).update(
+            total_attempts=F('total_attempts') + 1,
+            correct_attempts=F('correct_attempts') + 1,
+            ranked_success_rate=ranked_rate_after_attempt(correct=True)
+        )
+    if wrong:
+        QuestionAnalytics.objects.filter(question_id__in=wrong).update(
+            total_attempts=F('total_attempts') + 1,
+            ranked_success_rate=ranked_rate_after_attempt(correct=False)
+        )
+
+    selected = sorted(answer.selected_option_id for answer in answers if answer.selected_option_id)
+    if selected:
+        AnswerOptionAnalytics.objects.bulk_create(
+            [AnswerOptionAnalytics(option_id=option_id) for option_id in selected],
+            ignore_conflicts=True
+        )
+        AnswerOptionAnalytics.objects.filter(option_id__in=selected).update(
+            times_selected=F('times_selected') + 1
+        )
+
+
+def _per_category(counts, field):
+    return Case(
+        *[When(category_id=category_id, then=Value(row[field])) for category_id, row in counts.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def record_category_stats(user_id, answers):
+    """Add a test's answers to the user's UserCategoryStats rows"""
+    counts = {}
+    for answer in answers:
+        row = counts.setdefault(answer.question.category_id, {'attempts': 0, 'correct': 0})
+        row['attempts'] += 1
+        row['correct'] += 1 if answer.is_correct else 0
+    if not counts:
+        return
+    UserCategoryStats.objects.bulk_create(
+        [UserCategoryStats(user_id=user_id, category_id=category_id) for category_id in sorted(counts)],
+        ignore_conflicts=True
+    )
+    UserCategoryStats.objects.filter(user_id=user_id, category_id__in=list(counts)).update(
+        attempts=F('attempts') + _per_category(counts, 'attempts'),
+        correct=F('correct') + _per_category(counts, 'correct'),
+        last_seen=timezone.now()
+    )
+
+
+def _rebuild_chunk(question_ids):
+    answers = TestAnswer.objects.filter(question_id__in=question_ids)
+    totals = {
+        row['question_id']: row
+        for row in answers.values('question_id').annotate(
+            total=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True))
+        )
+    }
+    selections = dict(
+        answers.filter(selected_option__isnull=False)
+        .values_list('selected_option_id').annotate(n=Count('id')).values_list('selected_option_id', 'n')
+    )
+
+    categories = dict(Question.objects.filter(id__in=question_ids).values_list('id', 'category_id'))
+    QuestionAnalytics.objects.bulk_create(
+        [QuestionAnalytics(question_id=question_id) for question_id in question_ids],
+        ignore_conflicts=True
+    )
+    analytics = list(QuestionAnalytics.objects.filter(question_id__in=question_ids))
+    for item in analytics:
+        row = totals.get(item.question_id, {})
+        item.total_attempts = row.get('total', 0)
+        item.correct_attempts = row.get('correct', 0)
+        item.ranked_success_rate = ranked_rate(item.total_attempts, item.correct_attempts)
+        item.category_id = categories.get(item.question_id)
+    QuestionAnalytics.objects.bulk_update(
+        analytics,
+        ['total_attempts', 'correct_attempts', 'ranked_success_rate', 'category'],
+        batch_size=500
+    )
+
+    option_ids = list(AnswerOption.objects.filter(question_id__in=question_ids).values_list('id', flat=True))
+    AnswerOptionAnalytics.objects.bulk_create(
+        [AnswerOptionAnalytics(option_id=option_id) for option_id in option_ids],
+        ignore_conflicts=True
+    )
+    option_analytics = list(AnswerOptionAnalytics.objects.filter(option_id__in=option_ids))
+    for item in option_analytics:
+        item.times_selected = selections.get(item.option_id, 0)
+    AnswerOptionAnalytics.objects.bulk_update(option_analytics, ['times_selected'], batch_size=500)
+
+
+def rebuild_answer_counters(chunk_size=500):
+    """Recompute question and option counters from TestAnswer; returns the number of questions"""
+    question_ids = list(Question.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(question_ids), chunk_size):
+        with transaction.atomic():
+            _rebuild_chunk(question_ids[start:start + chunk_size])
+    return len(question_ids)
+
+
+def rebuild_category_stats(chunk_size=1000):
+    """Recompute UserCategoryStats from TestAnswer, a chunk of users at a time; returns the number of rows"""
+    user_ids = list(
+        TestSession.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+    )
+    rows = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        stats = TestAnswer.objects.filter(test_session__user_id__in=chunk).values(
+            'test_session__user_id', 'question__category_id'
+        ).annotate(
+            n=Count('id'),
+            n_correct=Count('id', filter=Q(is_correct=True)),
+            latest=Max('answered_at')
+        )
+        with transaction.atomic():
+            UserCategoryStats.objects.filter(user_id__in=chunk).delete()
+            created = UserCategoryStats.objects.bulk_create([
+                UserCategoryStats(
+                    user_id=row['test_session__user_id'],
+                    category_id=row['question__category_id'],
+                    attempts=row['n'],
+                    correct=row['n_correct'],
+                    last_seen=row['latest']
+                )
+                for row in stats
+            ], batch_size=1000)
+        rows += len(created)
+    return rows
@@ -0,0 +1,60 @@
+"""
+Password hashing with its own capacity budget.
+
+PBKDF2 is the most CPU-heavy thing the app does. This hasher runs it on a
+small dedicated thread pool (hashlib releases the GIL while hashing), so
+at most LOGIN_HASH_WORKERS hashes run at once per process whatever the
+number of concurrent logins, leaving CPU for exam traffic. Callers that
+cannot get a slot within LOGIN_HASH_WAIT seconds get HashingBusy, which
+the login and registration views (and HashingBusyMiddleware elsewhere)
+turn into a 503 instead of queueing without bound. Hashes keep the standard
+``pbkdf2_sha256`` format, so existing passwords keep working.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.http import HttpResponse
+
+
+class HashingBusy(Exception):
+    """No hashing slot came free within LOGIN_HASH_WAIT"""
+    message = 'Too many sign-ins right now, please try again shortly.'
+
+
+class HashingBusyMiddleware:
+    """Answers 503 when HashingBusy escapes a view, e.g. the admin login (API views answer it themselves)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            return HttpResponse(HashingBusy.message, status=503, content_type='text/plain')
+        return None
+
+
+def _create_pool():
+    global _executor, _slots
+    workers = getattr(settings, 'LOGIN_HASH_WORKERS', 2)
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    _slots = threading.BoundedSemaphore(workers + getattr(settings, 'LOGIN_HASH_QUEUE', 8))
+
+
+_create_pool()
+# Forked children (e.g. the enrolment process pool) cannot reuse the parent's threads
+os.register_at_fork(after_in_child=_create_pool)
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    def encode(self, password, salt, iterations=None):
+        if not _slots.acquire(timeout=getattr(settings, 'LOGIN_HASH_WAIT', 2)):
+            raise HashingBusy()
+        try:
+            return _executor.submit(super().encode, password, salt, iterations).result()
+        finally:
+            _slots.release()
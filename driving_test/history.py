@@ -0,0 +1,88 @@
+"""
+A user's completed tests, newest first, one page at a time.
+
+Pages are cut by a keyset cursor over (time_started, id) rather than an
+offset. Each page is then one range scan of the (user, status,
+time_started) index, however far back the client has paged, and a test
+completed while paging does not shift later pages.
+
+Conditional GETs are answered from the running totals on UserProfile
+(count, passes, score sum, best score and last completion time), which
+change with every completion, deletion or score edit. A client
+revalidating an unchanged history gets its 304 after one indexed read of
+that row, without the sessions table being touched.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import Q
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from .catalog import request_digest
+from .models import TestSession, UserProfile
+from .profiles import totals_version
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def first_page_cache_key(profile):
+    """Cache key of the serialized first history page (see dashboard.py), new with every change to the totals"""
+    return f'driving_test:history_first_page:{profile.user_id}:{totals_version(profile)}'
+
+
+def history_state(request):
+    """
+    The requesting user's profile, whose totals change with their history,
+    read from the one indexed UserProfile row (once per request, as the
+    ETag and Last-Modified both need it). Every worker sees the same row,
+    so no worker can answer 304 for a history that has changed.
+    """
+    if not hasattr(request, '_history_state'):
+        request._history_state = UserProfile.objects.filter(user_id=request.user.id).only(
+            'user_id', 'total_tests_taken', 'total_tests_passed', 'score_sum', 'best_score', 'last_completed_at'
+        ).first()
+    return request._history_state
+
+
+def history_etag(request, *args, **kwargs):
+    """ETag of a history page: the user's profile totals plus a digest of the URL"""
+    profile = history_state(request)
+    version = totals_version(profile) if profile else '0'
+    return f'"{request.user.id}-{version}-{request_digest(request)}"'
+
+
+def history_last_modified(request, *args, **kwargs):
+    profile = history_state(request)
+    return profile.last_completed_at if profile else None
+
+
+def encode_cursor(session):
+    position = f'{(session.time_started - _EPOCH) // _MICROSECOND}:{session.id}'
+    return urlsafe_base64_encode(force_bytes(position))
+
+
+def decode_cursor(cursor):
+    """(time_started, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        micros, session_id = force_str(urlsafe_base64_decode(cursor)).split(':')
+        return _EPOCH + int(micros) * _MICROSECOND, int(session_id)
+    except (TypeError, UnicodeDecodeError, OverflowError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def history_page(user, cursor=None, limit=DEFAULT_LIMIT):
+    """One page of a user's completed tests older than the cursor, and the cursor of the next page"""
+    sessions = TestSession.objects.filter(user=user, status='completed')
+    if cursor:
+        time_started, session_id = decode_cursor(cursor)
+        sessions = sessions.filter(
+            Q(time_started__lt=time_started) | Q(time_started=time_started, id__lt=session_id)
+        )
+    page = list(sessions.order_by('-time_started', '-id')[:limit + 1])
+    for session in page:
+        # Every row is the user's own, so serializing the username needs no join
+        session.user = user
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
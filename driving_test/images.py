@@ -0,0 +1,159 @@
+"""
+Background pipeline that turns an uploaded question image into resized
+derivatives (original format plus WebP).
+
+Question.save() only hashes the upload; the work here runs after commit on
+a small thread pool and only when the content hash changed. Originals are
+never re-encoded, and derivatives are always produced from the original,
+so repeated saves cannot degrade quality. Question images live in
+content-addressed storage, so identical derivatives are stored once no
+matter how many questions use the same picture.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image
+from .storage import hash_content
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_SIZES = {
+    'thumb': (120, 90),
+    'small': (320, 240),
+    'medium': (640, 480),
+    'large': (800, 600),
+}
+DEFAULT_SIZE = 'large'
+DERIVATIVE_DIR = 'question_images/derived'
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='question-images')
+
+
+def content_hash(field_file):
+    """SHA-256 of a FieldFile's content, whether freshly uploaded or already stored"""
+    field_file.open('rb')
+    try:
+        return hash_content(field_file)
+    finally:
+        if field_file._committed:
+            field_file.close()
+
+
+def derivative_path(size, ext):
+    return posixpath.join(DERIVATIVE_DIR, f'{size}.{ext}')
+
+
+def _encode(img, fmt):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        img.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    elif fmt == 'PNG':
+        img.save(buffer, 'PNG', optimize=True)
+    else:
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGB')
+        img.save(buffer, 'WEBP', quality=80, method=4)
+    return buffer.getvalue()
+
+
+def build_derivatives(storage, name):
+    """
+    Create every derivative of the stored image and return
+    (width, height, variants) where variants maps size -> paths and dimensions.
+    The 'thumb' size is what the admin changelist shows.
+    """
+    with storage.open(name, 'rb') as f:
+        with Image.open(f) as original:
+            original.load()
+            width, height = original.size
+            primary = ('PNG', 'png') if original.format == 'PNG' else ('JPEG', 'jpg')
+
+            # Palette images would otherwise be resized with nearest-neighbour
+            source = original
+            if original.mode not in ('RGB', 'RGBA', 'L'):
+                has_alpha = 'transparency' in original.info or original.mode in ('LA', 'PA')
+                source = original.convert('RGBA' if has_alpha else 'RGB')
+
+            variants = {}
+            for size, box in DERIVATIVE_SIZES.items():
+                img = source.copy()
+                img.thumbnail(box, Image.Resampling.LANCZOS)
+                entry = {'width': img.width, 'height': img.height}
+                for key, fmt, ext in (('default', *primary), ('webp', 'WEBP', 'webp')):
+                    entry[key] = storage.save(derivative_path(size, ext), ContentFile(_encode(img, fmt)))
+                variants[size] = entry
+    return width, height, variants
+
+
+def process_question_image(question_id, image_hash):
+    """Build derivatives for a question, unless its image changed again meanwhile"""
+    from .catalog import bump_version
+    from .models import Question
+
+    try:
+        question = Question.objects.only('id', 'image', 'image_hash').get(pk=question_id)
+        if not question.image or question.image_hash != image_hash:
+            return
+        width, height, variants = build_derivatives(question.image.storage, question.image.name)
+        updated = Question.objects.filter(pk=question_id, image_hash=image_hash).update(
+            image_width=width,
+            image_height=height,
+            image_variants=variants,
+            updated_at=timezone.now()
+        )
+        if updated:
+            bump_version()
+    except Exception:
+        logger.exception('Error processing image for question %s', question_id)
+
+
+def _process_in_worker(question_id, image_hash):
+    close_old_connections()
+    try:
+        process_question_image(question_id, image_hash)
+    finally:
+        close_old_connections()
+
+
+def schedule(question_id, image_hash):
+    """Queue derivative generation; runs inline when IMAGE_PIPELINE_SYNC is set (tests, scripts)"""
+    if getattr(settings, 'IMAGE_PIPELINE_SYNC', False):
+        process_question_image(question_id, image_hash)
+    else:
+        _executor.submit(_process_in_worker, question_id, image_hash)
+
+
+def accepts_webp(request):
+    return 'image/webp' in request.META.get('HTTP_ACCEPT', '')
+
+
+def best_variant_url(question, request=None):
+    """
+    URL of the most suitable derivative, chosen from the stored variant map
+    only, so serializing never touches the filesystem. Clients may ask for
+    a size with ?image_size=thumb|small|medium|large; WebP is used when the
+    Accept header allows it. Falls back to the original while derivatives
+    are still being generated.
+    """
+    if not question.image:
+        return None
+
+    size = DEFAULT_SIZE
+    webp = False
+    if request is not None:
+        size = request.GET.get('image_size', DEFAULT_SIZE)
+        webp = accepts_webp(request)
+
+    variants = question.image_variants or {}
+    entry = variants.get(size) or variants.get(DEFAULT_SIZE)
+    if entry:
+        path = entry.get('webp') if webp and entry.get('webp') else entry['default']
+        return question.image.storage.url(path)
+    return question.image.url
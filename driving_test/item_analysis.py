@@ -0,0 +1,184 @@
+"""
+Classical item analysis over all completed tests.
+
+Completed sessions are processed in chunks of consecutive ids. Each chunk
+is turned into a dense session x question response matrix (1 correct,
+0 wrong, masked where the question was not asked). Per-question sums are
+then accumulated with matrix products, so memory is bounded by the chunk
+size, not by the number of answers. From those sums we derive:
+
+- difficulty index: share of candidates answering correctly (p)
+- discrimination index: p among the top 27% of total scores minus p among
+  the bottom 27%
+- point-biserial: correlation between answering the item correctly and
+  the rest-of-test score (total minus the item, so the item does not
+  correlate with itself)
+"""
+from itertools import chain
+import numpy as np
+from django.db.models import Count
+from django.utils import timezone
+from .models import Question, QuestionAnalytics, TestAnswer, TestSession
+
+GROUP_FRACTION = 0.27
+MIN_ATTEMPTS = 30
+
+
+class ItemStatistics:
+    """Running per-question sums; each chunk adds to them"""
+
+    def __init__(self, question_ids):
+        self.question_ids = np.asarray(question_ids, dtype=np.int64)
+        size = len(self.question_ids)
+        self.n = np.zeros(size, dtype=np.int64)
+        self.correct = np.zeros(size, dtype=np.int64)
+        self.sum_x = np.zeros(size)
+        self.sum_x2 = np.zeros(size)
+        self.sum_cx = np.zeros(size)
+        self.upper_n = np.zeros(size, dtype=np.int64)
+        self.upper_correct = np.zeros(size, dtype=np.int64)
+        self.lower_n = np.zeros(size, dtype=np.int64)
+        self.lower_correct = np.zeros(size, dtype=np.int64)
+
+    def add(self, answered, correct, totals, upper, lower):
+        """
+        answered/correct: bool matrices (sessions x questions) for one chunk;
+        totals: each session's total score; upper/lower: bool masks of the
+        sessions in the top and bottom score groups.
+        """
+        answered_f = answered.astype(np.float64)
+        correct_f = correct.astype(np.float64)
+        self.n += answered.sum(axis=0)
+        self.correct += correct.sum(axis=0)
+        self.sum_x += totals @ answered_f
+        self.sum_x2 += (totals * totals) @ answered_f
+        self.sum_cx += totals @ correct_f
+        self.upper_n += answered[upper].sum(axis=0)
+        self.upper_correct += correct[upper].sum(axis=0)
+        self.lower_n += answered[lower].sum(axis=0)
+        self.lower_correct += correct[lower].sum(axis=0)
+
+    def results(self):
+        """difficulty, discrimination, point_biserial arrays (NaN where undefined)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n = self.n.astype(np.float64)
+            k = self.correct.astype(np.float64)
+            p = k / n
+
+            discrimination = self.upper_correct / self.upper_n - self.lower_correct / self.lower_n
+
+            # Rest score y = x - c, using c * c == c
+            sum_y = self.sum_x - k
+            sum_y2 = self.sum_x2 - 2 * self.sum_cx + k
+            sum_cy = self.sum_cx - k
+            mean_y = sum_y / n
+            std_y = np.sqrt(np.maximum(sum_y2 / n - mean_y ** 2, 0))
+            mean_correct = sum_cy / k
+            mean_wrong = (sum_y - sum_cy) / (n - k)
+            point_biserial = (mean_correct - mean_wrong) / std_y * np.sqrt(p * (1 - p))
+            point_biserial[(k == 0) | (k == n) | (std_y == 0)] = np.nan
+        return p, discrimination, point_biserial
+
+
+def _session_chunks(sessions_per_chunk):
+    """(ids, scores) arrays for completed sessions, in id order, one chunk at a time"""
+    last_id = 0
+    while True:
+        rows = list(
+            TestSession.objects.filter(status='completed', score__isnull=False, id__gt=last_id)
+            .order_by('id').values_list('id', 'score')[:sessions_per_chunk]
+        )
+        if not rows:
+            return
+        data = np.array(rows, dtype=np.int64)
+        last_id = int(data[-1, 0])
+        yield data[:, 0], data[:, 1].astype(np.float64)
+
+
+def score_group_cutoffs():
+    """
+    Total scores bounding the bottom and top 27% of completed sessions. With
+    integer scores ties put everyone with the cutoff score in the group.
+    """
+    histogram = sorted(
+        TestSession.objects.filter(status='completed', score__isnull=False)
+        .values_list('score').annotate(n=Count('id')).values_list('score', 'n')
+    )
+    total = sum(n for _, n in histogram)
+    if not total:
+        return None, None
+    scores = np.array([score for score, _ in histogram], dtype=np.float64)
+    cumulative = np.cumsum([n for _, n in histogram]) / total
+    lower = scores[np.searchsorted(cumulative, GROUP_FRACTION)]
+    upper = scores[min(np.searchsorted(cumulative, 1 - GROUP_FRACTION), len(scores) - 1)]
+    return lower, upper
+
+
+def _answer_array(first_session_id, last_session_id):
+    """(session_id, question_id, is_correct) rows for a session id range, without per-row tuples kept around"""
+    rows = TestAnswer.objects.filter(
+        test_session_id__gte=first_session_id,
+        test_session_id__lte=last_session_id
+    ).values_list('test_session_id', 'question_id', 'is_correct').iterator(chunk_size=10000)
+    return np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 3)
+
+
+def analyze(memory_mb=64, min_attempts=MIN_ATTEMPTS):
+    """Compute item statistics for every question and store them; returns the number of questions updated"""
+    question_ids = np.array(sorted(Question.objects.values_list('id', flat=True)), dtype=np.int64)
+    lower_cut, upper_cut = score_group_cutoffs()
+    if lower_cut is None or not len(question_ids):
+        return 0
+
+    # Two bool matrices plus their float64 copies: about 18 bytes per cell
+    sessions_per_chunk = max(100, int(memory_mb * 1024 * 1024 // (18 * len(question_ids))))
+    stats = ItemStatistics(question_ids)
+    for session_ids, totals in _session_chunks(sessions_per_chunk):
+        answers = _answer_array(session_ids[0], session_ids[-1])
+        rows = np.searchsorted(session_ids, answers[:, 0])
+        cols = np.searchsorted(question_ids, answers[:, 1])
+        rows_ok = rows < len(session_ids)
+        cols_ok = cols < len(question_ids)
+        # Drop answers of sessions that are not completed and of deleted questions
+        keep = rows_ok & cols_ok
+        keep[keep] = (session_ids[rows[keep]] == answers[keep, 0]) & (question_ids[cols[keep]] == answers[keep, 1])
+        rows, cols, is_correct = rows[keep], cols[keep], answers[keep, 2].astype(bool)
+
+        answered = np.zeros((len(session_ids), len(question_ids)), dtype=bool)
+        correct = np.zeros_like(answered)
+        answered[rows, cols] = True
+        correct[rows[is_correct], cols[is_correct]] = True
+        stats.add(answered, correct, totals, totals >= upper_cut, totals <= lower_cut)
+
+    return store(stats, min_attempts)
+
+
+def _value(number):
+    return None if np.isnan(number) else round(float(number), 4)
+
+
+def store(stats, min_attempts=MIN_ATTEMPTS):
+    difficulty, discrimination, point_biserial = stats.results()
+    attempted = {int(qid): index for index, qid in enumerate(stats.question_ids) if stats.n[index]}
+    categories = dict(Question.objects.filter(id__in=list(attempted)).values_list('id', 'category_id'))
+    QuestionAnalytics.objects.bulk_create(
+        [QuestionAnalytics(question_id=qid, category_id=categories.get(qid)) for qid in attempted],
+        ignore_conflicts=True
+    )
+
+    now = timezone.now()
+    analytics = list(QuestionAnalytics.objects.filter(question_id__in=list(attempted)))
+    for item in analytics:
+        index = attempted[item.question_id]
+        enough = stats.n[index] >= min_attempts
+        item.difficulty_index = _value(difficulty[index]) if enough else None
+        item.discrimination_index = _value(discrimination[index]) if enough else None
+        item.point_biserial = _value(point_biserial[index]) if enough else None
+        item.analysis_sample_size = int(stats.n[index])
+        item.analyzed_at = now
+    QuestionAnalytics.objects.bulk_update(
+        analytics,
+        ['difficulty_index', 'discrimination_index', 'point_biserial', 'analysis_sample_size', 'analyzed_at'],
+        batch_size=500
+    )
+    return len(analytics)
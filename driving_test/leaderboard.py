@@ -0,0 +1,279 @@
+"""
+Weekly and all-time leaderboards: each user's best score, ties broken by
+the fastest time for that score.
+
+LeaderboardEntry keeps one row per user and board. It is the store every
+worker process shares. Completing a test improves the user's rows with a
+conditional UPDATE. Each process keeps the boards it serves in memory as
+a sorted array of packed integer keys. A page is then a slice, and a
+user's rank is one bisect.
+
+Before serving, a board reads the rows updated since it last looked (an
+index range scan on (board, updated_at)). It goes back SYNC_OVERLAP
+further so rows committed late by other workers are not missed.
+Re-applying a row is harmless. Rows removed because a user or their last
+qualifying test was deleted leave a LeaderboardTombstone, read the same
+way, so every process drops them. A board that has not synced within
+TOMBSTONE_RETENTION reloads in full instead.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import LeaderboardEntry, LeaderboardTombstone, TestSession
+from .rollups import MAX_SCORE
+
+ALL_TIME = 'all'
+SYNC_OVERLAP = timedelta(seconds=5)
+TOMBSTONE_RETENTION = timedelta(days=1)
+
+TIME_BITS = 20
+USER_BITS = 32
+NO_TIME = (1 << TIME_BITS) - 1
+
+
+def week_board(moment=None):
+    """Board name of the week (starting Monday, local time) containing moment"""
+    day = timezone.localdate(moment)
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def pack(user_id, score, time_taken):
+    """Sort key: higher score first, then faster, then lower user id"""
+    time_taken = NO_TIME if time_taken is None else min(max(time_taken, 0), NO_TIME - 1)
+    score = min(max(score, 0), MAX_SCORE)
+    return ((MAX_SCORE - score) << (TIME_BITS + USER_BITS)) | (time_taken << USER_BITS) | user_id
+
+
+def unpack(key):
+    time_taken = (key >> USER_BITS) & NO_TIME
+    return {
+        'user_id': key & ((1 << USER_BITS) - 1),
+        'score': MAX_SCORE - (key >> (TIME_BITS + USER_BITS)),
+        'time_taken_seconds': None if time_taken == NO_TIME else time_taken,
+    }
+
+
+class Board:
+    """One leaderboard in process memory, synchronised from LeaderboardEntry"""
+
+    def __init__(self, name):
+        self.name = name
+        self.keys = array('q')
+        self.user_keys = {}
+        self.synced_to = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _rows(self, since=None):
+        rows = LeaderboardEntry.objects.filter(board=self.name)
+        if since is not None:
+            rows = rows.filter(updated_at__gte=since - SYNC_OVERLAP)
+        return rows.values_list('user_id', 'score', 'time_taken_seconds', 'updated_at')
+
+    def _removed(self, since):
+        return LeaderboardTombstone.objects.filter(
+            board=self.name, deleted_at__gte=since - SYNC_OVERLAP
+        ).values_list('user_id', 'deleted_at')
+
+    def _load(self, rows):
+        self.user_keys = {user_id: pack(user_id, score, time_taken) for user_id, score, time_taken, _ in rows}
+        self.keys = array('q', sorted(self.user_keys.values()))
+
+    def _apply(self, removed, rows):
+        # Removals first: a user re-entered after their tombstone is among the rows
+        for user_id, _ in removed:
+            old = self.user_keys.pop(user_id, None)
+            if old is not None:
+                del self.keys[bisect_left(self.keys, old)]
+        for user_id, score, time_taken, _ in rows:
+            key = pack(user_id, score, time_taken)
+            old = self.user_keys.get(user_id)
+            if old == key:
+                continue
+            if old is not None:
+                del self.keys[bisect_left(self.keys, old)]
+            self.keys.insert(bisect_left(self.keys, key), key)
+            self.user_keys[user_id] = key
+
+    def sync(self):
+        with self.lock:
+            now = timezone.now()
+            if self.synced_to is not None and self.synced_to < now - TOMBSTONE_RETENTION:
+                # Tombstones this board has not seen may already be purged
+                self.synced_to = None
+            removed = [] if self.synced_to is None else list(self._removed(self.synced_to))
+            rows = list(self._rows(self.synced_to))
+            if self.synced_to is None or len(rows) + len(removed) > len(self.keys) // 2:
+                # First use, or so much changed (e.g. a rebuild) that reloading is cheaper
+                if self.synced_to is not None:
+                    rows = list(self._rows())
+                self._load(rows)
+            else:
+                self._apply(removed, rows)
+            seen = [row[3] for row in rows] + [deleted_at for _, deleted_at in removed]
+            if seen:
+                self.synced_to = max(max(seen), self.synced_to or seen[0])
+            elif self.synced_to is None:
+                self.synced_to = now
+
+    def invalidate(self):
+        """Reload from the table on next use (e.g. rows were deleted)"""
+        with self.lock:
+            self.synced_to = None
+
+    def page(self, offset, limit):
+        """(rank, entry) pairs for ranks offset + 1 .. offset + limit"""
+        with self.lock:
+            keys = self.keys[offset:offset + limit]
+        return [(offset + i + 1, unpack(key)) for i, key in enumerate(keys)]
+
+    def rank(self, user_id):
+        """(rank, entry) of a user, or None if they are not on the board"""
+        with self.lock:
+            key = self.user_keys.get(user_id)
+            if key is None:
+                return None
+            return bisect_left(self.keys, key) + 1, unpack(key)
+
+
+class Leaderboards:
+    """The all-time board and the current week's board of this process"""
+
+    def __init__(self):
+        self.boards = {}
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            board = self.boards.get(name)
+            if board is None:
+                current = {ALL_TIME, week_board()}
+                for stale in set(self.boards) - current:
+                    del self.boards[stale]
+                board = self.boards[name] = Board(name)
+        board.sync()
+        return board
+
+    def reset(self):
+        with self.lock:
+            self.boards = {}
+
+
+leaderboards = Leaderboards()
+
+
+def _improve(board, user_id, score, time_taken, now):
+    better = Q(score__lt=score)
+    if time_taken is not None:
+        better |= Q(score=score) & (Q(time_taken_seconds__gt=time_taken) | Q(time_taken_seconds__isnull=True))
+    rows = LeaderboardEntry.objects.filter(board=board, user_id=user_id)
+    values = {'score': score, 'time_taken_seconds': time_taken, 'updated_at': now}
+    if rows.filter(better).update(**values) or rows.exists():
+        return
+    try:
+        with transaction.atomic():
+            LeaderboardEntry.objects.create(board=board, user_id=user_id, **values)
+    except IntegrityError:
+        # Another worker created the row meanwhile
+        rows.filter(better).update(**values)
+
+
+def record_result(session):
+    """Put a completed test on the all-time board and its week's board"""
+    if session.score is None:
+        return
+    now = timezone.now()
+    for board in (ALL_TIME, week_board(session.time_completed or session.time_started)):
+        _improve(board, session.user_id, session.score, session.time_taken_seconds, now)
+
+
+def _best_entries(sessions):
+    """{(board, user_id): sort key} of the best result per user on each board"""
+    best = {}
+    sessions = sessions.filter(status='completed', score__isnull=False).values_list(
+        'user_id', 'score', 'time_taken_seconds', 'time_completed', 'time_started'
+    ).order_by()
+    for user_id, score, time_taken, completed, started in sessions.iterator(chunk_size=5000):
+        key = pack(user_id, score, time_taken)
+        for board in (ALL_TIME, week_board(completed or started)):
+            if key < best.get((board, user_id), key + 1):
+                best[(board, user_id)] = key
+    return best
+
+
+def _remove(entries, now):
+    """Delete leaderboard rows, leaving tombstones for the other processes' boards"""
+    LeaderboardTombstone.objects.bulk_create([
+        LeaderboardTombstone(board=board, user_id=user_id, deleted_at=now)
+        for board, user_id in entries.values_list('board', 'user_id')
+    ])
+    entries.delete()
+
+
+def purge_tombstones():
+    """Delete tombstones every board has had time to see; returns how many were deleted"""
+    return LeaderboardTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()[0]
+
+
+def _reset_entries(session):
+    """Set the user's entries on the boards a test counted for to their best remaining result"""
+    best = _best_entries(TestSession.objects.filter(user_id=session.user_id))
+    now = timezone.now()
+    for board in (ALL_TIME, week_board(session.time_completed or session.time_started)):
+        rows = LeaderboardEntry.objects.filter(board=board, user_id=session.user_id)
+        key = best.get((board, session.user_id))
+        if key is None:
+            _remove(rows, now)
+        else:
+            # Update only: while the user is being deleted their rows may already be gone
+            entry = unpack(key)
+            rows.update(score=entry['score'], time_taken_seconds=entry['time_taken_seconds'], updated_at=now)
+
+
+def record_test_deleted(session):
+    """Recompute the user's entries on the boards a deleted completed test counted for"""
+    if session.status != 'completed' or session.score is None:
+        return
+    _reset_entries(session)
+
+
+def record_result_edited(session):
+    """Recompute the user's entries after a completed test's score was edited, which may lower them"""
+    _reset_entries(session)
+    # Adds the entry if the test had no score before and the user was not on the board yet
+    record_result(session)
+
+
+def record_user_deleted(user):
+    """Remove the entries of a user about to be deleted"""
+    _remove(LeaderboardEntry.objects.filter(user=user), timezone.now())
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every board from completed tests; returns the number of entries"""
+    best = _best_entries(TestSession.objects.all())
+
+    now = timezone.now()
+    gone = set(LeaderboardEntry.objects.values_list('board', 'user_id')) - set(best)
+    LeaderboardTombstone.objects.bulk_create(
+        [LeaderboardTombstone(board=board, user_id=user_id, deleted_at=now) for board, user_id in gone],
+        batch_size=1000
+    )
+    LeaderboardEntry.objects.all().delete()
+    LeaderboardEntry.objects.bulk_create(
+        [
+            LeaderboardEntry(board=board, updated_at=now, **unpack(key))
+            for (board, _), key in best.items()
+        ],
+        batch_size=1000
+    )
+    purge_tombstones()
+    leaderboards.reset()
+    return len(best)
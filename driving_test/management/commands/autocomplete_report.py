@@ -0,0 +1,66 @@
+import random
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from driving_test.models import Question, QuestionCategory
+from driving_test.search import AutocompleteIndex, tokenize
+
+FALLBACK_WORDS = [
+    'ikinyabiziga', 'umuhanda', 'icyapa', 'umuvuduko', 'abanyamaguru',
+    'guhagarara', 'kunyuranaho', 'amatara', 'romoruki', 'uburemere',
+    'ibimenyetso', 'umuyobozi', 'isuzumwa', 'metero', 'ibumoso', 'iburyo',
+]
+
+
+class Command(BaseCommand):
+    help = 'Report memory footprint and lookup latency of the autocomplete index for a synthetic question bank'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50000, help='Number of synthetic questions')
+        parser.add_argument('--lookups', type=int, default=10000, help='Number of prefix lookups to time')
+        parser.add_argument('--limit', type=int, default=10, help='Suggestions per lookup')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        # Build the vocabulary from the real bank so token distribution is realistic
+        vocabulary = set()
+        for text in Question.objects.values_list('question_text', flat=True):
+            vocabulary.update(tokenize(text))
+        vocabulary = sorted(vocabulary) or FALLBACK_WORDS
+        categories = list(QuestionCategory.objects.values_list('id', 'name')) or [
+            (i, f'Category {i}') for i in range(1, 7)
+        ]
+
+        questions = [
+            (i, ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(8, 20))))
+            for i in range(1, options['questions'] + 1)
+        ]
+
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        index = AutocompleteIndex()
+        index.load(questions, categories)
+        build_seconds = time.perf_counter() - started
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        prefixes = [
+            word[:rng.randint(2, min(len(word), 6))]
+            for word in (rng.choice(vocabulary) for _ in range(options['lookups']))
+        ]
+        started = time.perf_counter()
+        for prefix in prefixes:
+            index.search(prefix, options['limit'])
+        lookup_seconds = time.perf_counter() - started
+
+        self.stdout.write(f'Questions indexed:   {len(index.questions)}')
+        self.stdout.write(f'Distinct tokens:     {len(index.questions._tokens)}')
+        self.stdout.write(f'Index memory:        {(after - before) / 1024 / 1024:.1f} MiB (peak {peak / 1024 / 1024:.1f} MiB)')
+        self.stdout.write(f'Build time:          {build_seconds:.2f}s')
+        self.stdout.write(
+            f'Lookup latency:      {lookup_seconds / len(prefixes) * 1e6:.1f} µs average '
+            f'over {len(prefixes)} lookups (top {options["limit"]})'
+        )
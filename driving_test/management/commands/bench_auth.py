@@ -0,0 +1,51 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from driving_test.authentication import CachedTokenAuthentication, token_cache
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and latency per authenticated request with and without the token cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        # Everything runs in a rolled-back transaction so no benchmark user is left behind
+        with transaction.atomic():
+            user = User.objects.create_user(username='bench-auth-user', password='bench-auth-pass')
+            token = Token.objects.create(user=user)
+            request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+            token_cache.clear()
+
+            for label, backend in (('TokenAuthentication', TokenAuthentication()),
+                                   ('CachedTokenAuthentication', CachedTokenAuthentication())):
+                backend.authenticate(request)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        backend.authenticate(request)
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{label:<26} {len(queries) / count:.2f} queries/request  '
+                    f'{elapsed / count * 1e6:8.1f} µs/request'
+                )
+
+            # A full revalidation request: cached auth plus catalog ETag should need no SQL at all
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            etag = client.get('/driving_test/categories/')['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/driving_test/categories/', HTTP_IF_NONE_MATCH=etag)
+            self.stdout.write(
+                f'GET /driving_test/categories/ (304): {response.status_code}, {len(queries)} queries'
+            )
+            self.stdout.write(f'Token cache hits/misses: {token_cache.hits}/{token_cache.misses}')
+            transaction.set_rollback(True)
@@ -0,0 +1,64 @@
+import random
+import time
+from contextlib import nullcontext
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+# The hasher cost is the same on both paths; a cheap one leaves the lookup cost visible
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = 'Compare email login through a username round trip with the indexed EmailBackend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Synthetic users to create')
+        parser.add_argument('--logins', type=int, default=200, help='Logins to time per path')
+        parser.add_argument('--real-hasher', action='store_true', help='Keep the configured password hasher')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        hashers = None if options['real_hasher'] else FAST_HASHERS
+        with override_settings(PASSWORD_HASHERS=hashers) if hashers else nullcontext():
+            # Everything runs in a rolled-back transaction so no benchmark user is left behind
+            with transaction.atomic():
+                self.run(options)
+                transaction.set_rollback(True)
+
+    def run(self, options):
+        password = 'bench-login-pass'
+        encoded = make_password(password)
+        started = time.perf_counter()
+        batch = []
+        for i in range(options['users']):
+            batch.append(User(username=f'bench{i}', email=f'bench.user{i}@example.com', password=encoded))
+            if len(batch) == 10000:
+                User.objects.bulk_create(batch)
+                batch = []
+        User.objects.bulk_create(batch)
+        self.stdout.write(f'Created {options["users"]} users in {time.perf_counter() - started:.1f}s')
+
+        rng = random.Random(options['seed'])
+        emails = [f'bench.user{rng.randrange(options["users"])}@example.com' for _ in range(options['logins'])]
+
+        def previous(email):
+            user = User.objects.filter(email=email).first()
+            return authenticate(username=user.username, password=password) if user else None
+
+        def indexed(email):
+            return authenticate(email=email, password=password)
+
+        for label, login in (('filter(email) + username', previous), ('EmailBackend', indexed)):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                failed = sum(login(email) is None for email in emails)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:<26} {elapsed / len(emails) * 1000:8.2f} ms/login  '
+                f'{len(queries) / len(emails):.1f} queries/login  {failed} failed'
+            )
@@ -0,0 +1,48 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+from driving_test.media import serve_media
+from driving_test.models import Question
+
+
+class Command(BaseCommand):
+    help = 'Compare media throughput of django.views.static.serve with the media view (full, ranged and offloaded)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario')
+        parser.add_argument('--path', help='Media path to fetch (defaults to the first question image)')
+
+    def handle(self, *args, **options):
+        path = options['path'] or Question.objects.exclude(image='').values_list('image', flat=True).first()
+        if not path or not os.path.isfile(os.path.join(settings.MEDIA_ROOT, path)):
+            raise CommandError('No media file to benchmark; pass --path relative to MEDIA_ROOT')
+
+        size = os.path.getsize(os.path.join(settings.MEDIA_ROOT, path))
+        factory = RequestFactory()
+        full = factory.get('/')
+        ranged = factory.get('/', HTTP_RANGE='bytes=0-65535')
+        scenarios = [
+            ('static.serve', lambda: serve(full, path, document_root=settings.MEDIA_ROOT), None),
+            ('serve_media', lambda: serve_media(full, path), None),
+            ('serve_media range', lambda: serve_media(ranged, path), None),
+            ('serve_media x-accel', lambda: serve_media(full, path), 'x-accel-redirect'),
+        ]
+
+        self.stdout.write(f'File: {path} ({size / 1024:.1f} KiB), {options["requests"]} requests per scenario')
+        for label, fetch, offload in scenarios:
+            with override_settings(MEDIA_OFFLOAD=offload):
+                started = time.perf_counter()
+                sent = 0
+                for _ in range(options['requests']):
+                    response = fetch()
+                    # Drain the body the way a WSGI server would
+                    sent += sum(len(chunk) for chunk in response)
+                    response.close()
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:<22} {options["requests"] / elapsed:>9.0f} req/s  '
+                f'{sent / elapsed / 1024 / 1024:>8.1f} MiB/s through Python'
+            )
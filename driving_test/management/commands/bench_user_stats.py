@@ -0,0 +1,72 @@
+import time
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from driving_test.models import TestSession, UserProfile
+from driving_test.profiles import stats_cache_key
+
+
+def legacy_stats(user):
+    """What user_stats used to compute: two counts plus two passes over every completed session"""
+    completed_tests = TestSession.objects.filter(user=user, status='completed')
+    total_tests = completed_tests.count()
+    passed_tests = completed_tests.filter(passed=True).count()
+    if total_tests > 0:
+        avg_score = sum(test.score for test in completed_tests) / total_tests
+        best_score = max(test.score for test in completed_tests)
+    else:
+        avg_score = best_score = 0
+    list(completed_tests.order_by('-time_started')[:5])
+    return total_tests, passed_tests, avg_score, best_score
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and latency of user_stats for users with different numbers of completed tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,500', help='Comma-separated history sizes')
+        parser.add_argument('--requests', type=int, default=50)
+
+    def measure(self, label, size, count, call):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(count):
+                call()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{size:>6} tests  {label:<22} {len(queries) / count:5.1f} queries/request  '
+            f'{elapsed / count * 1e3:8.2f} ms/request'
+        )
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        # Everything runs in a rolled-back transaction so no benchmark data is left behind
+        with transaction.atomic():
+            for size in sizes:
+                user = User.objects.create_user(username=f'bench-stats-{size}', password='bench-stats-pass')
+                now = timezone.now()
+                TestSession.objects.bulk_create([
+                    TestSession(user=user, status='completed', score=i % 21, passed=i % 21 >= 12,
+                                time_completed=now, time_taken_seconds=600)
+                    for i in range(size)
+                ], batch_size=1000)
+                profile = UserProfile.objects.get(user=user)
+                profile.update_stats()
+
+                client = APIClient()
+                client.force_authenticate(user=user)
+                url = '/driving_test/user/stats/'
+
+                def uncached():
+                    cache.delete(stats_cache_key(profile))
+                    client.get(url)
+
+                self.measure('legacy (per-row)', size, count, lambda: legacy_stats(user))
+                self.measure('GET, cache miss', size, count, uncached)
+                self.measure('GET, cached', size, count, lambda: client.get(url))
+            transaction.set_rollback(True)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from driving_test.catalog import get_version
+from driving_test.snapshot import build_snapshot, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Build the offline question bank snapshot for the current catalog version'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune-tombstones',
+            action='store_true',
+            help='Also delete deletion tombstones older than the sync retention window'
+        )
+
+    def handle(self, *args, **options):
+        version = get_version()
+        path = build_snapshot(version)
+        self.stdout.write(self.style.SUCCESS(f'Snapshot for version {version}: {path}'))
+
+        if options['prune_tombstones']:
+            removed = prune_tombstones()
+            self.stdout.write(f'Pruned {removed} tombstones')
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from driving_test.catalog import bump_version
+from driving_test.models import Question
+from driving_test.storage import hash_content, hashed_name, is_content_addressed
+
+
+class Command(BaseCommand):
+    help = 'Move existing question images to content-addressed names, storing duplicates once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without touching files')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = Question._meta.get_field('image').storage
+
+        old_names = (
+            Question.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        renamed = {}
+        targets = set()
+        duplicates = 0
+        bytes_freed = 0
+        for old_name in old_names.iterator():
+            if is_content_addressed(old_name):
+                continue
+            if not storage.exists(old_name):
+                self.stderr.write(f'Missing file, skipped: {old_name}')
+                continue
+
+            with storage.open(old_name, 'rb') as f:
+                new_name = hashed_name(storage.generate_filename(old_name), hash_content(f))
+                if new_name in targets or storage.exists(new_name):
+                    duplicates += 1
+                    bytes_freed += storage.size(old_name)
+                elif not dry_run:
+                    new_name = storage.save(old_name, f)
+            renamed[old_name] = new_name
+            targets.add(new_name)
+
+        if dry_run:
+            self.stdout.write(
+                f'{len(renamed)} images would move to content-addressed names '
+                f'({duplicates} duplicates, {bytes_freed / 1024:.0f} KiB reclaimable)'
+            )
+            return
+
+        for old_name, new_name in renamed.items():
+            # updated_at moves the rows into delta sync, before the old file disappears
+            Question.objects.filter(image=old_name).update(image=new_name, updated_at=timezone.now())
+            storage.delete(old_name)
+
+        if renamed:
+            bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {len(renamed)} images to content-addressed names '
+            f'({duplicates} duplicates removed, {bytes_freed / 1024:.0f} KiB freed)'
+        ))
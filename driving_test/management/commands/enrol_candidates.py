@@ -0,0 +1,39 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from driving_test.enrolment import enrol, parse_csv
+
+
+class Command(BaseCommand):
+    help = 'Enrol candidates from a CSV or JSON file (username, email, password, first_name, last_name)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, or JSON file holding a list of candidates')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: CPU count)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8') as f:
+                text = f.read()
+        except OSError as e:
+            raise CommandError(e)
+        rows = json.loads(text) if options['path'].endswith('.json') else parse_csv(text)
+
+        started = time.perf_counter()
+        try:
+            result = enrol(rows, dry_run=options['dry_run'], workers=options['workers'])
+        except ValueError as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - started
+
+        for error in result['errors']:
+            details = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+            self.stderr.write(f'Row {error["row"]}: {details}')
+        if options['dry_run']:
+            self.stdout.write(f'{result["valid"]} valid, {len(result["errors"])} invalid')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Enrolled {result["created"]} of {len(rows)} candidates in {elapsed:.1f}s '
+                f'({len(result["errors"])} rejected)'
+            ))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from driving_test.item_analysis import MIN_ATTEMPTS, analyze
+
+
+class Command(BaseCommand):
+    help = 'Compute difficulty, discrimination and point-biserial for every question from all completed tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--memory-mb', type=int, default=64,
+                            help='Approximate memory budget for one chunk of the response matrix')
+        parser.add_argument('--min-attempts', type=int, default=MIN_ATTEMPTS,
+                            help='Leave statistics empty for questions answered fewer times than this')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = analyze(memory_mb=options['memory_mb'], min_attempts=options['min_attempts'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Analysed {count} questions in {elapsed:.1f}s'))
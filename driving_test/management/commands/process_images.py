@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from driving_test.images import DERIVATIVE_SIZES, content_hash, process_question_image
+from driving_test.models import Question
+
+
+class Command(BaseCommand):
+    help = 'Generate missing image derivatives (sizes and WebP) for question images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild derivatives for every image')
+
+    def handle(self, *args, **options):
+        questions = Question.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            # Also picks up images processed before a size (e.g. 'thumb') was added
+            questions = questions.exclude(image_variants__has_keys=list(DERIVATIVE_SIZES))
+
+        processed = 0
+        for question in questions.only('id', 'image', 'image_hash').iterator():
+            image_hash = content_hash(question.image)
+            if image_hash != question.image_hash:
+                Question.objects.filter(pk=question.pk).update(image_hash=image_hash)
+            process_question_image(question.pk, image_hash)
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} question images'))
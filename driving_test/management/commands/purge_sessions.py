@@ -0,0 +1,64 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from driving_test.models import RefreshToken
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions, expired or revoked refresh tokens and, optionally, '
+        'old sessions left behind by API logins, in batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int,
+            help='Also delete live sessions created more than this many days ago'
+        )
+        parser.add_argument(
+            '--keep-staff', action='store_true',
+            help='Keep live sessions of staff users (admin logins)'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = self.purge(Session.objects.filter(expire_date__lt=now), options['dry_run'])
+        self.stdout.write(f'Expired sessions: {deleted}')
+
+        refresh_tokens = RefreshToken.objects.filter(Q(expires_at__lt=now) | Q(revoked_at__isnull=False))
+        deleted = self.purge(refresh_tokens, options['dry_run'])
+        self.stdout.write(f'Expired or revoked refresh tokens: {deleted}')
+
+        if options['older_than_days'] is not None:
+            # Sessions expire SESSION_COOKIE_AGE after their last write, so this is a lower bound on age
+            cutoff = now + timedelta(seconds=settings.SESSION_COOKIE_AGE) - timedelta(days=options['older_than_days'])
+            sessions = Session.objects.filter(expire_date__gte=now, expire_date__lt=cutoff)
+            if options['keep_staff']:
+                staff_ids = {str(pk) for pk in User.objects.filter(is_staff=True).values_list('pk', flat=True)}
+                keep = [
+                    session.session_key for session in sessions.iterator()
+                    if session.get_decoded().get('_auth_user_id') in staff_ids
+                ]
+                sessions = sessions.exclude(session_key__in=keep)
+            deleted = self.purge(sessions, options['dry_run'])
+            self.stdout.write(f'Sessions older than {options["older_than_days"]} days: {deleted}')
+
+        self.stdout.write(self.style.SUCCESS('Dry run, nothing deleted' if options['dry_run'] else 'Done'))
+
+    def purge(self, rows, dry_run):
+        """Delete in primary-key batches so a large table is not locked in one statement"""
+        if dry_run:
+            return rows.count()
+        deleted = 0
+        while True:
+            keys = list(rows.values_list('pk', flat=True)[:BATCH_SIZE])
+            if not keys:
+                return deleted
+            deleted += rows.model.objects.filter(pk__in=keys).delete()[0]
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from driving_test.grading import rebuild_answer_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-question and per-option answer counters from all test answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Questions recomputed per transaction')
+
+    def handle(self, *args, **options):
+        count = rebuild_answer_counters(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt answer counters for {count} questions'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from driving_test.grading import rebuild_category_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's per-category answer counts from all test answers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users recomputed per transaction')
+
+    def handle(self, *args, **options):
+        rows = rebuild_category_stats(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} user category stats'))
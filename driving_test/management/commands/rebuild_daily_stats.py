@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from driving_test.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Backfill (or repair) the daily, hourly and score histogram rollups from users and test sessions'
+
+    def handle(self, *args, **options):
+        days = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily stats for {days} days'))
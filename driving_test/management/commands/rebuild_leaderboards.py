@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from driving_test.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the weekly and all-time leaderboard snapshot from completed tests'
+
+    def handle(self, *args, **options):
+        entries = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {entries} leaderboard entries'))
@@ -0,0 +1,178 @@
+"""
+Media file serving.
+
+After the access check the transfer is handed to the front server when one
+is configured (MEDIA_OFFLOAD = 'x-accel-redirect' for nginx, 'x-sendfile'
+for Apache/lighttpd). Otherwise the file is streamed by Django with
+FileResponse, which lets the WSGI server use sendfile(), plus single-range
+requests and conditional GETs so clients can resume and revalidate.
+
+Content-addressed names (and versioned snapshots) never change content, so
+they are sent with a far-future immutable Cache-Control header. Only public
+files may be kept by shared caches; snapshots are marked private.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .storage import is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Protected files are only for authenticated users: shared caches must not keep them
+PRIVATE_IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+SNAPSHOT_NAME_RE = re.compile(r'^snapshots/catalog-\d+\.jsonl\.gz$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+PUBLIC_PREFIXES = ('question_images/',)
+PROTECTED_PREFIXES = ('snapshots/',)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def is_immutable(path):
+    return is_content_addressed(path) or bool(SNAPSHOT_NAME_RE.match(path))
+
+
+def _has_access(request, path):
+    """Question images are public; snapshots need an authenticated API user"""
+    if path.startswith(PUBLIC_PREFIXES):
+        return True
+    if path.startswith(PROTECTED_PREFIXES):
+        drf_request = Request(request, authenticators=[
+            auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            return drf_request.user.is_authenticated
+        except AuthenticationFailed:
+            return False
+    return False
+
+
+def _file_etag(path, stat):
+    # Content-addressed names already identify the bytes
+    if is_content_addressed(path):
+        return '"%s"' % posixpath.splitext(posixpath.basename(path))[0]
+    return 'W/"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+def _parse_range(header, size):
+    """Return (start, end) for a single satisfiable byte range, None to ignore it, False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _range_stream(full_path, start, end):
+    with open(full_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload_response(path, full_path, content_type):
+    mode = getattr(settings, 'MEDIA_OFFLOAD', None)
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(path)
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+    return None
+
+
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid media path')
+
+    if not _has_access(request, path):
+        # Same answer as a missing file so protected names cannot be probed
+        raise Http404('Media not found')
+
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Media not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Media not found')
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    if encoding == 'gzip':
+        content_type = 'application/gzip'
+    content_type = content_type or 'application/octet-stream'
+
+    response = _offload_response(path, full_path, content_type)
+    if response is None:
+        etag = _file_etag(path, stat)
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = _file_response(request, full_path, stat, content_type, etag, last_modified)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+
+    protected = path.startswith(PROTECTED_PREFIXES)
+    if is_immutable(path):
+        response['Cache-Control'] = PRIVATE_IMMUTABLE_CACHE_CONTROL if protected else IMMUTABLE_CACHE_CONTROL
+    elif protected:
+        response['Cache-Control'] = 'private'
+    return response
+
+
+def _file_response(request, full_path, stat, content_type, etag, last_modified):
+    size = stat.st_size
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header:
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _range_stream(full_path, start, end),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        # FileResponse lets the WSGI server use wsgi.file_wrapper (sendfile) for a zero-copy transfer
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:18
+
+import driving_test.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0006_question_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Optional image for the question (e.g., road signs, diagrams)', null=True, storage=driving_test.storage.ContentAddressedStorage(), upload_to='question_images/'),
+        ),
+    ]
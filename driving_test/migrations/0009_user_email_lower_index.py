@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+LOOKUP_INDEX = 'auth_user_email_lower_idx'
+UNIQUE_INDEX = 'auth_user_email_lower_uniq'
+
+
+def check_duplicate_emails(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.exclude(email='')
+        .values(email_lower=Lower('email'))
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Cannot add the unique email index; these emails belong to more than one user: '
+            + ', '.join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('driving_test', '0008_refreshtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        # auth_user belongs to contrib.auth, so the expression indexes are created with SQL.
+        # Uniqueness skips blank emails so accounts without an email are still allowed.
+        # Planners only use a partial index when the query repeats its WHERE clause
+        # literally, so logins are served by a plain index on the same expression.
+        migrations.RunSQL(
+            f"CREATE UNIQUE INDEX {UNIQUE_INDEX} ON auth_user (LOWER(email)) WHERE email <> ''",
+            f"DROP INDEX {UNIQUE_INDEX}",
+        ),
+        migrations.RunSQL(
+            f"CREATE INDEX {LOOKUP_INDEX} ON auth_user (LOWER(email))",
+            f"DROP INDEX {LOOKUP_INDEX}",
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0009_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('tests_started', models.IntegerField(default=0)),
+                ('tests_completed', models.IntegerField(default=0)),
+                ('tests_passed', models.IntegerField(default=0)),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('new_users', models.IntegerField(default=0)),
+                ('last_login_users', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Stats',
+                'ordering': ['-day'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0010_dailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyScoreStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('score', models.SmallIntegerField()),
+                ('completed', models.IntegerField(default=0)),
+                ('passed', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Hourly Score Stats',
+                'unique_together': {('hour', 'score')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0011_hourlyscorestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionanalytics',
+            name='analysis_sample_size',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='questionanalytics',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='questionanalytics',
+            name='difficulty_index',
+            field=models.FloatField(blank=True, help_text='Share of candidates answering correctly', null=True),
+        ),
+        migrations.AddField(
+            model_name='questionanalytics',
+            name='discrimination_index',
+            field=models.FloatField(blank=True, help_text='Upper 27% minus lower 27% correct share', null=True),
+        ),
+        migrations.AddField(
+            model_name='questionanalytics',
+            name='point_biserial',
+            field=models.FloatField(blank=True, help_text='Correlation with the rest of the test score', null=True),
+        ),
+    ]
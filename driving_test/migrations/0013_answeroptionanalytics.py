@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0012_questionanalytics_item_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerOptionAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('times_selected', models.IntegerField(default=0)),
+                ('option', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='driving_test.answeroption')),
+            ],
+            options={
+                'verbose_name_plural': 'Answer Option Analytics',
+            },
+        ),
+    ]
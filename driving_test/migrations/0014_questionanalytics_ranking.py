@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+
+
+def rank_existing(apps, schema_editor):
+    Question = apps.get_model('driving_test', 'Question')
+    QuestionAnalytics = apps.get_model('driving_test', 'QuestionAnalytics')
+    QuestionAnalytics.objects.update(
+        category_id=Subquery(Question.objects.filter(pk=OuterRef('question_id')).values('category_id')[:1]),
+        ranked_success_rate=Case(
+            When(
+                total_attempts__gte=max(getattr(settings, 'RANKING_MIN_ATTEMPTS', 20), 1),
+                then=100.0 * F('correct_attempts') / F('total_attempts')
+            ),
+            default=Value(None),
+            output_field=models.FloatField()
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0013_answeroptionanalytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionanalytics',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='driving_test.questioncategory'),
+        ),
+        migrations.AddField(
+            model_name='questionanalytics',
+            name='ranked_success_rate',
+            field=models.FloatField(blank=True, help_text='Success rate once the question has enough attempts to be ranked', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='questionanalytics',
+            index=models.Index(condition=models.Q(('ranked_success_rate__isnull', False)), fields=['ranked_success_rate', 'question'], name='qa_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='questionanalytics',
+            index=models.Index(condition=models.Q(('ranked_success_rate__isnull', False)), fields=['category', 'ranked_success_rate', 'question'], name='qa_category_ranking_idx'),
+        ),
+        migrations.RunPython(rank_existing, migrations.RunPython.noop),
+    ]
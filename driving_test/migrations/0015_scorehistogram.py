@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0014_questionanalytics_ranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('score', models.SmallIntegerField()),
+                ('completed', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Score Histograms',
+                'unique_together': {('period', 'score')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:59
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    TestSession = apps.get_model('driving_test', 'TestSession')
+    UserProfile = apps.get_model('driving_test', 'UserProfile')
+    totals = {
+        row['user_id']: row
+        for row in TestSession.objects.filter(status='completed').values('user_id').annotate(
+            taken=Count('id'),
+            passed_count=Count('id', filter=Q(passed=True)),
+            best=Max('score'),
+            scores=Sum('score'),
+            last=Max(Coalesce('time_completed', 'time_started')),
+        )
+    }
+    profiles = list(UserProfile.objects.filter(user_id__in=list(totals)))
+    for profile in profiles:
+        row = totals[profile.user_id]
+        profile.total_tests_taken = row['taken']
+        profile.total_tests_passed = row['passed_count']
+        profile.best_score = row['best'] or 0
+        profile.score_sum = row['scores'] or 0
+        profile.last_completed_at = row['last']
+    UserProfile.objects.bulk_update(
+        profiles,
+        ['total_tests_taken', 'total_tests_passed', 'best_score', 'score_sum', 'last_completed_at'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0017_usercategorystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='score_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
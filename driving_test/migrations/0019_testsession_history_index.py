@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0018_userprofile_running_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testsession',
+            index=models.Index(fields=['user', 'status', 'time_started'], name='session_history_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0019_testsession_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=10)),
+                ('user_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['board', 'deleted_at'], name='driving_tes_board_5ca187_idx')],
+            },
+        ),
+    ]
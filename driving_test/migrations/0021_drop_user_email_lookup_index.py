@@ -0,0 +1,20 @@
+from django.db import migrations
+
+LOOKUP_INDEX = 'auth_user_email_lower_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driving_test', '0020_leaderboardtombstone'),
+    ]
+
+    operations = [
+        # Email lookups now repeat the unique index's "email <> ''" condition
+        # (backends.users_having_email), so the plain LOWER(email) index from
+        # 0009 is no longer used and only slows down writes to auth_user.
+        migrations.RunSQL(
+            f"DROP INDEX {LOOKUP_INDEX}",
+            f"CREATE INDEX {LOOKUP_INDEX} ON auth_user (LOWER(email))",
+        ),
+    ]
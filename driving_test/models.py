@@ -2,15 +2,18 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinLengthValidator, MaxLengthValidator
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from PIL import Image
-import os
+from django.utils import timezone
+from functools import partial
+from .storage import question_image_storage
 
 class QuestionCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "Question Categories"
@@ -46,10 +49,16 @@ class Question(models.Model):
     )
     image = models.ImageField(
         upload_to='question_images/', 
+        storage=question_image_storage,
         blank=True, 
         null=True,
         help_text="Optional image for the question (e.g., road signs, diagrams)"
     )
+    # Filled in by the background image pipeline (see images.py)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     explanation = models.TextField(
         blank=True,
         help_text="Optional explanation for the correct answer"
@@ -72,6 +81,7 @@ class Question(models.Model):
         indexes = [
             models.Index(fields=['is_active', 'category']),
             models.Index(fields=['difficulty']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -86,21 +96,38 @@ class Question(models.Model):
             if correct_options.count() > 1:
                 raise ValidationError('Question can have only one correct answer.')
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'image' in field_names:
+            instance._loaded_image_name = instance.image.name or ''
+        return instance
+    
     def save(self, *args, **kwargs):
+        from .images import content_hash, schedule
+        
+        # Only hash when a new file was assigned; toggling other fields never opens the image
+        image_name = self.image.name or ''
+        image_changed = (
+            self.image and not self.image._committed
+        ) or image_name != getattr(self, '_loaded_image_name', '')
+        
+        process = False
+        if image_changed:
+            new_hash = content_hash(self.image) if self.image else ''
+            if new_hash != self.image_hash:
+                self.image_hash = new_hash
+                self.image_width = None
+                self.image_height = None
+                self.image_variants = {}
+                process = bool(new_hash)
+        
         super().save(*args, **kwargs)
+        self._loaded_image_name = self.image.name or ''
         
-        # Resize image if it exists and is too large
-        if self.image:
-            img_path = self.image.path
-            if os.path.exists(img_path):
-                try:
-                    with Image.open(img_path) as img:
-                        # Resize if image is larger than 800x600
-                        if img.width > 800 or img.height > 600:
-                            img.thumbnail((800, 600), Image.Resampling.LANCZOS)
-                            img.save(img_path, optimize=True, quality=85)
-                except Exception as e:
-                    print(f"Error processing image: {e}")
+        # Derivatives are generated after commit, off the request path
+        if process:
+            transaction.on_commit(partial(schedule, self.pk, self.image_hash))
     
     @property
     def correct_answer(self):
@@ -146,29 +173,18 @@ class UserProfile(models.Model):
     total_tests_taken = models.IntegerField(default=0)
     total_tests_passed = models.IntegerField(default=0)
     best_score = models.IntegerField(default=0)
+    # Kept up to date on every completion (see profiles.py)
+    score_sum = models.BigIntegerField(default=0)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
     def update_stats(self):
-        """Update user statistics"""
-        completed_tests = TestSession.objects.filter(
-            user=self.user, 
-            status='completed'
-        )
-        self.total_tests_taken = completed_tests.count()
-        self.total_tests_passed = completed_tests.filter(passed=True).count()
-        
-        if completed_tests.exists():
-        # Get scores that are not None, and default to 0 if no valid scores exist
-            valid_scores = [test.score for test in completed_tests if test.score is not None]
-            if valid_scores:
-                self.best_score = max(valid_scores)
-            else:
-                self.best_score = 0
-        else:
-            self.best_score = 0
-        
+        """Recompute user statistics from completed tests"""
+        from .profiles import profile_totals
+        for field, value in profile_totals(self.user_id).items():
+            setattr(self, field, value)
         self.save()
     
     @property
@@ -200,6 +216,7 @@ class TestSession(models.Model):
         indexes = [
             models.Index(fields=['user', 'status']),
             models.Index(fields=['time_started']),
+            models.Index(fields=['user', 'status', 'time_started'], name='session_history_idx'),
         ]
     
     def __str__(self):
@@ -224,20 +241,46 @@ class TestSession(models.Model):
                 return f"{minutes}m {seconds}s"
         return None
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.status if 'status' in field_names else None
+        instance._loaded_result = (
+            (instance.score, instance.passed) if {'score', 'passed'} <= set(field_names) else None
+        )
+        return instance
+
     def save(self, *args, **kwargs):
+        from .leaderboard import record_result, record_result_edited
+        from .profiles import record_completion, record_result_change
+        from .rollups import record_test_completed, record_test_edited, record_test_started
+
         # Set passed status based on score
         if self.score is not None:
             self.passed = self.score >= self.pass_threshold
         
+        created = self._state.adding
+        newly_completed = self.status == 'completed' and getattr(self, '_loaded_status', None) != 'completed'
+        # An already completed test whose score was edited (e.g. by an admin)
+        loaded_result = getattr(self, '_loaded_result', None)
+        result_changed = (
+            self.status == 'completed' and not newly_completed
+            and loaded_result is not None and loaded_result != (self.score, self.passed)
+        )
         super().save(*args, **kwargs)
-        
-        # Update user profile stats if test is completed
-        if self.status == 'completed':
-            try:
-                profile = self.user.userprofile
-                profile.update_stats()
-            except UserProfile.DoesNotExist:
-                UserProfile.objects.create(user=self.user)
+        self._loaded_status = self.status
+        self._loaded_result = (self.score, self.passed)
+
+        if created:
+            record_test_started(self)
+        if newly_completed:
+            record_test_completed(self)
+            record_result(self)
+            record_completion(self)
+        elif result_changed:
+            record_test_edited(self, loaded_result)
+            record_result_edited(self)
+            record_result_change(self)
 
 class TestAnswer(models.Model):
     test_session = models.ForeignKey(
@@ -281,9 +324,40 @@ class QuestionAnalytics(models.Model):
     question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='analytics')
     total_attempts = models.IntegerField(default=0)
     correct_attempts = models.IntegerField(default=0)
+    # Item statistics written by the item_analysis command (see item_analysis.py)
+    difficulty_index = models.FloatField(null=True, blank=True, help_text="Share of candidates answering correctly")
+    discrimination_index = models.FloatField(null=True, blank=True, help_text="Upper 27% minus lower 27% correct share")
+    point_biserial = models.FloatField(null=True, blank=True, help_text="Correlation with the rest of the test score")
+    analysis_sample_size = models.IntegerField(default=0)
+    analyzed_at = models.DateTimeField(null=True, blank=True)
+    # Kept next to the counters for the hardest/easiest rankings (see rankings.py)
+    category = models.ForeignKey(
+        QuestionCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    ranked_success_rate = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Success rate once the question has enough attempts to be ranked"
+    )
     
     class Meta:
         verbose_name_plural = "Question Analytics"
+        indexes = [
+            models.Index(
+                fields=['ranked_success_rate', 'question'],
+                condition=models.Q(ranked_success_rate__isnull=False),
+                name='qa_ranking_idx'
+            ),
+            models.Index(
+                fields=['category', 'ranked_success_rate', 'question'],
+                condition=models.Q(ranked_success_rate__isnull=False),
+                name='qa_category_ranking_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Analytics for Q{self.question.id}"
@@ -300,6 +374,190 @@ class QuestionAnalytics(models.Model):
         self.total_attempts = answers.count()
         self.correct_attempts = answers.filter(is_correct=True).count()
         self.save()
+
+    def save(self, *args, **kwargs):
+        from .rankings import ranked_rate
+        self.ranked_success_rate = ranked_rate(self.total_attempts, self.correct_attempts)
+        if self.category_id is None and self.question_id:
+            self.category_id = self.question.category_id
+        super().save(*args, **kwargs)
+
+
+class AnswerOptionAnalytics(models.Model):
+    """How often each answer option is picked, kept up to date by grading"""
+    option = models.OneToOneField(AnswerOption, on_delete=models.CASCADE, related_name='analytics')
+    times_selected = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Answer Option Analytics"
+
+    def __str__(self):
+        return f"Analytics for option {self.option_id}"
+
+
+class CatalogVersion(models.Model):
+    """Single row holding the question bank version used for ETags and delta sync"""
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
+
+
+
+class CatalogTombstone(models.Model):
+    """Records deleted questions and categories so delta sync can tell clients what to drop"""
+    KIND_CHOICES = [
+        ('question', 'Question'),
+        ('category', 'Category'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id}"
+
+class RefreshToken(models.Model):
+    """Long-lived token exchanged for short-lived signed access tokens (see tokens.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='refresh_tokens')
+    # SHA-256 of the token; the token itself is only ever shown to the client
+    token_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'revoked_at']),
+        ]
+
+    def __str__(self):
+        return f"Refresh token for {self.user.username}"
+
+    @property
+    def is_valid(self):
+        return self.revoked_at is None and self.expires_at > timezone.now()
+
+class DailyStats(models.Model):
+    """
+    Per-day activity counters kept up to date by rollups.py. The row dated
+    ALL_TIME_DAY holds all-time totals, so any period needs at most one row
+    per day plus that one.
+    """
+    day = models.DateField(unique=True)
+    tests_started = models.IntegerField(default=0)
+    # Completed tests are counted on the day they were started
+    tests_completed = models.IntegerField(default=0)
+    tests_passed = models.IntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    new_users = models.IntegerField(default=0)
+    # Active users whose most recent login falls on this day
+    last_login_users = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily Stats"
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"Stats for {self.day}"
+
+class HourlyScoreStats(models.Model):
+    """Completed tests per hour (of starting) and score, the base of the analytics time series"""
+    hour = models.DateTimeField()
+    score = models.SmallIntegerField()
+    completed = models.IntegerField(default=0)
+    passed = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Hourly Score Stats"
+        unique_together = ['hour', 'score']
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 score {self.score}"
+
+class UserCategoryStats(models.Model):
+    """A user's answers per question category, kept up to date by grading"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.ForeignKey(QuestionCategory, on_delete=models.CASCADE, related_name='user_stats')
+    attempts = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "User Category Stats"
+        unique_together = ['user', 'category']
+
+    def __str__(self):
+        return f"{self.user_id} in category {self.category_id}: {self.correct}/{self.attempts}"
+
+    @property
+    def accuracy(self):
+        if self.attempts > 0:
+            return round(self.correct / self.attempts * 100, 1)
+        return 0
+
+class LeaderboardEntry(models.Model):
+    """
+    A user's best result on one leaderboard: board is 'all' or the Monday of
+    a week (e.g. '2026-10-12'). This is the snapshot shared by the worker
+    processes' in-memory leaderboards (see leaderboard.py).
+    """
+    board = models.CharField(max_length=10)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.IntegerField()
+    time_taken_seconds = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Leaderboard Entries"
+        unique_together = ['board', 'user']
+        indexes = [
+            models.Index(fields=['board', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.board}: {self.user_id} scored {self.score}"
+
+class LeaderboardTombstone(models.Model):
+    """
+    A LeaderboardEntry that was removed (its user or their last qualifying
+    test was deleted), so the other processes' in-memory boards drop it too
+    """
+    board = models.CharField(max_length=10)
+    user_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['board', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.board}: {self.user_id} removed {self.deleted_at}"
+
+class ScoreHistogram(models.Model):
+    """
+    Completed tests per score, for each calendar month (period is the first
+    day of the month) and all-time (period is ALL_TIME_DAY), kept by rollups.py
+    """
+    period = models.DateField()
+    score = models.SmallIntegerField()
+    completed = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Score Histograms"
+        unique_together = ['period', 'score']
+
+    def __str__(self):
+        return f"{self.period:%Y-%m} score {self.score}: {self.completed}"
+
 # Signal to create user profile when user is created
 
 
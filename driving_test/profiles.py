@@ -0,0 +1,131 @@
+"""
+Per-user test totals behind user_stats.
+
+UserProfile keeps running totals: tests taken and passed, score sum, best
+score and the last completion time. Completing a test updates them with
+one F() UPDATE, so user_stats never reads the user's sessions to count
+them. The assembled user_stats response is cached under a key built from
+those totals (totals_version). A completion or deletion changes the
+totals, so every worker that reads the profile row afterwards looks up a
+new key, whichever process the cache lives in. Nothing has to be deleted.
+The percentile ranks in the response, which move with everyone else's
+results, are at most USER_STATS_CACHE_TTL seconds old.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import TestSession, UserProfile
+from .rollups import percentile_ranks
+from .serializers import TestSessionSummarySerializer
+
+# Latest completed tests listed in user_stats
+RECENT_TESTS = 5
+
+
+def totals_version(profile):
+    """Identifies the state of a profile's totals; changes whenever one of the user's tests does"""
+    last = profile.last_completed_at.timestamp() if profile.last_completed_at else 0
+    return (
+        f'{profile.total_tests_taken}.{profile.total_tests_passed}.'
+        f'{profile.score_sum}.{profile.best_score}.{last}'
+    )
+
+
+def stats_cache_key(profile):
+    return f'driving_test:user_stats:{profile.user_id}:{totals_version(profile)}'
+
+
+def cached_stats(profile, build):
+    """build() from the cache entry for the profile's current totals"""
+    key = stats_cache_key(profile)
+    stats = cache.get(key)
+    if stats is None:
+        stats = build()
+        cache.set(key, stats, getattr(settings, 'USER_STATS_CACHE_TTL', 300))
+    return stats
+
+
+def get_profile(user):
+    """The user's profile, created with totals from their tests if missing"""
+    profile, created = UserProfile.objects.get_or_create(user=user)
+    if created:
+        profile.update_stats()
+    profile.user = user
+    return profile
+
+
+def stats_data(profile, recent_tests):
+    """The user_stats response from a profile's totals and the user's latest completed tests"""
+    total_tests = profile.total_tests_taken
+    if total_tests > 0:
+        pass_rate = (profile.total_tests_passed / total_tests) * 100
+        avg_score = profile.score_sum / total_tests
+    else:
+        pass_rate = 0
+        avg_score = 0
+
+    # Ranked against the maintained score histograms, not against every test
+    percentile_rank = percentile_ranks(
+        best_score=profile.best_score if total_tests else None,
+        latest_score=recent_tests[0].score if recent_tests else None
+    )
+    return {
+        'total_tests': total_tests,
+        'passed_tests': profile.total_tests_passed,
+        'pass_rate': round(pass_rate, 1),
+        'average_score': round(avg_score, 1),
+        'best_score': profile.best_score,
+        'percentile_rank': percentile_rank,
+        'recent_tests': [dict(row) for row in TestSessionSummarySerializer(recent_tests, many=True).data]
+    }
+
+
+def profile_totals(user_id):
+    """UserProfile totals recomputed from the user's completed tests, in one aggregate query"""
+    totals = TestSession.objects.filter(user_id=user_id, status='completed').aggregate(
+        taken=Count('id'),
+        passed=Count('id', filter=Q(passed=True)),
+        best=Max('score'),
+        scores=Sum('score'),
+        last=Max(Coalesce('time_completed', 'time_started')),
+    )
+    return {
+        'total_tests_taken': totals['taken'],
+        'total_tests_passed': totals['passed'],
+        'best_score': totals['best'] or 0,
+        'score_sum': totals['scores'] or 0,
+        'last_completed_at': totals['last'],
+    }
+
+
+def record_completion(session):
+    """Add a newly completed test to its user's totals"""
+    score = session.score or 0
+    updated = UserProfile.objects.filter(user_id=session.user_id).update(
+        total_tests_taken=F('total_tests_taken') + 1,
+        total_tests_passed=F('total_tests_passed') + (1 if session.passed else 0),
+        score_sum=F('score_sum') + score,
+        best_score=Greatest('best_score', Value(score)),
+        last_completed_at=session.time_completed or session.time_started,
+    )
+    if not updated:
+        profile, _ = UserProfile.objects.get_or_create(user_id=session.user_id)
+        profile.update_stats()
+
+
+def recompute_totals(user_id):
+    """Recompute a user's totals from their completed tests"""
+    # Queryset update: the profile may be going away with the user in the same delete
+    UserProfile.objects.filter(user_id=user_id).update(**profile_totals(user_id))
+
+
+def record_result_change(session):
+    """The score of an already completed test was edited: its user's best score and sums may change"""
+    recompute_totals(session.user_id)
+
+
+def record_deletion(session):
+    """A test was deleted: its user's best score may change, so recompute the totals"""
+    if session.status == 'completed':
+        recompute_totals(session.user_id)
@@ -0,0 +1,57 @@
+"""
+Hardest and easiest questions, globally and per category.
+
+QuestionAnalytics keeps a ranked_success_rate column next to its counters.
+It holds the success rate once a question has RANKING_MIN_ATTEMPTS
+attempts, and NULL before that. Grading rewrites it in the same UPDATE as
+the counters. Partial indexes on (rate, question) and (category, rate,
+question) keep the ranked rows in order, so a top-K read walks K index
+entries from either end and never sorts the table. After changing
+RANKING_MIN_ATTEMPTS, run rebuild_answer_analytics to re-rank.
+"""
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from .models import QuestionAnalytics
+
+
+def min_attempts():
+    return max(getattr(settings, 'RANKING_MIN_ATTEMPTS', 20), 1)
+
+
+def ranked_rate(total_attempts, correct_attempts):
+    """Success rate in percent, or None while there are too few attempts to rank"""
+    if total_attempts < min_attempts():
+        return None
+    return correct_attempts * 100.0 / total_attempts
+
+
+def ranked_rate_after_attempt(correct):
+    """UPDATE expression for ranked_success_rate after one more (correct or wrong) attempt"""
+    return Case(
+        When(
+            total_attempts__gte=min_attempts() - 1,
+            then=100.0 * (F('correct_attempts') + (1 if correct else 0)) / (F('total_attempts') + 1)
+        ),
+        default=Value(None),
+        output_field=FloatField()
+    )
+
+
+def top_questions(k=5, hardest=True, category_id=None):
+    """The k ranked questions with the lowest (or highest) success rate"""
+    rows = QuestionAnalytics.objects.filter(ranked_success_rate__isnull=False)
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    order = ('ranked_success_rate', 'question_id') if hardest else ('-ranked_success_rate', '-question_id')
+
+    ranking = []
+    for qa in rows.select_related('question').order_by(*order)[:k]:
+        ranking.append({
+            'question_id': qa.question_id,
+            'question_text': (qa.question.question_text[:50] + '...') if qa.question.question_text else 'No text available',
+            'category_id': qa.category_id,
+            'success_rate': round(qa.ranked_success_rate, 1),
+            'total_attempts': qa.total_attempts,
+            'correct_attempts': qa.correct_attempts
+        })
+    return ranking
@@ -0,0 +1,328 @@
+"""
+Incrementally maintained counters behind the admin analytics: DailyStats
+for the scalar summary and HourlyScoreStats (completed tests per hour and
+score) for the time series and score histograms. ScoreHistogram keeps
+completed tests per score for each month and all-time, for percentile
+ranks.
+
+Every event adds to its day's row and to the all-time row with an F()
+update, so reading any period costs one query over at most ``days + 1``
+rows, however much history there is. "Active users" is kept exact by
+counting each active user on the day of their latest login and moving
+that count when they log in again. rebuild() recomputes everything from
+the raw tables (backfill, or repair after bulk changes that skip
+signals).
+
+Time series are grouped from the hourly rows, never from raw TestSession
+rows, and kept briefly in process memory per (range, bucket).
+"""
+from copy import copy
+from datetime import date, timedelta, timezone as dt_timezone
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncHour, TruncMonth
+from django.utils import timezone
+from .cache import TTLCache
+from .models import DailyStats, HourlyScoreStats, ScoreHistogram, TestSession
+
+ALL_TIME_DAY = date.min
+MAX_SCORE = 20
+BUCKETS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+_series_cache = TTLCache(maxsize=256, ttl=60)
+
+COUNTERS = ('tests_started', 'tests_completed', 'tests_passed', 'score_sum', 'new_users', 'last_login_users')
+
+
+def _day(value):
+    return timezone.localdate(value) if value else None
+
+
+def bump(day, all_time=True, **deltas):
+    """Add deltas to the day's row (and the all-time row), creating rows as needed"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or day is None:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    for target in ((day, ALL_TIME_DAY) if all_time else (day,)):
+        if not DailyStats.objects.filter(day=target).update(**updates):
+            DailyStats.objects.get_or_create(day=target)
+            DailyStats.objects.filter(day=target).update(**updates)
+
+
+def record_test_started(session):
+    bump(_day(session.time_started), tests_started=1)
+
+
+def _completion_deltas(session, sign=1):
+    return {
+        'tests_completed': sign,
+        'tests_passed': sign if session.passed else 0,
+        'score_sum': sign * (session.score or 0),
+    }
+
+
+def _hour(value):
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def bump_hourly(session, sign=1):
+    if session.time_started is None or session.score is None:
+        return
+    key = {'hour': _hour(session.time_started), 'score': session.score}
+    updates = {'completed': F('completed') + sign}
+    if session.passed:
+        updates['passed'] = F('passed') + sign
+    if not HourlyScoreStats.objects.filter(**key).update(**updates):
+        HourlyScoreStats.objects.get_or_create(**key)
+        HourlyScoreStats.objects.filter(**key).update(**updates)
+
+
+def _month(value):
+    day = _day(value)
+    return day.replace(day=1) if day else None
+
+
+def bump_histogram(session, sign=1):
+    if session.score is None:
+        return
+    for period in (_month(session.time_started), ALL_TIME_DAY):
+        if period is None:
+            continue
+        key = {'period': period, 'score': session.score}
+        if not ScoreHistogram.objects.filter(**key).update(completed=F('completed') + sign):
+            ScoreHistogram.objects.get_or_create(**key)
+            ScoreHistogram.objects.filter(**key).update(completed=F('completed') + sign)
+
+
+def record_test_completed(session):
+    bump(_day(session.time_started), **_completion_deltas(session))
+    bump_hourly(session)
+    bump_histogram(session)
+
+
+def _with_result(session, result):
+    before = copy(session)
+    before.score, before.passed = result
+    return before
+
+
+def record_test_edited(session, old_result):
+    """Move a completed test whose (score, passed) was edited from its old result to the new one"""
+    before = _with_result(session, old_result)
+    old, new = _completion_deltas(before), _completion_deltas(session)
+    bump(_day(session.time_started), **{field: new[field] - old[field] for field in new})
+    bump_hourly(before, sign=-1)
+    bump_hourly(session)
+    bump_histogram(before, sign=-1)
+    bump_histogram(session)
+
+
+def record_test_deleted(session):
+    deltas = {'tests_started': -1}
+    if session.status == 'completed':
+        deltas.update(_completion_deltas(session, sign=-1))
+        bump_hourly(session, sign=-1)
+        bump_histogram(session, sign=-1)
+    bump(_day(session.time_started), **deltas)
+
+
+def record_users_joined(users):
+    """New accounts, including bulk-created ones that never sent post_save"""
+    per_day = {}
+    for user in users:
+        day = _day(user.date_joined)
+        per_day[day] = per_day.get(day, 0) + 1
+    for day, count in per_day.items():
+        bump(day, new_users=count)
+
+
+def record_user_deleted(user):
+    bump(_day(user.date_joined), new_users=-1)
+    if user.is_active:
+        move_last_login(user.last_login, None)
+
+
+def move_last_login(previous, current):
+    """An active user's latest login moved from one day to another (None: not counted)"""
+    previous, current = _day(previous), _day(current)
+    if previous == current:
+        return
+    bump(previous, all_time=False, last_login_users=-1)
+    bump(current, all_time=False, last_login_users=1)
+
+
+def period_stats(days):
+    """Totals for the last ``days`` days plus all-time totals, from one query"""
+    start = timezone.localdate() - timedelta(days=days)
+    rows = DailyStats.objects.filter(Q(day__gte=start) | Q(day=ALL_TIME_DAY)).values('day', *COUNTERS)
+    period = dict.fromkeys(COUNTERS, 0)
+    all_time = dict.fromkeys(COUNTERS, 0)
+    for row in rows:
+        target = all_time if row.pop('day') == ALL_TIME_DAY else period
+        for field, value in row.items():
+            target[field] += value
+    return period, all_time
+
+
+def percentile_ranks(**scores):
+    """
+    For each named score, the share (in percent) of completed tests that
+    scored lower, all-time and this month. One query over at most
+    2 * (MAX_SCORE + 1) histogram rows, however many tests there are.
+    """
+    month = timezone.localdate().replace(day=1)
+    histograms = {ALL_TIME_DAY: [0] * (MAX_SCORE + 1), month: [0] * (MAX_SCORE + 1)}
+    rows = ScoreHistogram.objects.filter(period__in=list(histograms)).values_list('period', 'score', 'completed')
+    for period, score, completed in rows:
+        histograms[period][min(max(score, 0), MAX_SCORE)] += completed
+
+    ranks = {}
+    for label, period in (('all_time', ALL_TIME_DAY), ('this_month', month)):
+        histogram = histograms[period]
+        total = sum(histogram)
+        ranks[label] = {
+            name: round(sum(histogram[:min(max(score, 0), MAX_SCORE)]) / total * 100, 1)
+            if total and score is not None else None
+            for name, score in scores.items()
+        }
+    return ranks
+
+
+@transaction.atomic
+def rebuild():
+    """Recompute every DailyStats, HourlyScoreStats and ScoreHistogram row from users and test sessions"""
+    per_day = {}
+
+    def add(day, field, value):
+        if day is not None and value:
+            row = per_day.setdefault(day, dict.fromkeys(COUNTERS, 0))
+            row[field] += value
+
+    sessions = TestSession.objects.annotate(day=TruncDate('time_started')).values('day').annotate(
+        started=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        passed=Count('id', filter=Q(status='completed', passed=True)),
+        scores=Sum('score', filter=Q(status='completed')),
+    )
+    for row in sessions:
+        add(row['day'], 'tests_started', row['started'])
+        add(row['day'], 'tests_completed', row['completed'])
+        add(row['day'], 'tests_passed', row['passed'])
+        add(row['day'], 'score_sum', row['scores'] or 0)
+
+    for row in User.objects.annotate(day=TruncDate('date_joined')).values('day').annotate(n=Count('id')):
+        add(row['day'], 'new_users', row['n'])
+
+    logins = User.objects.filter(is_active=True, last_login__isnull=False).annotate(
+        day=TruncDate('last_login')
+    ).values('day').annotate(n=Count('id'))
+    for row in logins:
+        add(row['day'], 'last_login_users', row['n'])
+
+    all_time = dict.fromkeys(COUNTERS, 0)
+    for row in per_day.values():
+        for field in COUNTERS:
+            if field != 'last_login_users':
+                all_time[field] += row[field]
+
+    hourly = TestSession.objects.filter(status='completed', score__isnull=False).annotate(
+        hour=TruncHour('time_started', tzinfo=dt_timezone.utc)
+    ).values('hour', 'score').annotate(
+        completed=Count('id'),
+        passed=Count('id', filter=Q(passed=True)),
+    )
+    HourlyScoreStats.objects.all().delete()
+    HourlyScoreStats.objects.bulk_create([HourlyScoreStats(**row) for row in hourly], batch_size=1000)
+    _series_cache.clear()
+
+    scored = TestSession.objects.filter(status='completed', score__isnull=False)
+    monthly = scored.annotate(
+        period=TruncMonth('time_started', output_field=DateField())
+    ).values('period', 'score').annotate(completed=Count('id'))
+    all_time_scores = scored.values('score').annotate(completed=Count('id'))
+    ScoreHistogram.objects.all().delete()
+    ScoreHistogram.objects.bulk_create(
+        [ScoreHistogram(**row) for row in monthly] +
+        [ScoreHistogram(period=ALL_TIME_DAY, **row) for row in all_time_scores],
+        batch_size=1000
+    )
+
+    DailyStats.objects.all().delete()
+    DailyStats.objects.bulk_create(
+        [DailyStats(day=day, **row) for day, row in per_day.items()] +
+        [DailyStats(day=ALL_TIME_DAY, **all_time)],
+        batch_size=1000
+    )
+    return len(per_day)
+
+
+def _bucket_start(moment, bucket):
+    moment = _hour(moment)
+    if bucket == 'hour':
+        return moment
+    moment = moment.replace(hour=0)
+    if bucket == 'week':
+        moment -= timedelta(days=moment.weekday())
+    return moment
+
+
+def time_series(days, bucket):
+    """
+    Completed tests, passes and average score per bucket (hour/day/week, UTC,
+    weeks start on Monday) over the last ``days`` days, with empty buckets
+    included, plus the score histogram for the whole range.
+    """
+    end = _hour(timezone.now()) + timedelta(hours=1)
+    start = _bucket_start(end - timedelta(days=days), bucket)
+    key = (start, end, bucket)
+    cached = _series_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = HourlyScoreStats.objects.filter(hour__gte=start, hour__lt=end)
+    step = BUCKETS[bucket]
+    buckets = {}
+    moment = start
+    while moment < end:
+        buckets[moment] = {'start': moment, 'tests': 0, 'passed': 0, 'score_sum': 0}
+        moment += step
+    for row in rows.values('hour').annotate(
+        completed_sum=Sum('completed'),
+        passed_sum=Sum('passed'),
+        score_total=Sum(F('score') * F('completed')),
+    ):
+        entry = buckets[_bucket_start(row['hour'], bucket)]
+        entry['tests'] += row['completed_sum']
+        entry['passed'] += row['passed_sum']
+        entry['score_sum'] += row['score_total']
+
+    histogram = [0] * (MAX_SCORE + 1)
+    for row in rows.values('score').annotate(n=Sum('completed')):
+        histogram[min(max(row['score'], 0), MAX_SCORE)] += row['n']
+
+    series = []
+    for entry in buckets.values():
+        tests = entry.pop('tests')
+        score_sum = entry.pop('score_sum')
+        series.append({
+            **entry,
+            'tests': tests,
+            'pass_rate': round(entry['passed'] / tests * 100, 1) if tests else None,
+            'average_score': round(score_sum / tests, 1) if tests else None,
+        })
+
+    result = {
+        'bucket': bucket,
+        'start': start,
+        'end': end,
+        'series': series,
+        'score_histogram': histogram,
+    }
+    _series_cache.set(key, result)
+    return result
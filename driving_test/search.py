@@ -0,0 +1,212 @@
+"""
+In-memory prefix index used by the autocomplete endpoint.
+
+Tokens from question text and category names are normalised (accents
+stripped, case folded) and kept in a sorted array so a prefix lookup is a
+bisect followed by a short scan. Each token points to a posting list of
+document ids kept newest-first, which lets us stream the top matches
+without looking at the whole candidate set.
+
+Every worker process builds its own index. Saves in the process patch it
+through signals, and it is reloaded whenever the catalog version has
+moved on since it was loaded, which also picks up changes made by other
+workers or by queryset updates that send no signals.
+"""
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from heapq import merge
+
+TOKEN_RE = re.compile(r'\w+')
+MIN_TOKEN_LENGTH = 2
+LABEL_LENGTH = 80
+
+
+def normalize(text):
+    """Strip accents and case-fold text so lookups are forgiving"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.casefold()
+
+
+def tokenize(text):
+    """Return the distinct normalised tokens of text, in order of appearance"""
+    seen = []
+    for token in TOKEN_RE.findall(normalize(text)):
+        if len(token) >= MIN_TOKEN_LENGTH and token not in seen:
+            seen.append(sys.intern(token))
+    return seen
+
+
+class PrefixIndex:
+    """Sorted token array with newest-first posting lists"""
+
+    def __init__(self):
+        self._tokens = []      # sorted list of distinct tokens
+        self._postings = {}    # token -> ascending array of negated doc ids
+        self._doc_tokens = {}  # doc id -> tuple of tokens
+        self._labels = {}      # doc id -> display label
+
+    def __len__(self):
+        return len(self._doc_tokens)
+
+    def add(self, doc_id, text, label=None):
+        self.remove(doc_id)
+        tokens = tuple(tokenize(text))
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = array('q')
+                insort(self._tokens, token)
+            insort(postings, -doc_id)
+        self._doc_tokens[doc_id] = tokens
+        self._labels[doc_id] = (label if label is not None else text)[:LABEL_LENGTH]
+
+    def bulk_load(self, docs):
+        """Replace the contents from (doc_id, text) pairs, sorting each posting list once"""
+        postings = {}
+        self._doc_tokens = {}
+        self._labels = {}
+        for doc_id, text in docs:
+            tokens = tuple(tokenize(text))
+            for token in tokens:
+                postings.setdefault(token, []).append(-doc_id)
+            self._doc_tokens[doc_id] = tokens
+            self._labels[doc_id] = text[:LABEL_LENGTH]
+        self._postings = {token: array('q', sorted(ids)) for token, ids in postings.items()}
+        self._tokens = sorted(self._postings)
+
+    def remove(self, doc_id):
+        tokens = self._doc_tokens.pop(doc_id, None)
+        if tokens is None:
+            return
+        self._labels.pop(doc_id, None)
+        for token in tokens:
+            postings = self._postings[token]
+            i = bisect_left(postings, -doc_id)
+            if i < len(postings) and postings[i] == -doc_id:
+                del postings[i]
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def _matching_tokens(self, prefix):
+        i = bisect_left(self._tokens, prefix)
+        tokens = []
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            tokens.append(self._tokens[i])
+            i += 1
+        return tokens
+
+    def search(self, query, limit=10):
+        """Return up to limit (doc_id, label) pairs matching every query term as a prefix"""
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+
+        matches = [self._matching_tokens(term) for term in terms]
+        if not all(matches):
+            return []
+
+        # Stream the most selective term and check the others per document
+        order = sorted(range(len(terms)), key=lambda i: len(matches[i]))
+        driver, others = order[0], [terms[i] for i in order[1:]]
+        stream = merge(*(self._postings[token] for token in matches[driver]))
+
+        results = []
+        last = None
+        for neg_id in stream:
+            if neg_id == last:
+                continue
+            last = neg_id
+            doc_id = -neg_id
+            doc_tokens = self._doc_tokens[doc_id]
+            if all(any(t.startswith(term) for t in doc_tokens) for term in others):
+                results.append((doc_id, self._labels[doc_id]))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class AutocompleteIndex:
+    """Question and category prefix indexes, built lazily and reloaded when the catalog version changes"""
+
+    def __init__(self):
+        self.questions = PrefixIndex()
+        self.categories = PrefixIndex()
+        self.loaded = False
+        self.version = None  # catalog version the index was loaded at
+        self.lock = threading.RLock()
+
+    def load(self, questions, categories, version=None):
+        """Populate from iterables of (id, text) pairs"""
+        with self.lock:
+            self.questions = PrefixIndex()
+            self.categories = PrefixIndex()
+            self.questions.bulk_load(questions)
+            self.categories.bulk_load(categories)
+            self.version = version
+            self.loaded = True
+
+    def ensure_loaded(self):
+        from .catalog import get_version
+        from .models import Question, QuestionCategory
+        # Read before the rows, so a change made while loading triggers another reload
+        version = get_version()
+        if self.loaded and self.version == version:
+            return
+        with self.lock:
+            if not self.loaded or self.version != version:
+                self.load(
+                    Question.objects.filter(is_active=True).values_list('id', 'question_text').iterator(),
+                    QuestionCategory.objects.values_list('id', 'name').iterator(),
+                    version,
+                )
+
+    def update_question(self, question):
+        if not self.loaded:
+            return
+        with self.lock:
+            if question.is_active:
+                self.questions.add(question.pk, question.question_text)
+            else:
+                self.questions.remove(question.pk)
+
+    def remove_question(self, pk):
+        if self.loaded:
+            with self.lock:
+                self.questions.remove(pk)
+
+    def update_category(self, category):
+        if self.loaded:
+            with self.lock:
+                self.categories.add(category.pk, category.name)
+
+    def remove_category(self, pk):
+        if self.loaded:
+            with self.lock:
+                self.categories.remove(pk)
+
+    def search(self, query, limit=10):
+        """Categories first, then questions, newest first within each group"""
+        self.ensure_loaded()
+        with self.lock:
+            categories = self.categories.search(query, limit)
+            questions = self.questions.search(query, limit - len(categories))
+        return (
+            [{'type': 'category', 'id': pk, 'text': label} for pk, label in categories] +
+            [{'type': 'question', 'id': pk, 'text': label} for pk, label in questions]
+        )
+
+    def reset(self):
+        with self.lock:
+            self.questions = PrefixIndex()
+            self.categories = PrefixIndex()
+            self.loaded = False
+            self.version = None
+
+
+autocomplete_index = AutocompleteIndex()
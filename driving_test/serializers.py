@@ -5,15 +5,19 @@ from .models import (
     QuestionCategory, Question, AnswerOption, 
     UserProfile, TestSession, TestAnswer
 )
+from .images import best_variant_url
+from .backends import users_with_email
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     password_confirm = serializers.CharField(write_only=True)
+    # Clients that use signed access tokens opt in (see tokens.py)
+    token_pair = serializers.BooleanField(write_only=True, required=False, default=False)
     
     class Meta:
         model = User
-        fields = ('username', 'email', 'password', 'password_confirm', 'first_name', 'last_name')
+        fields = ('username', 'email', 'password', 'password_confirm', 'first_name', 'last_name', 'token_pair')
         extra_kwargs = {
             'email': {'required': True},
             'username': {'required': False, 'min_length': 3, 'max_length': 150},
@@ -21,6 +25,11 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             'last_name': {'required': False},
         }
     
+    def validate_email(self, value):
+        if users_with_email(value).exists():
+            raise serializers.ValidationError('A user with this email already exists')
+        return value
+
     def validate(self, attrs):
         if attrs['password'] != attrs['password_confirm']:
             raise serializers.ValidationError("Passwords don't match")
@@ -28,6 +37,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password_confirm')
+        validated_data.pop('token_pair', None)
         user = User.objects.create_user(**validated_data)
         # Remove the explicit UserProfile creation since the post_save signal handles it
         # UserProfile.objects.create(user=user)  # <-- This line should be removed
@@ -38,6 +48,10 @@ class UserLoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=False, allow_blank=True)
     email = serializers.EmailField(required=False, allow_blank=True)
     password = serializers.CharField(write_only=True)
+    # Browser clients that rely on cookies opt in; token clients get no server-side session
+    session = serializers.BooleanField(required=False, default=False)
+    # Likewise for the signed access/refresh pair, which stores a RefreshToken row
+    token_pair = serializers.BooleanField(required=False, default=False)
     
     def validate(self, attrs):
         username = attrs.get('username')
@@ -47,19 +61,14 @@ class UserLoginSerializer(serializers.Serializer):
         if not password:
             raise serializers.ValidationError('Password is required')
 
-        # Try to resolve username from email if not given
-        if not username and email:
-            user = User.objects.filter(email=email).first()
-            if user:
-                username = user.username
-            else:
-                raise serializers.ValidationError('No user found with this email')
-
-        if not username:
+        if username:
+            user = authenticate(username=username, password=password)
+        elif email:
+            # One indexed lookup by email; see backends.EmailBackend
+            user = authenticate(email=email, password=password)
+        else:
             raise serializers.ValidationError('Username or email is required')
 
-        user = authenticate(username=username, password=password)
-
         if not user:
             raise serializers.ValidationError('Invalid credentials')
 
@@ -91,7 +100,11 @@ class QuestionCategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'description', 'question_count', 'created_at')
     
     def get_question_count(self, obj):
-        return obj.questions.filter(is_active=True).count()
+        # Listings annotate the count in one grouped query; fall back for single objects
+        count = getattr(obj, 'active_question_count', None)
+        if count is None:
+            count = obj.questions.filter(is_active=True).count()
+        return count
 
 
 class AnswerOptionSerializer(serializers.ModelSerializer):
@@ -120,10 +133,11 @@ class QuestionSerializer(serializers.ModelSerializer):
         )
     
     def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.image.url) if request else obj.image.url
-        return None
+        request = self.context.get('request')
+        url = best_variant_url(obj, request)
+        if url and request:
+            return request.build_absolute_uri(url)
+        return url
 
 
 class QuestionWithAnswerSerializer(serializers.ModelSerializer):
@@ -140,10 +154,11 @@ class QuestionWithAnswerSerializer(serializers.ModelSerializer):
         )
     
     def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.image.url) if request else obj.image.url
-        return None
+        request = self.context.get('request')
+        url = best_variant_url(obj, request)
+        if url and request:
+            return request.build_absolute_uri(url)
+        return url
 
 
 class QuestionDetailSerializer(serializers.ModelSerializer):
@@ -162,10 +177,11 @@ class QuestionDetailSerializer(serializers.ModelSerializer):
         )
     
     def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.image.url) if request else obj.image.url
-        return None
+        request = self.context.get('request')
+        url = best_variant_url(obj, request)
+        if url and request:
+            return request.build_absolute_uri(url)
+        return url
 
 
 class TestAnswerSerializer(serializers.ModelSerializer):
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User, update_last_login
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_token, invalidate_user
+from .models import Question, AnswerOption, QuestionCategory, CatalogTombstone, QuestionAnalytics, TestSession
+from . import leaderboard, profiles, rollups
+from .catalog import bump_version
+from .search import autocomplete_index
+
+
+# Keep the autocomplete index in step with the question bank
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, **kwargs):
+    autocomplete_index.update_question(instance)
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, **kwargs):
+    autocomplete_index.remove_question(instance.pk)
+
+
+@receiver(post_save, sender=QuestionCategory)
+def index_category(sender, instance, **kwargs):
+    autocomplete_index.update_category(instance)
+
+
+@receiver(post_delete, sender=QuestionCategory)
+def unindex_category(sender, instance, **kwargs):
+    autocomplete_index.remove_category(instance.pk)
+
+
+# Delta sync tracks questions by updated_at, so option edits touch their question
+@receiver(post_save, sender=AnswerOption)
+@receiver(post_delete, sender=AnswerOption)
+def touch_question(sender, instance, **kwargs):
+    Question.objects.filter(pk=instance.question_id).update(updated_at=timezone.now())
+
+
+# Rankings per category read the category stored on QuestionAnalytics
+@receiver(post_save, sender=Question)
+def sync_analytics_category(sender, instance, created, **kwargs):
+    if not created:
+        QuestionAnalytics.objects.filter(question=instance).exclude(
+            category_id=instance.category_id
+        ).update(category_id=instance.category_id)
+
+
+@receiver(post_delete, sender=Question)
+def question_tombstone(sender, instance, **kwargs):
+    CatalogTombstone.objects.create(kind='question', object_id=instance.pk)
+
+
+@receiver(post_delete, sender=QuestionCategory)
+def category_tombstone(sender, instance, **kwargs):
+    CatalogTombstone.objects.create(kind='category', object_id=instance.pk)
+
+
+# Any change to the question bank invalidates catalog ETags
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=AnswerOption)
+@receiver(post_delete, sender=AnswerOption)
+@receiver(post_save, sender=QuestionCategory)
+@receiver(post_delete, sender=QuestionCategory)
+def catalog_changed(sender, **kwargs):
+    bump_version()
+
+
+# Drop cached token lookups on logout and whenever the user record changes
+@receiver(post_delete, sender=Token)
+def uncache_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def uncache_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # A login only bumps last_login, which the cached snapshot does not need
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_user(instance.pk)
+
+
+# Write last_login at most once per LAST_LOGIN_UPDATE_INTERVAL instead of on every login
+user_logged_in.disconnect(update_last_login, dispatch_uid='update_last_login')
+
+
+@receiver(user_logged_in)
+def throttled_last_login(sender, user, **kwargs):
+    now = timezone.now()
+    interval = getattr(settings, 'LAST_LOGIN_UPDATE_INTERVAL', timedelta(hours=1))
+    if user.last_login and now - user.last_login < interval:
+        return
+    # A queryset update skips post_save, so cached token lookups stay valid
+    User.objects.filter(pk=user.pk).update(last_login=now)
+    if user.is_active:
+        rollups.move_last_login(user.last_login, now)
+    user.last_login = now
+
+
+# Daily rollups behind admin_analytics (see rollups.py)
+@receiver(pre_save, sender=User)
+def remember_login_state(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields and not {'is_active', 'last_login'} & set(update_fields)):
+        return
+    instance._rollup_login_state = User.objects.filter(pk=instance.pk).values_list(
+        'is_active', 'last_login'
+    ).first()
+
+
+@receiver(post_save, sender=User)
+def rollup_user_saved(sender, instance, created, **kwargs):
+    current = instance.last_login if instance.is_active else None
+    if created:
+        rollups.record_users_joined([instance])
+        rollups.move_last_login(None, current)
+        return
+    state = getattr(instance, '_rollup_login_state', None)
+    if state is not None:
+        was_active, last_login = state
+        rollups.move_last_login(last_login if was_active else None, current)
+        instance._rollup_login_state = None
+
+
+@receiver(post_delete, sender=User)
+def rollup_user_deleted(sender, instance, **kwargs):
+    rollups.record_user_deleted(instance)
+
+
+@receiver(post_delete, sender=TestSession)
+def rollup_test_deleted(sender, instance, **kwargs):
+    rollups.record_test_deleted(instance)
+
+
+@receiver(post_delete, sender=TestSession)
+def profile_test_deleted(sender, instance, **kwargs):
+    profiles.record_deletion(instance)
+
+
+# Deleted results and users leave the leaderboards of every process (see leaderboard.py)
+@receiver(pre_delete, sender=User)
+def leaderboard_user_deleted(sender, instance, **kwargs):
+    leaderboard.record_user_deleted(instance)
+
+
+@receiver(post_delete, sender=TestSession)
+def leaderboard_test_deleted(sender, instance, **kwargs):
+    leaderboard.record_test_deleted(instance)
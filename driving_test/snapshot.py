@@ -0,0 +1,163 @@
+"""
+Offline copies of the question bank for the mobile app.
+
+A snapshot is a gzipped JSON Lines file named after the catalog version it
+was built from, written under MEDIA_ROOT so the front server can hand it
+out as a static precompressed file. Clients then keep up to date with the
+changes endpoint, which returns rows touched since a given version.
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from .catalog import get_version
+from .images import DEFAULT_SIZE
+from .models import Question, AnswerOption, QuestionCategory, CatalogTombstone
+
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOTS_KEPT = 3
+TOMBSTONE_RETENTION = timedelta(days=30)
+# Re-send rows changed slightly before the cursor to cover in-flight transactions
+SYNC_OVERLAP = timedelta(seconds=5)
+
+_build_lock = threading.Lock()
+
+
+def version_to_datetime(version):
+    """The time a catalog version stands for; raises ValueError if it is out of range"""
+    try:
+        return datetime.fromtimestamp(version / 1000, tz=dt_timezone.utc)
+    except (OverflowError, OSError) as e:
+        raise ValueError('Invalid version') from e
+
+
+def snapshot_name(version):
+    return f'catalog-{version}.jsonl.gz'
+
+
+def snapshot_path(version):
+    return os.path.join(settings.MEDIA_ROOT, SNAPSHOT_DIR, snapshot_name(version))
+
+
+def snapshot_url(version):
+    return f'{settings.MEDIA_URL}{SNAPSHOT_DIR}/{snapshot_name(version)}'
+
+
+def category_rows(queryset):
+    for category in queryset.values('id', 'name', 'description'):
+        yield {'type': 'category', **category}
+
+
+def question_rows(queryset):
+    """Yield question dicts with their options, in chunks to bound memory"""
+    fields = ('id', 'question_text', 'category_id', 'difficulty', 'image', 'image_variants', 'explanation')
+    chunk = []
+    for question in queryset.order_by('id').values(*fields).iterator(chunk_size=2000):
+        chunk.append(question)
+        if len(chunk) == 2000:
+            yield from _with_options(chunk)
+            chunk = []
+    if chunk:
+        yield from _with_options(chunk)
+
+
+def _with_options(questions):
+    options = {}
+    for option in AnswerOption.objects.filter(
+        question_id__in=[q['id'] for q in questions]
+    ).order_by('order', 'id').values('id', 'question_id', 'option_text', 'is_correct', 'order'):
+        options.setdefault(option.pop('question_id'), []).append(option)
+
+    for question in questions:
+        image = question.pop('image')
+        large = (question.pop('image_variants') or {}).get(DEFAULT_SIZE)
+        if large:
+            image = large['default']
+        question['category'] = question.pop('category_id')
+        yield {
+            'type': 'question',
+            **question,
+            'image_url': f'{settings.MEDIA_URL}{image}' if image else None,
+            'options': options.get(question['id'], []),
+        }
+
+
+def build_snapshot(version=None):
+    """Write the snapshot for the given (or current) version unless it already exists"""
+    version = version or get_version()
+    path = snapshot_path(version)
+    if os.path.exists(path):
+        return path
+
+    with _build_lock:
+        if os.path.exists(path):
+            return path
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # _build_lock only covers this process: each writer gets its own file
+        # and the last rename wins, with identical content
+        fd, tmp_path = tempfile.mkstemp(prefix=f'{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as out:
+                out.write(json.dumps({
+                    'type': 'meta',
+                    'version': version,
+                    'generated_at': timezone.now().isoformat(),
+                }) + '\n')
+                for row in category_rows(QuestionCategory.objects.order_by('name')):
+                    out.write(json.dumps(row, ensure_ascii=False) + '\n')
+                for row in question_rows(Question.objects.filter(is_active=True)):
+                    out.write(json.dumps(row, ensure_ascii=False) + '\n')
+            # mkstemp creates the file readable by its owner only; the front server serves it
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        _prune_snapshots(directory)
+    return path
+
+
+def _prune_snapshots(directory):
+    names = sorted(
+        (name for name in os.listdir(directory) if name.startswith('catalog-') and name.endswith('.jsonl.gz')),
+        key=lambda name: int(name[len('catalog-'):-len('.jsonl.gz')]),
+    )
+    for name in names[:-SNAPSHOTS_KEPT]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # pruned by another worker meanwhile
+
+
+def changes_since(version):
+    """
+    Rows changed after the given version, or None when the version predates
+    the tombstone retention window and the client must reload the snapshot.
+    """
+    since = version_to_datetime(version)
+    if since < timezone.now() - TOMBSTONE_RETENTION:
+        return None
+    since -= SYNC_OVERLAP
+
+    changed = Question.objects.filter(updated_at__gt=since)
+    tombstones = CatalogTombstone.objects.filter(deleted_at__gt=since)
+    return {
+        'categories': list(category_rows(QuestionCategory.objects.filter(updated_at__gt=since))),
+        'questions': list(question_rows(changed.filter(is_active=True))),
+        'removed_questions': sorted(
+            set(changed.filter(is_active=False).values_list('id', flat=True)) |
+            set(tombstones.filter(kind='question').values_list('object_id', flat=True))
+        ),
+        'removed_categories': sorted(tombstones.filter(kind='category').values_list('object_id', flat=True)),
+    }
+
+
+def prune_tombstones():
+    return CatalogTombstone.objects.filter(
+        deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION
+    ).delete()[0]
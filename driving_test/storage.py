@@ -0,0 +1,55 @@
+"""
+Content-addressed file storage for question media.
+
+Files are stored as ``<upload_to>/<h[:2]>/<sha256><ext>``, so uploading a
+picture that is already stored returns the existing name instead of
+writing a second copy. Because a name can never point at different bytes,
+these URLs can be cached by clients forever.
+"""
+import hashlib
+import os
+import posixpath
+import re
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}\.[A-Za-z0-9]+$')
+
+
+def hash_content(content):
+    """SHA-256 hex digest of a Django File, leaving it rewound"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    dirname, filename = posixpath.split(name)
+    ext = os.path.splitext(filename)[1].lower()
+    return posixpath.join(dirname, digest[:2], digest + ext)
+
+
+def is_content_addressed(name):
+    return bool(HASHED_NAME_RE.search(name or ''))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and stores duplicates once"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(self.generate_filename(name), hash_content(content))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+question_image_storage = ContentAddressedStorage()
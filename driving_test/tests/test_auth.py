@@ -0,0 +1,221 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from driving_test.authentication import token_cache
+from driving_test.backends import users_with_email
+from driving_test.models import RefreshToken
+from driving_test.throttling import LoginAccountThrottle, LoginIPThrottle
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(username='cached', email='cached@example.com', password='test12345')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cache_hit_needs_no_queries(self):
+        response = self.client.get('/driving_test/categories/')
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/driving_test/categories/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get('/driving_test/categories/')
+        response = self.client.post('/driving_test/auth/logout/')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/driving_test/categories/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_revocation_by_another_worker(self):
+        self.client.get('/driving_test/categories/')
+        # Another worker handles the logout: this worker's own entry survives
+        entry = token_cache.get(self.token.key)
+        self.token.delete()
+        token_cache.set(self.token.key, entry)
+
+        response = self.client.get('/driving_test/categories/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_invalidates_cached_user(self):
+        self.client.get('/driving_test/categories/')
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get('/driving_test/categories/')
+        self.assertEqual(response.status_code, 401)
+
+
+class SignedAccessTokenTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='signed', email='signed@example.com', password='test12345')
+        self.client = APIClient()
+        response = self.client.post(
+            '/driving_test/auth/login/', {'username': 'signed', 'password': 'test12345', 'token_pair': True}
+        )
+        self.tokens = response.data
+
+    def test_login_issues_pair_next_to_legacy_token(self):
+        self.assertIn('token', self.tokens)
+        self.assertIn('access_token', self.tokens)
+        self.assertIn('refresh_token', self.tokens)
+
+    def test_pair_is_opt_in(self):
+        response = self.client.post('/driving_test/auth/login/', {'username': 'signed', 'password': 'test12345'})
+        self.assertIn('token', response.data)
+        self.assertNotIn('refresh_token', response.data)
+        self.assertEqual(RefreshToken.objects.count(), 1)
+
+    def test_purge_deletes_expired_and_revoked_refresh_tokens(self):
+        response = self.client.post('/driving_test/auth/token/refresh/', {'refresh_token': self.tokens['refresh_token']})
+        live = response.data['refresh_token']
+        self.client.post('/driving_test/auth/login/', {'username': 'signed', 'password': 'test12345', 'token_pair': True})
+        # The pair from that second login has expired; the first was revoked by the refresh
+        RefreshToken.objects.filter(pk=RefreshToken.objects.latest('pk').pk).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        call_command('purge_sessions', stdout=StringIO())
+        self.assertEqual(RefreshToken.objects.count(), 1)
+        response = self.client.post('/driving_test/auth/token/refresh/', {'refresh_token': live})
+        self.assertEqual(response.status_code, 200)
+
+    def test_access_token_authenticates_without_queries(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens["access_token"]}')
+        etag = client.get('/driving_test/categories/')['ETag']
+
+        with self.assertNumQueries(0):
+            response = client.get('/driving_test/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens["access_token"]}x')
+        self.assertEqual(client.get('/driving_test/categories/').status_code, 401)
+
+    def test_refresh_rotates_and_logout_revokes(self):
+        response = self.client.post('/driving_test/auth/token/refresh/', {'refresh_token': self.tokens['refresh_token']})
+        self.assertEqual(response.status_code, 200)
+        rotated = response.data
+
+        # The old refresh token is single use
+        response = self.client.post('/driving_test/auth/token/refresh/', {'refresh_token': self.tokens['refresh_token']})
+        self.assertEqual(response.status_code, 401)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {rotated["access_token"]}')
+        response = self.client.post('/driving_test/auth/logout/', {'refresh_token': rotated['refresh_token']})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post('/driving_test/auth/token/refresh/', {'refresh_token': rotated['refresh_token']})
+        self.assertEqual(response.status_code, 401)
+
+
+class EmailLoginTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='mail', email='Mail.User@example.com', password='test12345')
+        self.client = APIClient()
+
+    def test_email_login_is_case_insensitive_single_lookup(self):
+        with self.assertNumQueries(1):
+            user = authenticate(email='mail.user@EXAMPLE.com', password='test12345')
+        self.assertEqual(user, self.user)
+
+        response = self.client.post('/driving_test/auth/login/', {'email': 'mail.user@example.com', 'password': 'wrong-pass'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_email_lookup_uses_unique_index(self):
+        plan = users_with_email('mail.user@example.com').explain()
+        self.assertIn('auth_user_email_lower_uniq', plan)
+
+    def test_registration_rejects_duplicate_email(self):
+        response = self.client.post('/driving_test/auth/register/', {
+            'username': 'other',
+            'email': 'MAIL.user@example.com',
+            'password': 'test12345',
+            'password_confirm': 'test12345',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+
+
+class TokenLoginSessionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='nosession', password='test12345')
+        self.client = APIClient()
+
+    def login(self, **extra):
+        return self.client.post('/driving_test/auth/login/', {'username': 'nosession', 'password': 'test12345', **extra})
+
+    def test_token_login_creates_no_session(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(Session.objects.count(), 0)
+
+        self.assertEqual(self.login(session=True).status_code, 200)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_last_login_is_throttled(self):
+        self.login()
+        self.user.refresh_from_db()
+        first = self.user.last_login
+        self.assertIsNotNone(first)
+
+        self.login()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, first)
+
+        User.objects.filter(pk=self.user.pk).update(last_login=first - timedelta(hours=2))
+        self.login()
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_login, first)
+
+
+class LoginProtectionTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='storm', password='test12345')
+        self.client = APIClient(REMOTE_ADDR='10.0.0.39')
+        self.addCleanup(LoginIPThrottle.reset)
+        self.addCleanup(LoginAccountThrottle.reset)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_account_bucket_rejects_sustained_guessing(self):
+        statuses = [
+            self.client.post('/driving_test/auth/login/', {'username': 'storm', 'password': 'wrong-pass'}).status_code
+            for _ in range(11)
+        ]
+        self.assertEqual(statuses[:10], [400] * 10)
+        self.assertEqual(statuses[10], 429)
+
+    def test_body_that_is_not_an_object_is_rejected(self):
+        response = self.client.post('/driving_test/auth/login/', [1, 2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(LOGIN_HASH_WAIT=0)
+    def test_login_is_shed_when_hashing_capacity_is_used_up(self):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch('driving_test.hashers._slots', slots):
+            response = self.client.post('/driving_test/auth/login/', {'username': 'storm', 'password': 'test12345'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('error', response.data)
+
+    @override_settings(LOGIN_HASH_WAIT=0)
+    def test_admin_login_is_shed_with_503(self):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch('driving_test.hashers._slots', slots):
+            response = Client().post('/admin/login/', {'username': 'storm', 'password': 'test12345'})
+        self.assertEqual(response.status_code, 503)
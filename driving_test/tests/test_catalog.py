@@ -0,0 +1,95 @@
+import time
+from unittest import mock
+from django.db.models import F
+from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from driving_test import catalog
+from driving_test.models import CatalogVersion, QuestionCategory, Question, AnswerOption
+
+
+class CatalogETagTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='etag', email='etag@example.com', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.category = QuestionCategory.objects.create(name='Amategeko')
+        self.question = Question.objects.create(
+            question_text='Kunyuranaho bikorerwa he?',
+            category=self.category
+        )
+        AnswerOption.objects.create(question=self.question, option_text='Ibumoso', is_correct=True, order=0)
+
+    def test_unchanged_catalog_returns_304_without_querying(self):
+        url = f'/driving_test/questions/{self.question.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_option_change_invalidates_etag(self):
+        response = self.client.get('/driving_test/questions/')
+        etag = response['ETag']
+
+        AnswerOption.objects.create(question=self.question, option_text='Iburyo', order=1)
+
+        response = self.client.get('/driving_test/questions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bump_by_another_worker_is_seen_after_ttl(self):
+        url = f'/driving_test/questions/{self.question.id}/'
+        etag = self.client.get(url)['ETag']
+        # Another worker bumps the shared row; this worker's copy has not expired yet
+        CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        later = time.monotonic() + catalog._version_cache.ttl + 1
+        with mock.patch.object(catalog._version_cache, '_timer', lambda: later):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_varies_with_image_format(self):
+        url = f'/driving_test/questions/{self.question.id}/'
+        webp = self.client.get(url, HTTP_ACCEPT='image/webp,*/*')
+        self.assertIn('Accept', webp['Vary'])
+
+        # A client that cannot decode WebP must not revalidate against the WebP variant
+        response = self.client.get(url, HTTP_ACCEPT='*/*', HTTP_IF_NONE_MATCH=webp['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], webp['ETag'])
+
+    def test_etag_varies_with_query(self):
+        first = self.client.get('/driving_test/categories/')
+        second = self.client.get('/driving_test/categories/', {'page': 2})
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+
+class CategoryListingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = QuestionCategory.objects.create(name='Amatara')
+        Question.objects.create(question_text='Amatara maremare akoreshwa ryari?', category=self.category)
+        Question.objects.create(
+            question_text='Amatara yo guhagarara ni ayahe?',
+            category=self.category,
+            is_active=False
+        )
+
+    def test_counts_active_questions_and_serves_from_memory(self):
+        response = self.client.get('/driving_test/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['question_count'], 1)
+
+        with self.assertNumQueries(0):
+            self.client.get('/driving_test/categories/')
+
+    def test_question_change_refreshes_listing(self):
+        self.client.get('/driving_test/categories/')
+        Question.objects.create(question_text='Amatara yo kuburira ni ayahe?', category=self.category)
+
+        response = self.client.get('/driving_test/categories/')
+        self.assertEqual(response.data[0]['question_count'], 2)
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from driving_test.models import QuestionCategory
+from helpers import complete_test
+
+
+class DashboardTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        QuestionCategory.objects.create(name='Road signs')
+        QuestionCategory.objects.create(name='Right of way')
+        self.user = User.objects.create_user(username='learner', password='test12345', first_name='Lee')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_sections_match_their_endpoints(self):
+        for score in (9, 14, 17):
+            complete_test(self.user, score)
+        response = self.client.get('/driving_test/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profile'], self.client.get('/driving_test/user/profile/').data)
+        self.assertEqual(response.data['history'], self.client.get('/driving_test/test/history/').data)
+        self.assertEqual(response.data['categories'], self.client.get('/driving_test/categories/').data)
+        cache.clear()
+        self.assertEqual(response.data['stats'], self.client.get('/driving_test/user/stats/').data)
+
+    def test_fixed_number_of_queries(self):
+        other = User.objects.create_user(username='veteran', password='test12345')
+        for score in range(12):
+            complete_test(other, score)
+        complete_test(self.user, 15)
+
+        counts = []
+        for user in (self.user, other):
+            self.client.force_authenticate(user=user)
+            self.client.get('/driving_test/categories/')  # same catalog state for both users
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/driving_test/dashboard/')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+        # Only the profile row the per-user cache keys are built from
+        with self.assertNumQueries(1):
+            self.client.get('/driving_test/dashboard/')
+
+    def test_sections_go_stale_independently(self):
+        complete_test(self.user, 12)
+        self.client.get('/driving_test/dashboard/')
+        complete_test(self.user, 18)
+
+        # Only stats and history are rebuilt: profile row, history page and histograms
+        with self.assertNumQueries(3):
+            response = self.client.get('/driving_test/dashboard/')
+        self.assertEqual(response.data['stats']['best_score'], 18)
+        self.assertEqual(response.data['history']['results'][0]['score'], 18)
+
+        self.user.first_name = 'Leigh'
+        self.user.save()
+        response = self.client.get('/driving_test/dashboard/', {'fields': 'profile'})
+        self.assertEqual(response.data['profile']['first_name'], 'Leigh')
+
+    def test_field_selection(self):
+        response = self.client.get('/driving_test/dashboard/', {'fields': 'stats, categories'})
+        self.assertEqual(set(response.data), {'stats', 'categories'})
+
+        response = self.client.get('/driving_test/dashboard/', {'fields': 'stats,friends'})
+        self.assertEqual(response.status_code, 400)
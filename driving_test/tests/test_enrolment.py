@@ -0,0 +1,74 @@
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from driving_test.enrolment import hash_passwords
+from driving_test.models import UserProfile
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkEnrolmentTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='school', email='school@example.com', password='test12345', is_staff=True)
+        User.objects.create_user(username='taken', email='taken@example.com', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        response = self.client.post('/driving_test/admin/enrol/', {'candidates': [
+            {'username': 'cand1', 'email': 'cand1@example.com', 'password': 'password123'},
+            {'username': 'cand2', 'email': 'cand2@example.com', 'password': 'short'},
+            {'username': 'cand3', 'email': 'TAKEN@example.com', 'password': 'password123'},
+            {'username': 'cand1', 'email': 'cand4@example.com', 'password': 'password123'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+
+        user = User.objects.get(username='cand1')
+        self.assertTrue(user.check_password('password123'))
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+        self.assertTrue(Token.objects.filter(user=user).exists())
+
+    def test_usernames_follow_registration_rules(self):
+        response = self.client.post('/driving_test/admin/enrol/', {'candidates': [
+            {'username': 'cand one', 'email': 'one@example.com', 'password': 'password123'},
+            {'username': 'cand#2', 'email': 'two@example.com', 'password': 'password123'},
+            {'username': 'cand.3', 'email': 'three@example.com', 'password': 'password123'},
+        ]}, format='json')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2])
+        self.assertIn('username', response.data['errors'][0]['errors'])
+
+    def test_names_are_validated_per_row(self):
+        response = self.client.post('/driving_test/admin/enrol/', {'candidates': [
+            {'username': 'cand1', 'email': 'one@example.com', 'password': 'password123', 'first_name': 'A' * 151},
+            {'username': 'cand2', 'email': 'two@example.com', 'password': 'password123', 'last_name': 'Uwase'},
+        ]}, format='json')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 1)
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'first_name'})
+
+    def test_csv_upload(self):
+        csv_file = SimpleUploadedFile(
+            'cohort.csv',
+            b'username,email,password,first_name\nmugabo,mugabo@example.com,password123,Eric\n',
+            content_type='text/csv'
+        )
+        response = self.client.post('/driving_test/admin/enrol/', {'file': csv_file}, format='multipart')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(User.objects.get(username='mugabo').first_name, 'Eric')
+
+    def test_process_pool_hashes_match_passwords(self):
+        hashes = hash_passwords(['first-pass', 'second-pass', 'third-pass'], workers=2)
+        self.assertTrue(check_password('second-pass', hashes[1]))
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=User.objects.get(username='taken'))
+        response = self.client.post('/driving_test/admin/enrol/', {'candidates': []}, format='json')
+        self.assertEqual(response.status_code, 403)
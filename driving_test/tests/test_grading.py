@@ -0,0 +1,161 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from driving_test.models import (
+    AnswerOption, AnswerOptionAnalytics, DailyStats, Question, QuestionAnalytics, QuestionCategory, TestSession,
+    UserCategoryStats, UserProfile
+)
+from driving_test.rollups import ALL_TIME_DAY
+
+
+class GradingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='grading', password='test12345')
+        self.admin = User.objects.create_user(username='grader', password='test12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        category = QuestionCategory.objects.create(name='Ibyapa')
+        self.questions = []
+        for i in range(20):
+            question = Question.objects.create(question_text=f'Icyapa {i}', category=category)
+            AnswerOption.objects.create(question=question, option_text='Yego', is_correct=True, order=0)
+            AnswerOption.objects.create(question=question, option_text='Oya', order=1)
+            AnswerOption.objects.create(question=question, option_text='Simbizi', order=2)
+            self.questions.append(question)
+
+    def payload(self, picks):
+        """picks: option order chosen per question (None leaves it unanswered)"""
+        answers = []
+        for question, order in zip(self.questions, picks):
+            option = question.options.get(order=order) if order is not None else None
+            answers.append({'question_id': question.id, 'selected_option_id': option.id if option else None})
+        return {
+            'test_session_id': TestSession.objects.create(user=self.user).id,
+            'time_taken_seconds': 300,
+            'answers': answers
+        }
+
+    def submit(self, picks):
+        return self.client.post('/driving_test/test/submit/', self.payload(picks), format='json')
+
+    def test_submit_grades_and_counts_answers(self):
+        response = self.submit([0] * 12 + [1] * 4 + [2] * 2 + [None] * 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['test_session']['score'], 12)
+        self.assertEqual(response.data['detailed_results']['answers_breakdown'][0]['correct_answer'], 'Yego')
+
+        analytics = QuestionAnalytics.objects.get(question=self.questions[0])
+        self.assertEqual((analytics.total_attempts, analytics.correct_attempts), (1, 1))
+        analytics = QuestionAnalytics.objects.get(question=self.questions[19])
+        self.assertEqual((analytics.total_attempts, analytics.correct_attempts), (1, 0))
+        self.assertEqual(AnswerOptionAnalytics.objects.get(option__question=self.questions[12], option__order=1).times_selected, 1)
+        self.assertEqual(AnswerOptionAnalytics.objects.filter(times_selected=1).count(), 18)
+
+    def test_a_session_is_counted_once(self):
+        payload = self.payload([0] * 15)
+        self.assertEqual(self.client.post('/driving_test/test/submit/', payload, format='json').status_code, 200)
+        self.assertEqual(self.client.post('/driving_test/test/submit/', payload, format='json').status_code, 400)
+
+        # Two submissions that both loaded the session while it was still in progress
+        payload = self.payload([0] * 15)
+        load = TestSession.objects.get
+
+        def load_then_race(*args, **kwargs):
+            session = load(*args, **kwargs)
+            with mock.patch.object(TestSession.objects, 'get', load):
+                response = self.client.post('/driving_test/test/submit/', payload, format='json')
+            self.assertEqual(response.status_code, 200)
+            return session
+
+        with mock.patch.object(TestSession.objects, 'get', side_effect=load_then_race):
+            response = self.client.post('/driving_test/test/submit/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.total_tests_taken, profile.score_sum), (2, 30))
+        self.assertEqual(DailyStats.objects.get(day=ALL_TIME_DAY).tests_completed, 2)
+        self.assertEqual(QuestionAnalytics.objects.get(question=self.questions[0]).total_attempts, 2)
+
+    def test_grading_queries_do_not_grow_with_answers(self):
+        # First completions with a given score also create rollup and leaderboard rows
+        self.submit([0] * 2)
+        self.submit([0] * 20)
+        few_answers, many_answers = self.payload([0] * 2), self.payload([0] * 20)
+        with CaptureQueriesContext(connection) as few:
+            self.client.post('/driving_test/test/submit/', few_answers, format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.post('/driving_test/test/submit/', many_answers, format='json')
+        self.assertEqual(len(few), len(many))
+
+    def test_distractors_and_rebuild(self):
+        self.submit([1] * 20)
+        self.submit([2] * 10 + [None] * 10)
+        self.client.force_authenticate(user=self.admin)
+        url = f'/driving_test/questions/{self.questions[15].id}/distractors/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_attempts'], 2)
+        self.assertEqual(response.data['not_answered'], 1)
+        self.assertEqual([option['times_selected'] for option in response.data['options']], [0, 1, 0])
+
+        before = response.data
+        QuestionAnalytics.objects.update(total_attempts=0)
+        AnswerOptionAnalytics.objects.all().delete()
+        call_command('rebuild_answer_analytics', chunk_size=7, stdout=StringIO())
+        self.assertEqual(self.client.get(url).data, before)
+
+    def test_distractors_are_admin_only(self):
+        response = self.client.get(f'/driving_test/questions/{self.questions[0].id}/distractors/')
+        self.assertEqual(response.status_code, 403)
+
+
+class CategoryStatsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='mastery', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.signs = QuestionCategory.objects.create(name='Ibyapa')
+        self.rules = QuestionCategory.objects.create(name='Amategeko')
+        self.options = []
+        for i, category in enumerate([self.signs] * 3 + [self.rules] * 2):
+            question = Question.objects.create(question_text=f'Ikibazo {i}', category=category)
+            self.options.append((
+                question.id,
+                AnswerOption.objects.create(question=question, option_text='Yego', is_correct=True, order=0).id,
+                AnswerOption.objects.create(question=question, option_text='Oya', order=1).id,
+            ))
+
+    def submit(self, outcomes):
+        session = TestSession.objects.create(user=self.user)
+        answers = [
+            {'question_id': question_id, 'selected_option_id': right if correct else wrong}
+            for (question_id, right, wrong), correct in zip(self.options, outcomes)
+        ]
+        self.client.post('/driving_test/test/submit/', {
+            'test_session_id': session.id, 'time_taken_seconds': 120, 'answers': answers
+        }, format='json')
+
+    def test_counts_per_category(self):
+        self.submit([True, False, True, True, True])
+        self.submit([True, True, True, False, False])
+        with self.assertNumQueries(1):
+            response = self.client.get('/driving_test/user/category-stats/')
+        self.assertEqual(
+            [(row['category_name'], row['attempts'], row['correct']) for row in response.data],
+            [('Amategeko', 4, 2), ('Ibyapa', 6, 5)]
+        )
+        self.assertEqual(response.data[1]['accuracy'], 83.3)
+
+    def test_rebuild_matches_grading(self):
+        self.submit([True, False, True, True, False])
+        self.submit([False, True])
+        before = set(UserCategoryStats.objects.values_list('user_id', 'category_id', 'attempts', 'correct'))
+        UserCategoryStats.objects.all().delete()
+        call_command('rebuild_category_stats', stdout=StringIO())
+        after = set(UserCategoryStats.objects.values_list('user_id', 'category_id', 'attempts', 'correct'))
+        self.assertEqual(before, after)
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from driving_test.models import TestSession
+from helpers import complete_test
+
+
+class TestHistoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_cursor_pages_through_history(self):
+        start = timezone.now() - timedelta(days=1)
+        # Pairs of tests share a start time: the cursor must still page through them in id order
+        sessions = [complete_test(self.user, 10 + i, started=start + timedelta(minutes=i // 2)) for i in range(5)]
+        TestSession.objects.create(user=self.user)  # in progress: not part of the history
+        expected = [s.id for s in sorted(sessions, key=lambda s: (s.time_started, s.id), reverse=True)]
+
+        seen = []
+        cursor = None
+        for _ in range(3):
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            # The profile row behind the ETag, then the page itself
+            with self.assertNumQueries(2):
+                response = self.client.get('/driving_test/test/history/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            cursor = response.data['next_cursor']
+        self.assertEqual(seen, expected)
+        self.assertIsNone(cursor)
+        self.assertEqual(response.data['results'][0]['username'], 'learner')
+
+    def test_unchanged_history_is_not_modified(self):
+        complete_test(self.user, 15)
+        response = self.client.get('/driving_test/test/history/')
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        # Only the profile row is read: the sessions table is not touched
+        with self.assertNumQueries(1):
+            response = self.client.get('/driving_test/test/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Another page of the same history has its own ETag
+        response = self.client.get('/driving_test/test/history/', {'limit': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_completion_and_deletion_change_etag(self):
+        first = complete_test(self.user, 15)
+        etag = self.client.get('/driving_test/test/history/')['ETag']
+
+        complete_test(self.user, 18)
+        response = self.client.get('/driving_test/test/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        etag = response['ETag']
+
+        first.delete()
+        response = self.client.get('/driving_test/test/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/driving_test/test/history/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
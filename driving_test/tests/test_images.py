@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from django.contrib.admin.sites import site
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils import timezone
+from PIL import Image
+from driving_test.media import serve_media
+from driving_test.models import QuestionCategory, Question
+from driving_test.serializers import QuestionSerializer
+
+
+def png_upload(size=(1200, 900), color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile('sign.png', buffer.getvalue(), content_type='image/png')
+
+
+class ImagePipelineTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_PIPELINE_SYNC=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.category = QuestionCategory.objects.create(name='Ibimenyetso')
+
+    def create_question(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Question.objects.create(
+                question_text='Iki cyapa gisobanura iki?',
+                category=self.category,
+                image=png_upload()
+            )
+
+    def test_upload_builds_derivatives_and_keeps_original(self):
+        question = self.create_question()
+        question.refresh_from_db()
+
+        self.assertEqual((question.image_width, question.image_height), (1200, 900))
+        self.assertEqual(question.image_variants['large']['width'], 800)
+        self.assertTrue(question.image_variants['small']['webp'].endswith('.webp'))
+        with question.image.open('rb') as f, Image.open(f) as original:
+            self.assertEqual(original.size, (1200, 900))
+
+    def test_saving_other_fields_does_not_reprocess(self):
+        question = self.create_question()
+        question = Question.objects.get(pk=question.pk)
+        question.is_active = False
+        with self.captureOnCommitCallbacks() as callbacks:
+            question.save()
+        self.assertEqual(len(callbacks), 0)
+
+    def test_image_url_prefers_webp_when_accepted(self):
+        question = self.create_question()
+        question.refresh_from_db()
+        request = RequestFactory().get('/', {'image_size': 'small'}, HTTP_ACCEPT='image/webp,*/*')
+
+        data = QuestionSerializer(question, context={'request': request}).data
+        self.assertTrue(data['image_url'].endswith(question.image_variants['small']['webp']))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_question()
+        second = self.create_question()
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^question_images/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+
+    def test_dedupe_moves_renamed_rows_into_delta_sync(self):
+        question = self.create_question()
+        legacy = 'question_images/legacy.png'
+        os.makedirs(os.path.join(self.media_root, 'question_images'), exist_ok=True)
+        shutil.copy(question.image.path, os.path.join(self.media_root, legacy))
+        synced_at = timezone.now() - timedelta(hours=1)
+        Question.objects.filter(pk=question.pk).update(image=legacy, updated_at=synced_at)
+
+        call_command('dedupe_media', stdout=StringIO())
+        question.refresh_from_db()
+        self.assertNotEqual(question.image.name, legacy)
+        self.assertGreater(question.updated_at, synced_at)
+
+    def test_content_addressed_media_is_served_immutable(self):
+        question = self.create_question()
+        response = serve_media(RequestFactory().get('/'), question.image.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_admin_thumbnail_uses_stored_variant_without_opening_files(self):
+        question = self.create_question()
+        question.refresh_from_db()
+        model_admin = site._registry[Question]
+
+        with mock.patch.object(question.image.storage, 'open', side_effect=AssertionError('file opened')):
+            html = model_admin.image_thumbnail(question)
+        self.assertIn(question.image_variants['thumb']['default'], html)
+        self.assertIn('width="120"', html)
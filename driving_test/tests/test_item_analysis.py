@@ -0,0 +1,95 @@
+from io import StringIO
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from driving_test.item_analysis import ItemStatistics, score_group_cutoffs
+from driving_test.models import AnswerOption, Question, QuestionAnalytics, QuestionCategory, TestAnswer, TestSession
+
+
+class ItemAnalysisTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='items', password='test12345', is_staff=True)
+        category = QuestionCategory.objects.create(name='Ibimenyetso')
+        self.strong, self.noisy, self.rare = [
+            Question.objects.create(question_text=f'Ikibazo {i}', category=category) for i in range(3)
+        ]
+        self.options = {
+            question: {
+                True: AnswerOption.objects.create(question=question, option_text='Yego', is_correct=True, order=0),
+                False: AnswerOption.objects.create(question=question, option_text='Oya', order=1),
+            }
+            for question in (self.strong, self.noisy, self.rare)
+        }
+        # 40 completed tests: the strong item is passed by high scorers, the
+        # noisy one alternates, the rare one is only asked in every other test
+        self.responses = []
+        for i in range(40):
+            score = i % 21
+            session = TestSession.objects.create(user=self.user)
+            session.status = 'completed'
+            session.score = score
+            session.save()
+            answers = {self.strong: score >= 10, self.noisy: i % 2 == 0}
+            if i % 2:
+                answers[self.rare] = i % 3 == 0
+            for question, correct in answers.items():
+                TestAnswer.objects.create(test_session=session, question=question,
+                                          selected_option=self.options[question][correct])
+            self.responses.append((score, answers))
+        # In-progress tests are not part of the analysis
+        TestAnswer.objects.create(test_session=TestSession.objects.create(user=self.user),
+                                  question=self.strong, selected_option=self.options[self.strong][True])
+
+    def expected(self, question):
+        lower, upper = score_group_cutoffs()
+        rows = [(score, answers[question]) for score, answers in self.responses if question in answers]
+        totals = np.array([score for score, _ in rows], dtype=float)
+        correct = np.array([c for _, c in rows], dtype=float)
+        difficulty = correct.mean()
+        discrimination = correct[totals >= upper].mean() - correct[totals <= lower].mean()
+        point_biserial = np.corrcoef(correct, totals - correct)[0, 1]
+        return len(rows), difficulty, discrimination, point_biserial
+
+    def test_statistics_match_direct_computation(self):
+        call_command('item_analysis', min_attempts=1, stdout=StringIO())
+        for question in (self.strong, self.noisy, self.rare):
+            analytics = QuestionAnalytics.objects.get(question=question)
+            n, difficulty, discrimination, point_biserial = self.expected(question)
+            self.assertEqual(analytics.analysis_sample_size, n)
+            self.assertAlmostEqual(analytics.difficulty_index, difficulty, places=4)
+            self.assertAlmostEqual(analytics.discrimination_index, discrimination, places=4)
+            self.assertAlmostEqual(analytics.point_biserial, point_biserial, places=4)
+            self.assertIsNotNone(analytics.analyzed_at)
+
+    def test_small_samples_are_left_empty(self):
+        call_command('item_analysis', min_attempts=30, stdout=StringIO())
+        rare = QuestionAnalytics.objects.get(question=self.rare)
+        self.assertEqual(rare.analysis_sample_size, 20)
+        self.assertIsNone(rare.difficulty_index)
+        self.assertIsNotNone(QuestionAnalytics.objects.get(question=self.strong).difficulty_index)
+
+    def test_chunks_accumulate_like_one_pass(self):
+        rng = np.random.default_rng(7)
+        answered = rng.random((50, 4)) < 0.8
+        correct = answered & (rng.random((50, 4)) < 0.6)
+        totals = rng.integers(0, 21, 50).astype(float)
+        upper, lower = totals >= 15, totals <= 5
+
+        whole = ItemStatistics([1, 2, 3, 4])
+        whole.add(answered, correct, totals, upper, lower)
+        chunked = ItemStatistics([1, 2, 3, 4])
+        for part in (slice(0, 17), slice(17, 50)):
+            chunked.add(answered[part], correct[part], totals[part], upper[part], lower[part])
+        for a, b in zip(whole.results(), chunked.results()):
+            np.testing.assert_allclose(a, b)
+
+    def test_question_analytics_exposes_statistics(self):
+        call_command('item_analysis', min_attempts=1, stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(f'/driving_test/questions/{self.strong.id}/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['analysis_sample_size'], 40)
+        self.assertAlmostEqual(response.data['difficulty_index'], 0.5, places=4)
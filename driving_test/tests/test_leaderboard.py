@@ -0,0 +1,118 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from driving_test.leaderboard import ALL_TIME, Leaderboards, leaderboards, week_board
+from driving_test.models import LeaderboardEntry, TestSession
+from helpers import complete_test
+
+
+class LeaderboardTestCase(TestCase):
+    def setUp(self):
+        leaderboards.reset()
+        self.users = [User.objects.create_user(username=f'racer{i}', password='test12345') for i in range(4)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[0])
+
+    def standings(self, board):
+        return [(rank, entry['user_id'], entry['score']) for rank, entry in board.page(0, 10)]
+
+    def test_best_score_then_fastest(self):
+        a, b, c, d = self.users
+        complete_test(a, 15, 600)
+        complete_test(b, 18, 900)
+        complete_test(c, 18, 500)
+        complete_test(a, 12, 100)  # worse result does not replace the best
+        complete_test(d, 15, 600)
+
+        board = leaderboards.get(ALL_TIME)
+        self.assertEqual(self.standings(board), [(1, c.id, 18), (2, b.id, 18), (3, a.id, 15), (4, d.id, 15)])
+        self.assertEqual(board.rank(a.id)[0], 3)
+
+        complete_test(a, 18, 400)
+        board = leaderboards.get(ALL_TIME)
+        self.assertEqual(board.rank(a.id), (1, {'user_id': a.id, 'score': 18, 'time_taken_seconds': 400}))
+        self.assertEqual(len(board), 4)
+        self.assertEqual(LeaderboardEntry.objects.filter(board=week_board()).count(), 4)
+
+    def test_other_process_sees_updates(self):
+        a, b = self.users[:2]
+        complete_test(a, 14, 600)
+        other_process = Leaderboards()
+        self.assertEqual(other_process.get(ALL_TIME).rank(a.id)[0], 1)
+
+        # Written by this process, picked up by the other one on its next read
+        complete_test(b, 16, 700)
+        self.assertEqual(self.standings(other_process.get(ALL_TIME)), [(1, b.id, 16), (2, a.id, 14)])
+
+    def test_other_process_drops_deleted_user(self):
+        a, b, c = self.users[:3]
+        for user, score in ((a, 18), (b, 15), (c, 12)):
+            complete_test(user, score, 600)
+        other_process = Leaderboards()
+        self.assertEqual(len(other_process.get(ALL_TIME)), 3)
+
+        a.delete()
+        board = other_process.get(ALL_TIME)
+        self.assertEqual(self.standings(board), [(1, b.id, 15), (2, c.id, 12)])
+        self.assertEqual(board.rank(c.id)[0], 2)
+        self.assertEqual(len(other_process.get(week_board())), 2)
+
+    def test_deleted_test_leaves_the_boards(self):
+        a, b = self.users[:2]
+        complete_test(a, 12, 700)
+        complete_test(b, 15, 600)
+        complete_test(a, 18, 500)
+        other_process = Leaderboards()
+        self.assertEqual(other_process.get(ALL_TIME).rank(a.id)[0], 1)
+
+        # Deleting the best result falls back to the next best one
+        TestSession.objects.get(user=a, score=18).delete()
+        self.assertEqual(self.standings(other_process.get(ALL_TIME)), [(1, b.id, 15), (2, a.id, 12)])
+
+        # Deleting the only result removes the entry
+        TestSession.objects.get(user=b).delete()
+        self.assertEqual(self.standings(other_process.get(ALL_TIME)), [(1, a.id, 12)])
+        self.assertFalse(LeaderboardEntry.objects.filter(user=b).exists())
+
+    def test_edited_score_moves_the_entries(self):
+        a, b = self.users[:2]
+        complete_test(a, 18, 500)
+        complete_test(b, 15, 600)
+        other_process = Leaderboards()
+        self.assertEqual(other_process.get(ALL_TIME).rank(a.id)[0], 1)
+
+        # An admin lowers the only result of a
+        session = TestSession.objects.get(user=a)
+        session.score = 5
+        session.save()
+        for board in (ALL_TIME, week_board()):
+            self.assertEqual(self.standings(other_process.get(board)), [(1, b.id, 15), (2, a.id, 5)])
+        self.assertEqual(set(LeaderboardEntry.objects.filter(user=a).values_list('score', flat=True)), {5})
+
+    def test_rebuild_matches_incremental(self):
+        for user, score, seconds in ((self.users[0], 12, 800), (self.users[1], 17, 900), (self.users[0], 17, 850)):
+            complete_test(user, score, seconds)
+        before = set(LeaderboardEntry.objects.values_list('board', 'user_id', 'score', 'time_taken_seconds'))
+        call_command('rebuild_leaderboards', stdout=StringIO())
+        self.assertEqual(before, set(LeaderboardEntry.objects.values_list('board', 'user_id', 'score', 'time_taken_seconds')))
+
+    def test_endpoint_pages_and_my_rank(self):
+        for i, user in enumerate(self.users):
+            complete_test(user, 10 + i, 600)
+        response = self.client.get('/driving_test/leaderboard/', {'period': 'all', 'page': 2, 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual([row['username'] for row in response.data['results']], ['racer1', 'racer0'])
+        self.assertEqual(response.data['results'][0]['rank'], 3)
+        self.assertEqual(response.data['me'], {'rank': 4, 'score': 10, 'time_taken_seconds': 600})
+
+        self.users[3].delete()
+        response = self.client.get('/driving_test/leaderboard/', {'period': 'week'})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][0]['username'], 'racer2')
+
+    def test_invalid_period(self):
+        response = self.client.get('/driving_test/leaderboard/', {'period': 'month'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.http import Http404
+from django.test import TestCase, RequestFactory, override_settings
+from rest_framework.authtoken.models import Token
+from driving_test.media import serve_media
+
+CONTENT = bytes(range(256)) * 40
+
+
+class MediaServingTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD=None)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.factory = RequestFactory()
+
+        for name in ('question_images/sign.png', 'snapshots/catalog-1.jsonl.gz'):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(CONTENT)
+
+    def test_full_response_advertises_ranges(self):
+        response = serve_media(self.factory.get('/'), 'question_images/sign.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        response.close()
+
+    def test_range_request_returns_partial_content(self):
+        response = serve_media(self.factory.get('/', HTTP_RANGE='bytes=100-199'), 'question_images/sign.png')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(CONTENT)}')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[100:200])
+
+        response = serve_media(self.factory.get('/', HTTP_RANGE='bytes=999999-'), 'question_images/sign.png')
+        self.assertEqual(response.status_code, 416)
+
+    def test_conditional_get_returns_not_modified(self):
+        first = serve_media(self.factory.get('/'), 'question_images/sign.png')
+        first.close()
+        response = serve_media(
+            self.factory.get('/', HTTP_IF_NONE_MATCH=first['ETag']), 'question_images/sign.png'
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = serve_media(
+            self.factory.get('/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']), 'question_images/sign.png'
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(MEDIA_OFFLOAD='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_offload_hands_transfer_to_front_server(self):
+        response = serve_media(self.factory.get('/'), 'question_images/sign.png')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/question_images/sign.png')
+        self.assertEqual(response.content, b'')
+
+    def test_snapshots_require_authentication(self):
+        with self.assertRaises(Http404):
+            serve_media(self.factory.get('/'), 'snapshots/catalog-1.jsonl.gz')
+
+        user = User.objects.create_user(username='learner', password='testpass123')
+        token = Token.objects.create(user=user)
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = serve_media(request, 'snapshots/catalog-1.jsonl.gz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        response.close()
+
+    def test_paths_outside_media_are_rejected(self):
+        for path in ('../settings.py', 'private/notes.txt'):
+            with self.assertRaises(Http404):
+                serve_media(self.factory.get('/'), path)
@@ -0,0 +1,90 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from driving_test.models import HourlyScoreStats, TestSession, UserProfile
+from driving_test.profiles import profile_totals
+from driving_test.rollups import period_stats
+from helpers import complete_test
+
+
+class UserStatsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def totals(self):
+        profile = UserProfile.objects.get(user=self.user)
+        return {field: getattr(profile, field) for field in profile_totals(self.user.id)}
+
+    def test_profile_totals_follow_completions_and_deletions(self):
+        complete_test(self.user, 14)
+        best = complete_test(self.user, 19)
+        complete_test(self.user, 9)
+        self.assertEqual(self.totals(), profile_totals(self.user.id))
+        self.assertEqual(self.totals()['best_score'], 19)
+
+        best.delete()
+        self.assertEqual(self.totals(), profile_totals(self.user.id))
+        self.assertEqual(self.totals()['best_score'], 14)
+
+    def test_editing_a_completed_score_updates_totals_and_stats(self):
+        complete_test(self.user, 14)
+        session = complete_test(self.user, 19)
+        self.assertEqual(self.client.get('/driving_test/user/stats/').data['best_score'], 19)
+        etag = self.client.get('/driving_test/test/history/')['ETag']
+
+        # An admin corrects the score of an already completed test
+        session = TestSession.objects.get(pk=session.pk)
+        session.score = 8
+        session.save()
+        self.assertEqual(self.totals(), profile_totals(self.user.id))
+        self.assertEqual(self.totals()['total_tests_passed'], 1)
+
+        response = self.client.get('/driving_test/user/stats/')
+        self.assertEqual(response.data['best_score'], 14)
+        self.assertEqual(response.data['average_score'], 11.0)
+        response = self.client.get('/driving_test/test/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_editing_a_completed_score_updates_rollups(self):
+        session = complete_test(self.user, 18)
+        session = TestSession.objects.get(pk=session.pk)
+        session.score = 5
+        session.save()
+
+        period, all_time = period_stats(7)
+        self.assertEqual((period['tests_completed'], period['tests_passed'], period['score_sum']), (1, 0, 5))
+        self.assertEqual((all_time['tests_passed'], all_time['score_sum']), (0, 5))
+        self.assertEqual(
+            list(HourlyScoreStats.objects.filter(completed__gt=0).values_list('score', 'completed', 'passed')),
+            [(5, 1, 0)]
+        )
+        self.assertFalse(HourlyScoreStats.objects.filter(passed__gt=0).exists())
+
+    def test_stats_are_cached_until_next_completion(self):
+        complete_test(self.user, 14)
+        complete_test(self.user, 8)
+        response = self.client.get('/driving_test/user/stats/')
+        self.assertEqual(response.data['total_tests'], 2)
+        self.assertEqual(response.data['average_score'], 11.0)
+        self.assertEqual(response.data['pass_rate'], 50.0)
+
+        # The profile row the cache key is built from, and nothing else
+        with self.assertNumQueries(1):
+            self.client.get('/driving_test/user/stats/')
+
+        complete_test(self.user, 20)
+        response = self.client.get('/driving_test/user/stats/')
+        self.assertEqual(response.data['total_tests'], 3)
+        self.assertEqual(response.data['best_score'], 20)
+        self.assertEqual(response.data['recent_tests'][0]['score'], 20)
+
+    def test_reading_stats_does_not_load_sessions(self):
+        for score in range(10):
+            complete_test(self.user, score)
+        with self.assertNumQueries(3):
+            response = self.client.get('/driving_test/user/stats/')
+        self.assertEqual(response.data['total_tests'], 10)
@@ -0,0 +1,101 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from driving_test.grading import grade
+from driving_test.models import AnswerOption, Question, QuestionAnalytics, QuestionCategory, TestSession
+from driving_test.rankings import top_questions
+
+
+@override_settings(RANKING_MIN_ATTEMPTS=3)
+class RankingTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='ranking', password='test12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.signs = QuestionCategory.objects.create(name='Ibyapa')
+        self.rules = QuestionCategory.objects.create(name='Amategeko')
+        self.questions = []
+        for i, category in enumerate([self.signs] * 3 + [self.rules] * 2):
+            question = Question.objects.create(question_text=f'Ikibazo {i}', category=category)
+            AnswerOption.objects.create(question=question, option_text='Yego', is_correct=True, order=0)
+            AnswerOption.objects.create(question=question, option_text='Oya', order=1)
+            self.questions.append(question)
+
+    def answer(self, outcomes):
+        """outcomes: True/False per question, None to skip it"""
+        answers = []
+        for question, correct in zip(self.questions, outcomes):
+            if correct is not None:
+                option = question.options.get(is_correct=correct)
+                answers.append({'question_id': question.id, 'selected_option_id': option.id})
+        grade(TestSession.objects.create(user=self.admin), answers)
+
+    def ids(self, ranking):
+        return [row['question_id'] for row in ranking]
+
+    def test_rankings_follow_counters(self):
+        q = self.questions
+        self.answer([True, False, True, False, None])
+        self.answer([True, False, False, True, None])
+        # Two attempts each: below the threshold, nothing is ranked yet
+        self.assertEqual(top_questions(5), [])
+
+        self.answer([True, True, False, True, True])
+        # Ties are broken by question id
+        self.assertEqual(self.ids(top_questions(5)), [q[1].id, q[2].id, q[3].id, q[0].id])
+        self.assertEqual(self.ids(top_questions(2, hardest=False)), [q[0].id, q[3].id])
+        self.assertEqual(self.ids(top_questions(5, category_id=self.rules.id)), [q[3].id])
+        self.assertAlmostEqual(top_questions(1)[0]['success_rate'], 33.3)
+
+        # A question moving category moves in the per-category ranking
+        q[0].category = self.rules
+        q[0].save()
+        self.assertEqual(self.ids(top_questions(5, category_id=self.rules.id)), [q[3].id, q[0].id])
+
+    def test_rebuild_ranks_like_grading(self):
+        for _ in range(3):
+            self.answer([True, False, True, None, False])
+        before = list(QuestionAnalytics.objects.order_by('question_id').values_list(
+            'question_id', 'category_id', 'ranked_success_rate'))
+        self.assertEqual(len(before), 4)
+        QuestionAnalytics.objects.update(ranked_success_rate=None, category=None)
+        call_command('rebuild_answer_analytics', stdout=StringIO())
+        after = list(QuestionAnalytics.objects.filter(total_attempts__gt=0).order_by('question_id').values_list(
+            'question_id', 'category_id', 'ranked_success_rate'))
+        self.assertEqual(before, after)
+
+    def test_top_k_reads_the_index_without_sorting(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plan check is written for SQLite')
+        for category_id in (None, self.signs.id):
+            for hardest in (True, False):
+                with connection.cursor() as cursor:
+                    rows = QuestionAnalytics.objects.filter(ranked_success_rate__isnull=False)
+                    if category_id:
+                        rows = rows.filter(category_id=category_id)
+                    order = ('ranked_success_rate', 'question_id') if hardest else ('-ranked_success_rate', '-question_id')
+                    sql, params = rows.order_by(*order)[:5].query.sql_with_params()
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                self.assertIn('ranking_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_rankings_endpoint(self):
+        for _ in range(3):
+            self.answer([True, False, True, False, True])
+        response = self.client.get('/driving_test/admin/analytics/questions/', {
+            'order': 'easiest', 'category': self.rules.id, 'limit': 1
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response.data['results']), [self.questions[4].id])
+        self.assertEqual(response.data['min_attempts'], 3)
+
+        response = self.client.get('/driving_test/admin/analytics/')
+        self.assertEqual(len(response.data['most_difficult_questions']), 5)
+        self.assertEqual(response.data['most_difficult_questions'][0]['success_rate'], 0.0)
+
+        response = self.client.get('/driving_test/admin/analytics/questions/', {'order': 'middle'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,152 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from driving_test.models import DailyStats, HourlyScoreStats, ScoreHistogram, TestSession
+from driving_test.rollups import _series_cache, percentile_ranks, period_stats
+from helpers import complete_test
+
+
+class DailyRollupTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='rollup', password='test12345', is_staff=True)
+        self.learner = User.objects.create_user(username='learner', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def complete(self, score):
+        session = complete_test(self.learner, score)
+        # Saving again must not count the completion twice
+        session.save()
+        return session
+
+    def snapshot(self):
+        return list(DailyStats.objects.order_by('day').values())
+
+    def test_counters_follow_events(self):
+        self.complete(15)
+        self.complete(8)
+        TestSession.objects.create(user=self.learner)
+
+        period, all_time = period_stats(7)
+        self.assertEqual(all_time['new_users'], 2)
+        self.assertEqual(period['tests_started'], 3)
+        self.assertEqual(period['tests_completed'], 2)
+        self.assertEqual(period['tests_passed'], 1)
+        self.assertEqual(all_time['score_sum'], 23)
+
+    def test_login_moves_active_user_count(self):
+        self.client.post('/driving_test/auth/login/', {'username': 'learner', 'password': 'test12345'})
+        self.assertEqual(period_stats(7)[0]['last_login_users'], 1)
+
+        self.learner.refresh_from_db()
+        self.learner.is_active = False
+        self.learner.save()
+        self.assertEqual(period_stats(7)[0]['last_login_users'], 0)
+
+    def test_rebuild_matches_incremental_counters(self):
+        self.complete(15)
+        self.complete(10).delete()
+        TestSession.objects.create(user=self.learner)
+        self.client.post('/driving_test/auth/login/', {'username': 'learner', 'password': 'test12345'})
+        User.objects.create_user(username='dormant', password='test12345').delete()
+
+        incremental = self.snapshot()
+        hourly = self.hourly()
+        histogram = self.histogram()
+        call_command('rebuild_daily_stats', stdout=StringIO())
+        self.assertEqual(self.nonzero(incremental), self.nonzero(self.snapshot()))
+        self.assertEqual(hourly, self.hourly())
+        self.assertEqual(histogram, self.histogram())
+
+    def histogram(self):
+        return list(ScoreHistogram.objects.filter(completed__gt=0).order_by('period', 'score').values_list(
+            'period', 'score', 'completed'
+        ))
+
+    def hourly(self):
+        return list(HourlyScoreStats.objects.filter(completed__gt=0).order_by('hour', 'score').values_list(
+            'hour', 'score', 'completed', 'passed'
+        ))
+
+    def nonzero(self, rows):
+        return [
+            {key: value for key, value in row.items() if key != 'id'}
+            for row in rows if any(row[key] for key in row if key not in ('id', 'day'))
+        ]
+
+    def test_admin_analytics_reads_rollup(self):
+        self.complete(15)
+        with self.assertNumQueries(3):
+            response = self.client.get('/driving_test/admin/analytics/', {'days': 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_tests'], 1)
+        self.assertEqual(response.data['pass_rate'], 100.0)
+
+
+class PercentileRankTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ranked', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        other = User.objects.create_user(username='others', password='test12345')
+        for user, score in ((other, 10), (other, 12), (other, 12), (other, 18), (self.user, 16), (self.user, 12)):
+            complete_test(user, score)
+
+    def test_ranks_come_from_histogram(self):
+        with self.assertNumQueries(1):
+            ranks = percentile_ranks(best=16, worst=0, unknown=None)
+        self.assertEqual(ranks['all_time'], {'best': 66.7, 'worst': 0.0, 'unknown': None})
+        self.assertEqual(ranks['this_month'], ranks['all_time'])
+
+    def test_user_stats_reports_best_and_latest_rank(self):
+        response = self.client.get('/driving_test/user/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['percentile_rank']['all_time'], {'best_score': 66.7, 'latest_score': 16.7})
+
+    def test_deleted_tests_leave_the_histogram(self):
+        TestSession.objects.filter(user=self.user, score=16).delete()
+        self.assertEqual(percentile_ranks(best=16)['all_time']['best'], 80.0)
+
+    def test_edited_score_moves_in_the_histogram(self):
+        session = TestSession.objects.get(user=self.user, score=16)
+        session.score = 5
+        session.save()
+        self.assertEqual(ScoreHistogram.objects.filter(score=16, completed__gt=0).count(), 0)
+        # Below 12: the 10 and now the 5
+        ranks = percentile_ranks(best=12)
+        self.assertEqual(ranks['all_time']['best'], 33.3)
+        self.assertEqual(ranks['this_month'], ranks['all_time'])
+
+
+class TimeSeriesTestCase(TestCase):
+    def setUp(self):
+        _series_cache.clear()
+        self.admin = User.objects.create_user(username='charts', password='test12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        for score in (15, 15, 8):
+            complete_test(self.admin, score)
+
+    def test_daily_series_and_histogram(self):
+        response = self.client.get('/driving_test/admin/analytics/timeseries/', {'bucket': 'day', 'days': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), 8)
+        today = response.data['series'][-1]
+        self.assertEqual((today['tests'], today['passed']), (3, 2))
+        self.assertEqual(today['average_score'], 12.7)
+        self.assertEqual(response.data['score_histogram'][15], 2)
+        self.assertEqual(sum(response.data['score_histogram']), 3)
+
+    def test_repeat_request_is_served_from_memory(self):
+        self.client.get('/driving_test/admin/analytics/timeseries/', {'bucket': 'week', 'days': 30})
+        with self.assertNumQueries(0):
+            response = self.client.get('/driving_test/admin/analytics/timeseries/', {'bucket': 'week', 'days': 30})
+        self.assertEqual(response.data['series'][-1]['tests'], 3)
+
+    def test_invalid_bucket(self):
+        response = self.client.get('/driving_test/admin/analytics/timeseries/', {'bucket': 'month'})
+        self.assertEqual(response.status_code, 400)
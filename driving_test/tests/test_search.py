@@ -0,0 +1,68 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db.models import F
+from rest_framework.test import APIClient
+from driving_test import catalog
+from driving_test.models import CatalogVersion, QuestionCategory, Question
+from driving_test.search import PrefixIndex, autocomplete_index
+
+
+class PrefixIndexTestCase(TestCase):
+    def test_prefix_match_is_accent_and_case_insensitive(self):
+        index = PrefixIndex()
+        index.add(1, "Icyapa cy'umuvuduko ntarengwa")
+        index.add(2, "Umuvúduko mu mujyi")
+        index.add(3, "Abanyamaguru bambuka umuhanda")
+
+        self.assertEqual([pk for pk, _ in index.search('UMUV')], [2, 1])
+        self.assertEqual([pk for pk, _ in index.search('umuv mu')], [2])
+        self.assertEqual(index.search('xyz'), [])
+
+    def test_remove_drops_unused_tokens(self):
+        index = PrefixIndex()
+        index.add(1, 'Romoruki ikuruwe')
+        index.remove(1)
+        self.assertEqual(index.search('rom'), [])
+        self.assertEqual(index._tokens, [])
+
+
+class AutocompleteEndpointTestCase(TestCase):
+    def setUp(self):
+        autocomplete_index.reset()
+        self.user = User.objects.create_user(username='ac', email='ac@example.com', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.category = QuestionCategory.objects.create(name='Ibimenyetso')
+
+    def tearDown(self):
+        autocomplete_index.reset()
+
+    def test_index_follows_saves(self):
+        question = Question.objects.create(
+            question_text='Ibimenyetso bimurika ku masangano',
+            category=self.category
+        )
+        response = self.client.get('/driving_test/questions/autocomplete/', {'q': 'ibim'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['type'], item['id']) for item in response.data],
+            [('category', self.category.id), ('question', question.id)]
+        )
+
+        question.is_active = False
+        question.save()
+        response = self.client.get('/driving_test/questions/autocomplete/', {'q': 'bimurika'})
+        self.assertEqual(response.data, [])
+
+    def test_index_reloads_when_catalog_version_moves_on(self):
+        question = Question.objects.create(question_text='Amatara yo ku muhanda', category=self.category)
+        response = self.client.get('/driving_test/questions/autocomplete/', {'q': 'amatara'})
+        self.assertEqual([item['id'] for item in response.data], [question.id])
+
+        # Changed by another worker, or by an update() that sends no signals
+        Question.objects.filter(pk=question.pk).update(question_text='Imirongo yera yo ku muhanda')
+        CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+        catalog._version_cache.clear()
+        self.assertEqual(self.client.get('/driving_test/questions/autocomplete/', {'q': 'amatara'}).data, [])
+        response = self.client.get('/driving_test/questions/autocomplete/', {'q': 'imirongo'})
+        self.assertEqual([item['id'] for item in response.data], [question.id])
@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from driving_test import snapshot
+from driving_test.catalog import get_version
+from driving_test.models import QuestionCategory, Question, AnswerOption
+
+
+class DeltaSyncTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.user = User.objects.create_user(username='sync', email='sync@example.com', password='test12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.category = QuestionCategory.objects.create(name='Umuvuduko')
+        self.kept = Question.objects.create(question_text='Umuvuduko ntarengwa mu mujyi?', category=self.category)
+        self.option = AnswerOption.objects.create(question=self.kept, option_text='Km40', is_correct=True, order=0)
+        self.dropped = Question.objects.create(question_text='Umuvuduko ku muhanda munini?', category=self.category)
+
+    def test_snapshot_contains_bank(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = self.client.get('/driving_test/questions/snapshot/')
+            self.assertEqual(response.status_code, 200)
+            path = f"{self.media_root}/snapshots/catalog-{response.data['version']}.jsonl.gz"
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+
+        self.assertEqual(rows[0]['type'], 'meta')
+        questions = {row['id']: row for row in rows if row['type'] == 'question'}
+        self.assertEqual(set(questions), {self.kept.id, self.dropped.id})
+        self.assertEqual(questions[self.kept.id]['options'][0]['option_text'], 'Km40')
+
+    def test_concurrent_builds_do_not_share_a_temporary_file(self):
+        version = get_version()
+        category_rows = snapshot.category_rows
+
+        def another_worker_builds_first(queryset):
+            # Stands in for a second process that missed the snapshot at the same time
+            if mock_rows.call_count == 1:
+                snapshot.build_snapshot(version)
+            return category_rows(queryset)
+
+        # A reentrant lock lets the nested build run, as the other process's lock would
+        with override_settings(MEDIA_ROOT=self.media_root), \
+                mock.patch.object(snapshot, '_build_lock', threading.RLock()), \
+                mock.patch.object(snapshot, 'category_rows', side_effect=another_worker_builds_first) as mock_rows:
+            path = snapshot.build_snapshot(version)
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline())['version'], version)
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+
+    def test_changes_report_updates_deactivations_and_deletions(self):
+        version = get_version()
+        # Rows touched within the overlap window are re-sent; move the cursor past them
+        Question.objects.update(updated_at=self.kept.updated_at.replace(year=2020))
+        QuestionCategory.objects.update(updated_at=self.kept.updated_at.replace(year=2020))
+
+        self.option.option_text = 'Km60'
+        self.option.save()
+        self.dropped.is_active = False
+        self.dropped.save()
+        extra = Question.objects.create(question_text='Ni iki kigena umuvuduko?', category=self.category)
+        extra_id = extra.id
+        extra.delete()
+
+        response = self.client.get('/driving_test/questions/changes/', {'since': version})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([q['id'] for q in response.data['questions']], [self.kept.id])
+        self.assertEqual(response.data['questions'][0]['options'][0]['option_text'], 'Km60')
+        self.assertEqual(response.data['removed_questions'], sorted([self.dropped.id, extra_id]))
+        self.assertGreater(response.data['version'], version)
+
+    def test_invalid_or_expired_since(self):
+        response = self.client.get('/driving_test/questions/changes/', {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        # Out of the range a datetime can hold
+        for since in (-10 ** 20, 10 ** 20):
+            response = self.client.get('/driving_test/questions/changes/', {'since': since})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.get('/driving_test/questions/changes/', {'since': 1})
+        self.assertEqual(response.status_code, 410)
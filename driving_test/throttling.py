@@ -0,0 +1,86 @@
+"""
+In-memory token-bucket throttles for the sign-in endpoints.
+
+Each client (IP address, or account for logins) gets a bucket holding up
+to N tokens that refills at N per period, using the rates configured in
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']. That allows short bursts but
+caps the sustained rate. The buckets live in process memory, so rejecting
+a request costs no cache or database round trip. The limits therefore
+apply per worker process.
+"""
+import threading
+import time
+from collections.abc import Mapping
+from rest_framework.throttling import SimpleRateThrottle
+from .cache import TTLCache
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    timer = time.monotonic
+
+    def __init__(self):
+        super().__init__()
+        self.wait_seconds = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # One bucket store per throttle class, shared by its instances
+        cls.buckets = TTLCache(maxsize=100000, ttl=24 * 60 * 60)
+        cls.lock = threading.Lock()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity, period = self.num_requests, self.duration
+        refill_per_second = capacity / period
+        now = self.timer()
+        with self.lock:
+            tokens, last = self.buckets.get(self.key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.wait_seconds = (1 - tokens) / refill_per_second
+            # A full bucket is the default, so it only needs keeping while it refills
+            self.buckets.set(self.key, (tokens, now), ttl=period)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+    @classmethod
+    def reset(cls):
+        cls.buckets.clear()
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginAccountThrottle(TokenBucketThrottle):
+    """Limits guessing against one account, whichever addresses it comes from"""
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            # e.g. a JSON list: the view answers 400
+            return None
+        account = request.data.get('username') or request.data.get('email')
+        if not account or not isinstance(account, str):
+            return None
+        return account.strip().lower()
+
+
+class RegisterIPThrottle(TokenBucketThrottle):
+    scope = 'register_ip'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
@@ -0,0 +1,103 @@
+"""
+Signed access tokens and DB-backed refresh tokens.
+
+An access token is an HMAC-signed, timestamped payload (django.core.signing,
+keyed with SECRET_KEY) carrying the user id and the few user fields the API
+reads. Any app node can verify it in memory, so authenticating costs no
+database or cache lookup. Access tokens are short-lived and cannot be
+revoked; the refresh token that mints new ones is stored (hashed) in the
+database and is revoked on logout. These live alongside the opaque
+rest_framework Token and are only issued to clients that ask for them, so
+clients can move over at their own pace. purge_sessions deletes refresh
+tokens once they have expired or been revoked.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.utils import timezone
+from .models import RefreshToken
+
+ACCESS_TOKEN_SALT = 'driving_test.access_token'
+ACCESS_TOKEN_LIFETIME = getattr(settings, 'ACCESS_TOKEN_LIFETIME', timedelta(minutes=5))
+REFRESH_TOKEN_LIFETIME = getattr(settings, 'REFRESH_TOKEN_LIFETIME', timedelta(days=30))
+
+# Fields carried in the token, in User's column order as Model.from_db expects;
+# everything else on request.user stays deferred
+USER_CLAIMS = ('id', 'is_superuser', 'username', 'email', 'is_staff', 'is_active')
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def issue_access_token(user):
+    return signing.dumps(
+        [getattr(user, field) for field in USER_CLAIMS],
+        salt=ACCESS_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def verify_access_token(token):
+    """Return a User built from the token claims, without a query"""
+    try:
+        claims = signing.loads(
+            token,
+            salt=ACCESS_TOKEN_SALT,
+            max_age=ACCESS_TOKEN_LIFETIME,
+        )
+    except signing.SignatureExpired:
+        raise InvalidToken('Access token expired')
+    except signing.BadSignature:
+        raise InvalidToken('Invalid access token')
+    if len(claims) != len(USER_CLAIMS):
+        raise InvalidToken('Invalid access token')
+    # from_db leaves the other fields deferred, so a save() only writes these columns
+    return User.from_db('default', USER_CLAIMS, claims)
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(user):
+    token = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        user=user,
+        token_hash=_hash(token),
+        expires_at=timezone.now() + REFRESH_TOKEN_LIFETIME
+    )
+    return token
+
+
+def issue_token_pair(user):
+    return {
+        'access_token': issue_access_token(user),
+        'refresh_token': issue_refresh_token(user),
+        'expires_in': int(ACCESS_TOKEN_LIFETIME.total_seconds()),
+    }
+
+
+def rotate_refresh_token(token):
+    """Exchange a refresh token for a new pair; the old refresh token stops working"""
+    refresh = RefreshToken.objects.select_related('user').filter(token_hash=_hash(token or '')).first()
+    if refresh is None or not refresh.is_valid or not refresh.user.is_active:
+        raise InvalidToken('Invalid or expired refresh token')
+    revoked = RefreshToken.objects.filter(pk=refresh.pk, revoked_at__isnull=True).update(
+        revoked_at=timezone.now()
+    )
+    if not revoked:
+        # Lost a race with another refresh or a logout
+        raise InvalidToken('Invalid or expired refresh token')
+    return refresh.user, issue_token_pair(refresh.user)
+
+
+def revoke_refresh_tokens(user, token=None):
+    """Revoke one refresh token, or all of the user's when none is given"""
+    tokens = RefreshToken.objects.filter(user=user, revoked_at__isnull=True)
+    if token:
+        tokens = tokens.filter(token_hash=_hash(token))
+    return tokens.update(revoked_at=timezone.now())
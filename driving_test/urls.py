@@ -5,6 +5,7 @@ urlpatterns = [
     path('auth/register/', views.register_user, name='register'),
     path('auth/login/', views.login_user, name='login'),
     path('auth/logout/', views.logout_user, name='logout'),
+    path('auth/token/refresh/', views.refresh_token, name='refresh_token'),
     
     # Test endpoints
     path('test/start/', views.start_test, name='start_test'),
@@ -14,11 +15,18 @@ urlpatterns = [
     # User endpoints
     path('user/stats/', views.user_stats, name='user_stats'),
     path('user/profile/', views.user_profile, name='user_profile'),
+    path('user/category-stats/', views.user_category_stats, name='user_category_stats'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('dashboard/', views.dashboard, name='dashboard'),
     
     # Question endpoints (for admin/preview)
     path('questions/', views.list_questions, name='list_questions'),
+    path('questions/autocomplete/', views.autocomplete_questions, name='autocomplete_questions'),
+    path('questions/snapshot/', views.question_snapshot, name='question_snapshot'),
+    path('questions/changes/', views.question_changes, name='question_changes'),
     path('questions/<int:pk>/', views.question_detail, name='question_detail'),
     path('questions/<int:pk>/analytics/', views.question_analytics, name='question_analytics'),
+    path('questions/<int:pk>/distractors/', views.question_distractors, name='question_distractors'),
 
     
     # Category endpoints
@@ -28,5 +36,8 @@ urlpatterns = [
     path('admin/user-activities/', views.admin_user_activities, name='admin_user_activities'),
     path('admin/user-test-history/', views.admin_user_test_history, name='admin_user_test_history'),
     path('admin/analytics/', views.admin_analytics, name='admin_analytics'),
+    path('admin/analytics/timeseries/', views.admin_analytics_timeseries, name='admin_analytics_timeseries'),
+    path('admin/analytics/questions/', views.admin_question_rankings, name='admin_question_rankings'),
+    path('admin/enrol/', views.admin_enrol_candidates, name='admin_enrol_candidates'),
 
 ]
\ No newline at end of file
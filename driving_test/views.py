@@ -1,18 +1,24 @@
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import login
+from django.contrib.auth import login, user_logged_in
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Avg, Count, F, Case, When, FloatField
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Count, Prefetch, prefetch_related_objects
 from django.contrib.auth.models import User
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from random import sample
+import csv
+import os
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import (
     Question, QuestionAnalytics, TestSession, TestAnswer, AnswerOption, 
-    QuestionCategory, UserProfile
+    UserProfile, UserCategoryStats
 )
 from .serializers import (
     AdminAnalyticsSerializer, AdminTestSessionSerializer, AdminUserProfileSerializer, QuestionSerializer, QuestionWithAnswerSerializer, QuestionDetailSerializer,
@@ -20,8 +26,29 @@ from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer,
     QuestionCategorySerializer, SubmitTestSerializer
 )
+from .catalog import catalog_etag, catalog_image_etag, category_list, get_version
+from .dashboard import SECTIONS as DASHBOARD_SECTIONS, build as build_dashboard
+from .snapshot import build_snapshot, changes_since, snapshot_url, version_to_datetime
+from .search import autocomplete_index
+from .enrolment import enrol, parse_csv
+from .grading import correct_option, grade
+from .hashers import HashingBusy
+from .history import DEFAULT_LIMIT, MAX_LIMIT, history_etag, history_last_modified, history_page
+from .leaderboard import ALL_TIME, leaderboards, week_board
+from .profiles import RECENT_TESTS, cached_stats, get_profile, stats_data
+from .rankings import min_attempts, top_questions
+from .rollups import BUCKETS, period_stats, time_series
+from .throttling import LoginAccountThrottle, LoginIPThrottle, RegisterIPThrottle
+from .tokens import InvalidToken, issue_token_pair, revoke_refresh_tokens, rotate_refresh_token
 from rest_framework.permissions import IsAdminUser
 
+def signed_tokens(user, requested):
+    """Access/refresh pair issued next to the legacy token to clients that ask for it"""
+    if not requested or not getattr(settings, 'SIGNED_ACCESS_TOKENS', True):
+        return {}
+    return issue_token_pair(user)
+
+
 # Authentication Views
 @swagger_auto_schema(
     method='post',
@@ -36,20 +63,29 @@ from rest_framework.permissions import IsAdminUser
                     'username': openapi.Schema(type=openapi.TYPE_STRING),
                     'email': openapi.Schema(type=openapi.TYPE_STRING),
                     'token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'access_token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'refresh_token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'expires_in': openapi.Schema(type=openapi.TYPE_INTEGER),
                 }
             )
         ),
-        400: 'Bad Request'
+        400: 'Bad Request',
+        429: 'Too many registrations',
+        503: 'Too many sign-ins in progress'
     },
     operation_description="Register a new user account"
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterIPThrottle])
 def register_user(request):
     """Register a new user"""
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
+        try:
+            user = serializer.save()
+        except HashingBusy:
+            return Response({'error': HashingBusy.message}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         token, created = Token.objects.get_or_create(user=user)
         return Response({
             'user_id': user.id,
@@ -57,6 +93,7 @@ def register_user(request):
             'email': user.email,
             'token': token.key,
             'is_staff': user.is_staff,
+            **signed_tokens(user, serializer.validated_data['token_pair']),
         }, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -74,46 +111,107 @@ def register_user(request):
                     'username': openapi.Schema(type=openapi.TYPE_STRING),
                     'email': openapi.Schema(type=openapi.TYPE_STRING),
                     'token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'access_token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'refresh_token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'expires_in': openapi.Schema(type=openapi.TYPE_INTEGER),
                 }
             )
         ),
-        400: 'Bad Request'
+        400: 'Bad Request',
+        429: 'Too many login attempts',
+        503: 'Too many sign-ins in progress'
     },
     operation_description="Login user and return authentication token"
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginAccountThrottle])
 def login_user(request):
     """Login user and return token"""
     serializer = UserLoginSerializer(data=request.data)
-    if serializer.is_valid():
+    try:
+        valid = serializer.is_valid()
+    except HashingBusy:
+        return Response({'error': HashingBusy.message}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if valid:
         user = serializer.validated_data['user']
         token, created = Token.objects.get_or_create(user=user)
-        login(request, user)
+        if serializer.validated_data['session']:
+            login(request, user)
+        else:
+            # Same signal login() sends, so last_login is kept (throttled in signals.py)
+            user_logged_in.send(sender=user.__class__, request=request, user=user)
         return Response({
             'user_id': user.id,
             'username': user.username,
             'email': user.email,
             'token': token.key,
             'is_staff': user.is_staff,
+            **signed_tokens(user, serializer.validated_data['token_pair']),
         })
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @swagger_auto_schema(
     method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['refresh_token'],
+        properties={
+            'refresh_token': openapi.Schema(type=openapi.TYPE_STRING),
+        }
+    ),
+    responses={
+        200: openapi.Response(
+            'New token pair',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'access_token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'refresh_token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'expires_in': openapi.Schema(type=openapi.TYPE_INTEGER),
+                }
+            )
+        ),
+        401: 'Invalid or expired refresh token'
+    },
+    operation_description="Exchange a refresh token for a new access token and refresh token"
+)
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def refresh_token(request):
+    """Rotate a refresh token and issue a new signed access token"""
+    try:
+        user, tokens = rotate_refresh_token(request.data.get('refresh_token'))
+    except InvalidToken as e:
+        return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+    return Response(tokens)
+
+
+@swagger_auto_schema(
+    method='post',
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'refresh_token': openapi.Schema(
+                type=openapi.TYPE_STRING,
+                description='Refresh token to revoke; all of the user\'s refresh tokens when omitted'
+            ),
+        }
+    ),
     responses={
         200: openapi.Response('Successfully logged out'),
         400: 'Error logging out'
     },
-    operation_description="Logout user and invalidate token"
+    operation_description="Logout user, invalidate token and revoke refresh tokens"
 )
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout_user(request):
-    """Logout user and delete token"""
+    """Logout user, delete token and revoke refresh tokens"""
     try:
-        request.user.auth_token.delete()
+        revoke_refresh_tokens(request.user, request.data.get('refresh_token'))
+        Token.objects.filter(user=request.user).delete()
         return Response({'message': 'Successfully logged out'})
     except:
         return Response({'message': 'Error logging out'}, status=status.HTTP_400_BAD_REQUEST)
@@ -223,65 +321,47 @@ def submit_test(request):
             'error': 'Invalid or completed test session'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    score = 0
-    test_answers = []
+    with transaction.atomic():
+        # Claim the session with one conditional UPDATE: of two submissions that
+        # both loaded it as in progress, only one is graded and counted
+        claimed = TestSession.objects.filter(
+            pk=test_session.pk, status='in_progress'
+        ).update(status='completed')
+        if not claimed:
+            return Response({
+                'error': 'Invalid or completed test session'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        test_answers = grade(test_session, answers)
+        score = sum(answer.points_earned for answer in test_answers)
+        test_session.status = 'completed'
+        test_session.score = score
+        test_session.passed = score >= 12  # Pass threshold (60%)
+        test_session.time_completed = timezone.now()
+        test_session.time_taken_seconds = time_taken
+        test_session.save()
+
     detailed_results = []
+    for answer in test_answers:
+        correct = correct_option(answer.question)
+        detailed_results.append({
+            'question_id': answer.question.id,
+            'question_text': answer.question.question_text[:100] + "...",
+            'user_answer': answer.selected_option.option_text if answer.selected_option else "Not answered",
+            'correct_answer': correct.option_text if correct else "N/A",
+            'is_correct': answer.is_correct,
+            'points_earned': answer.points_earned,
+            'answered_by': request.user.username
+        })
     
-    # Process each answer
-    for answer_data in answers:
-        question_id = answer_data.get('question_id')
-        selected_option_id = answer_data.get('selected_option_id')
-        
-        try:
-            question = Question.objects.get(id=question_id)
-            selected_option = None
-            is_correct = False
-            points_earned = 0
-            
-            if selected_option_id:
-                selected_option = AnswerOption.objects.get(
-                    id=selected_option_id, 
-                    question=question
-                )
-                is_correct = selected_option.is_correct
-                points_earned = 1 if is_correct else 0
-                score += points_earned
-
-            test_answer = TestAnswer.objects.create(
-                test_session=test_session,
-                question=question,
-                selected_option=selected_option,
-                is_correct=is_correct,
-                points_earned=points_earned
-            )
-            test_answers.append(test_answer)
-            detailed_results.append({
-                'question_id': question.id,
-                'question_text': question.question_text[:100] + "...",
-                'user_answer': selected_option.option_text if selected_option else "Not answered",
-                'correct_answer': question.correct_answer.option_text if question.correct_answer else "N/A",
-                'is_correct': is_correct,
-                'points_earned': points_earned,
-                'answered_by': request.user.username
-            })
-            
-            analytics, created = QuestionAnalytics.objects.get_or_create(question=question)
-            analytics.update_stats()            
-        except (Question.DoesNotExist, AnswerOption.DoesNotExist):
-            continue
-    
-    test_session.status = 'completed'
-    test_session.score = score
-    test_session.passed = score >= 12  # Pass threshold (60%)
-    test_session.time_completed = timezone.now()
-    test_session.time_taken_seconds = time_taken
-    test_session.save()
+    prefetch_related_objects(
+        [test_session],
+        Prefetch('answers', queryset=TestAnswer.objects.select_related('question', 'selected_option'))
+    )
     
-    # Get questions with correct answers for review
-    question_ids = [ta.question.id for ta in test_answers]
-    questions_with_answers = Question.objects.filter(id__in=question_ids)
+    # Questions with correct answers for review, already loaded with their options by grade()
     questions_serializer = QuestionWithAnswerSerializer(
-        questions_with_answers, 
+        [ta.question for ta in test_answers], 
         many=True, 
         context={'request': request}
     )
@@ -304,22 +384,39 @@ def submit_test(request):
 
 @swagger_auto_schema(
     method='get',
+    manual_parameters=[
+        openapi.Parameter('cursor', openapi.IN_QUERY, description="next_cursor of the previous page", type=openapi.TYPE_STRING),
+        openapi.Parameter('limit', openapi.IN_QUERY, description=f"Results per page (default {DEFAULT_LIMIT}, max {MAX_LIMIT})", type=openapi.TYPE_INTEGER),
+    ],
     responses={
-        200: TestSessionSummarySerializer(many=True)
+        200: openapi.Response(
+            'Completed tests, newest first',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'next_cursor': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
+                }
+            )
+        ),
+        304: 'History unchanged since the ETag or Last-Modified the client holds',
+        400: 'Invalid cursor or limit parameter'
     },
-    operation_description="Get user's test history"
+    operation_description="Get user's test history, one cursor page at a time"
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@condition(etag_func=history_etag, last_modified_func=history_last_modified)
 def test_history(request):
     """Get user's test history"""
-    test_sessions = TestSession.objects.filter(
-        user=request.user,
-        status='completed'
-    ).order_by('-time_started')
-    
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        test_sessions, next_cursor = history_page(request.user, request.GET.get('cursor'), limit)
+    except ValueError:
+        return Response({'error': 'Invalid cursor or limit parameter'}, status=status.HTTP_400_BAD_REQUEST)
+
     serializer = TestSessionSummarySerializer(test_sessions, many=True)
-    return Response(serializer.data)
+    return Response({'results': serializer.data, 'next_cursor': next_cursor})
 
 
 @swagger_auto_schema(
@@ -335,6 +432,20 @@ def test_history(request):
                     'pass_rate': openapi.Schema(type=openapi.TYPE_NUMBER),
                     'average_score': openapi.Schema(type=openapi.TYPE_NUMBER),
                     'best_score': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'percentile_rank': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        description="Share of completed tests (all-time and this month) scoring below the user's best and latest scores",
+                        properties={
+                            period: openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'best_score': openapi.Schema(type=openapi.TYPE_NUMBER, x_nullable=True),
+                                    'latest_score': openapi.Schema(type=openapi.TYPE_NUMBER, x_nullable=True),
+                                }
+                            )
+                            for period in ('all_time', 'this_month')
+                        }
+                    ),
                     'recent_tests': openapi.Schema(
                         type=openapi.TYPE_ARRAY,
                         items=openapi.Schema(type=openapi.TYPE_OBJECT)
@@ -348,35 +459,117 @@ def test_history(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_stats(request):
-    """Get user statistics"""
-    completed_tests = TestSession.objects.filter(
-        user=request.user,
-        status='completed'
-    )
-    
-    total_tests = completed_tests.count()
-    passed_tests = completed_tests.filter(passed=True).count()
-    
-    if total_tests > 0:
-        pass_rate = (passed_tests / total_tests) * 100
-        avg_score = sum(test.score for test in completed_tests) / total_tests
-        best_score = max(test.score for test in completed_tests)
-    else:
-        pass_rate = 0
-        avg_score = 0
-        best_score = 0
-    
-    # Get recent tests (last 5)
-    recent_tests = completed_tests.order_by('-time_started')[:5]
-    recent_serializer = TestSessionSummarySerializer(recent_tests, many=True)
-    
+    """Get user statistics from the profile's running totals, cached per user"""
+    profile = get_profile(request.user)
+
+    def build():
+        recent_tests, _ = history_page(request.user, limit=RECENT_TESTS)
+        return stats_data(profile, recent_tests)
+
+    return Response(cached_stats(profile, build))
+
+
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: openapi.Response(
+            'Answers per question category for the current user',
+            schema=openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'category_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'category_name': openapi.Schema(type=openapi.TYPE_STRING),
+                        'attempts': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'correct': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'accuracy': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'last_seen': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
+                    }
+                )
+            )
+        )
+    },
+    operation_description="Get the user's attempts and accuracy per question category"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_category_stats(request):
+    """Per-category mastery, read from the counters kept by grading"""
+    stats = UserCategoryStats.objects.filter(user=request.user).select_related('category').order_by('category__name')
+    return Response([
+        {
+            'category_id': row.category_id,
+            'category_name': row.category.name,
+            'attempts': row.attempts,
+            'correct': row.correct,
+            'accuracy': row.accuracy,
+            'last_seen': row.last_seen,
+        }
+        for row in stats
+    ])
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('period', openapi.IN_QUERY, description="week (current week, default) or all", type=openapi.TYPE_STRING),
+        openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Results per page (max 100)", type=openapi.TYPE_INTEGER),
+    ],
+    responses={
+        200: openapi.Response(
+            'Best score per user, fastest first among equal scores, with the caller\'s own rank',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'period': openapi.Schema(type=openapi.TYPE_STRING),
+                    'board': openapi.Schema(type=openapi.TYPE_STRING),
+                    'count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'page': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'me': openapi.Schema(type=openapi.TYPE_OBJECT, x_nullable=True),
+                }
+            )
+        ),
+        400: 'Invalid period, page or limit parameter'
+    },
+    operation_description="Weekly or all-time leaderboard"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leaderboard(request):
+    """Leaderboard page and the caller's rank, served from the in-memory board"""
+    period = request.GET.get('period', 'week')
+    if period not in ('week', 'all'):
+        return Response({'error': 'period must be week or all'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'Invalid page or limit parameter'}, status=status.HTTP_400_BAD_REQUEST)
+
+    name = week_board() if period == 'week' else ALL_TIME
+    board = leaderboards.get(name)
+    entries = board.page((page - 1) * limit, limit)
+    usernames = dict(User.objects.filter(id__in=[entry['user_id'] for _, entry in entries]).values_list('id', 'username'))
+    if len(usernames) < len(entries):
+        # Some users were deleted since the board was loaded
+        board.invalidate()
+
+    results = [
+        {'rank': rank, 'username': usernames[entry['user_id']], 'score': entry['score'],
+         'time_taken_seconds': entry['time_taken_seconds']}
+        for rank, entry in entries if entry['user_id'] in usernames
+    ]
+    me = board.rank(request.user.id)
     return Response({
-        'total_tests': total_tests,
-        'passed_tests': passed_tests,
-        'pass_rate': round(pass_rate, 1),
-        'average_score': round(avg_score, 1),
-        'best_score': best_score,
-        'recent_tests': recent_serializer.data
+        'period': period,
+        'board': name,
+        'count': len(board),
+        'page': page,
+        'results': results,
+        'me': {'rank': me[0], 'score': me[1]['score'], 'time_taken_seconds': me[1]['time_taken_seconds']} if me else None
     })
 
 
@@ -402,6 +595,52 @@ def user_profile(request):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('fields', openapi.IN_QUERY, description=f"Comma-separated sections to return (default all): {', '.join(DASHBOARD_SECTIONS)}", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: openapi.Response(
+            'The requested sections, shaped like user/profile, user/stats, the first test/history page and categories',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'profile': openapi.Schema(type=openapi.TYPE_OBJECT),
+                    'stats': openapi.Schema(type=openapi.TYPE_OBJECT),
+                    'history': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                            'next_cursor': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
+                        }
+                    ),
+                    'categories': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                }
+            )
+        ),
+        400: 'Unknown section in fields'
+    },
+    operation_description="Profile, stats, recent history and categories in one request, each section cached separately"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard(request):
+    """Everything the app needs on opening, in one round trip"""
+    fields = request.GET.get('fields')
+    sections = DASHBOARD_SECTIONS
+    if fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - set(DASHBOARD_SECTIONS)
+        if unknown:
+            return Response(
+                {'error': f"Unknown sections: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        sections = tuple(section for section in DASHBOARD_SECTIONS if section in requested)
+    return Response(build_dashboard(request.user, sections))
+
+
 # Question and Category Views
 @swagger_auto_schema(
     method='get',
@@ -417,6 +656,8 @@ def user_profile(request):
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@vary_on_headers('Accept')
+@condition(etag_func=catalog_image_etag)
 def list_questions(request):
     """List questions with filters"""
     queryset = Question.objects.filter(is_active=True).select_related('category', 'created_by')
@@ -447,6 +688,126 @@ def list_questions(request):
     return Response(serializer.data)
 
 
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="Text typed so far", type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum suggestions (default 10, max 50)", type=openapi.TYPE_INTEGER),
+    ],
+    responses={
+        200: openapi.Response(
+            'Autocomplete suggestions',
+            schema=openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'type': openapi.Schema(type=openapi.TYPE_STRING),
+                        'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'text': openapi.Schema(type=openapi.TYPE_STRING),
+                    }
+                )
+            )
+        ),
+        400: 'Invalid limit parameter'
+    },
+    operation_description="Type-ahead suggestions over question text and category names"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def autocomplete_questions(request):
+    """Prefix search served from the in-memory autocomplete index"""
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        return Response({'error': 'Invalid limit parameter'}, status=status.HTTP_400_BAD_REQUEST)
+
+    query = request.GET.get('q', '')
+    return Response(autocomplete_index.search(query, limit))
+
+
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: openapi.Response(
+            'Current question bank snapshot',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'version': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'url': openapi.Schema(type=openapi.TYPE_STRING, format='uri'),
+                    'size': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'format': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            )
+        )
+    },
+    operation_description="Get the location of the gzipped JSON Lines snapshot of the question bank for offline use"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@condition(etag_func=catalog_etag)
+def question_snapshot(request):
+    """Point the client at the precompressed snapshot for the current catalog version"""
+    version = get_version()
+    path = build_snapshot(version)
+    return Response({
+        'version': version,
+        'url': request.build_absolute_uri(snapshot_url(version)),
+        'size': os.path.getsize(path),
+        'format': 'jsonl+gzip',
+    })
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('since', openapi.IN_QUERY, description="Catalog version the client already has", type=openapi.TYPE_INTEGER, required=True),
+    ],
+    responses={
+        200: openapi.Response(
+            'Rows changed since the given version',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'version': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'categories': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'questions': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'removed_questions': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    'removed_categories': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                }
+            )
+        ),
+        400: 'Invalid since parameter',
+        410: 'Version too old, reload the snapshot'
+    },
+    operation_description="Delta sync: questions and categories inserted, updated, deactivated or deleted since a catalog version"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@condition(etag_func=catalog_etag)
+def question_changes(request):
+    """Return catalog rows changed since the client's version"""
+    try:
+        since = int(request.GET['since'])
+        version_to_datetime(since)
+    except (KeyError, ValueError):
+        return Response({'error': 'Invalid since parameter'}, status=status.HTTP_400_BAD_REQUEST)
+
+    version = get_version()
+    if since >= version:
+        changes = {'categories': [], 'questions': [], 'removed_questions': [], 'removed_categories': []}
+    else:
+        changes = changes_since(since)
+        if changes is None:
+            return Response(
+                {'error': 'Version too old, reload the snapshot'},
+                status=status.HTTP_410_GONE
+            )
+
+    return Response({'version': version, **changes})
+
+
 @swagger_auto_schema(
     method='get',
     responses={
@@ -457,6 +818,8 @@ def list_questions(request):
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@vary_on_headers('Accept')
+@condition(etag_func=catalog_image_etag)
 def question_detail(request, pk):
     """Get question detail"""
     try:
@@ -482,11 +845,10 @@ def question_detail(request, pk):
 )
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@condition(etag_func=catalog_etag)
 def list_categories(request):
     """List all question categories"""
-    categories = QuestionCategory.objects.all().order_by('name')
-    serializer = QuestionCategorySerializer(categories, many=True)
-    return Response(serializer.data)
+    return Response(category_list())
 
 @swagger_auto_schema(
     method='get',
@@ -500,6 +862,11 @@ def list_categories(request):
                     'total_attempts': openapi.Schema(type=openapi.TYPE_INTEGER),
                     'correct_attempts': openapi.Schema(type=openapi.TYPE_INTEGER),
                     'success_rate': openapi.Schema(type=openapi.TYPE_NUMBER),
+                    'difficulty_index': openapi.Schema(type=openapi.TYPE_NUMBER, x_nullable=True),
+                    'discrimination_index': openapi.Schema(type=openapi.TYPE_NUMBER, x_nullable=True),
+                    'point_biserial': openapi.Schema(type=openapi.TYPE_NUMBER, x_nullable=True),
+                    'analysis_sample_size': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'analyzed_at': openapi.Schema(type=openapi.TYPE_STRING, format='date-time', x_nullable=True),
                     'recent_users': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT))
                 }
             )
@@ -538,6 +905,11 @@ def question_analytics(request, pk):
             'total_attempts': analytics.total_attempts,
             'correct_attempts': analytics.correct_attempts,
             'success_rate': analytics.success_rate,
+            'difficulty_index': analytics.difficulty_index,
+            'discrimination_index': analytics.discrimination_index,
+            'point_biserial': analytics.point_biserial,
+            'analysis_sample_size': analytics.analysis_sample_size,
+            'analyzed_at': analytics.analyzed_at,
             'recent_users': recent_users
         })
         
@@ -548,6 +920,70 @@ def question_analytics(request, pk):
         )
     
 
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: openapi.Response(
+            'How often each option of the question is picked',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'question_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'total_attempts': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'not_answered': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'options': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'option_text': openapi.Schema(type=openapi.TYPE_STRING),
+                                'is_correct': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                                'times_selected': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'selection_rate': openapi.Schema(type=openapi.TYPE_NUMBER),
+                            }
+                        )
+                    )
+                }
+            )
+        ),
+        404: 'Question not found'
+    },
+    operation_description="Admin only: option-level answer counts, to spot misleading distractors"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def question_distractors(request, pk):
+    """Selection counts per answer option, read from the maintained counters"""
+    question = Question.objects.filter(pk=pk).select_related('analytics').first()
+    if question is None:
+        return Response(
+            {'error': 'Question not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    analytics = getattr(question, 'analytics', None)
+    total_attempts = analytics.total_attempts if analytics else 0
+    options = []
+    for option in AnswerOption.objects.filter(question=question).select_related('analytics'):
+        option_analytics = getattr(option, 'analytics', None)
+        times_selected = option_analytics.times_selected if option_analytics else 0
+        options.append({
+            'id': option.id,
+            'option_text': option.option_text,
+            'is_correct': option.is_correct,
+            'times_selected': times_selected,
+            'selection_rate': round(times_selected / total_attempts * 100, 1) if total_attempts else 0,
+        })
+
+    return Response({
+        'question_id': question.id,
+        'total_attempts': total_attempts,
+        'not_answered': max(total_attempts - sum(option['times_selected'] for option in options), 0),
+        'options': options
+    })
+
+
 @swagger_auto_schema(
     method='get',
     manual_parameters=[
@@ -825,76 +1261,34 @@ def admin_analytics(request):
         if days < 1:
             days = 30
         
-        # Calculate date threshold
-        date_threshold = timezone.now() - timezone.timedelta(days=days)
-        
-        # Basic user statistics
-        total_users = User.objects.count()
-        active_users = User.objects.filter(
-            is_active=True,
-            last_login__gte=date_threshold
-        ).count()
-        
-        # Test statistics with null safety
-        completed_tests = TestSession.objects.filter(status='completed')
-        total_tests = completed_tests.count()
-        recent_tests = completed_tests.filter(time_started__gte=date_threshold).count()
+        # Counters come from the daily rollup: at most days + 1 rows whatever the history
+        period, all_time = period_stats(days)
+        total_users = all_time['new_users']
+        active_users = period['last_login_users']
+        total_tests = all_time['tests_completed']
+        recent_tests = period['tests_completed']
         
-        # Score statistics with proper null handling
         if total_tests > 0:
-            # Use database aggregation for better performance
-            score_stats = completed_tests.aggregate(
-                avg_score=Avg('score'),
-                passed_count=Count('id', filter=Q(passed=True))
-            )
-            
-            avg_score = score_stats['avg_score'] or 0
-            passed_tests = score_stats['passed_count'] or 0
-            pass_rate = (passed_tests / total_tests * 100) if total_tests > 0 else 0
+            avg_score = all_time['score_sum'] / total_tests
+            pass_rate = all_time['tests_passed'] / total_tests * 100
         else:
             avg_score = 0
-            passed_tests = 0
             pass_rate = 0
         
-        # Most difficult questions with proper null handling and division by zero protection
-        try:
-            difficult_questions = QuestionAnalytics.objects.filter(
-                total_attempts__gt=0  # Only questions that have been attempted
-            ).annotate(
-                calculated_success_rate=Case(
-                    When(total_attempts=0, then=0.0),
-                    default=100.0 * F('correct_attempts') / F('total_attempts'),
-                    output_field=FloatField()
-                )
-            ).select_related('question').order_by('calculated_success_rate')[:5]
-            
-            difficult_list = []
-            for qa in difficult_questions:
-                try:
-                    difficult_list.append({
-                        'question_id': qa.question.id,
-                        'question_text': (qa.question.question_text[:50] + '...') if qa.question.question_text else 'No text available',
-                        'success_rate': round(qa.calculated_success_rate, 1),
-                        'total_attempts': qa.total_attempts,
-                        'correct_attempts': qa.correct_attempts
-                    })
-                except AttributeError:
-                    # Skip questions with missing data
-                    continue
-                    
-        except Exception as e:
-            # If there's an error getting difficult questions, return empty list
-            print(f"Error getting difficult questions: {str(e)}")
-            difficult_list = []
+        # Rankings are read in order from the maintained success rate index, not sorted here
+        difficult_list = top_questions(5, hardest=True)
         
         # Recent activity statistics
+        question_counts = Question.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True))
+        )
         recent_activity = {
-            'new_users_this_period': User.objects.filter(
-                date_joined__gte=date_threshold
-            ).count(),
+            'new_users_this_period': period['new_users'],
             'tests_this_period': recent_tests,
-            'active_questions': Question.objects.filter(is_active=True).count(),
-            'total_questions': Question.objects.count()
+            'tests_started_this_period': period['tests_started'],
+            'active_questions': question_counts['active'],
+            'total_questions': question_counts['total']
         }
         
         # Build response data
@@ -931,4 +1325,141 @@ def admin_analytics(request):
                 'pass_rate': 0,
                 'most_difficult_questions': []
             }
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@swagger_auto_schema(
+    method='post',
+    manual_parameters=[
+        openapi.Parameter('dry_run', openapi.IN_QUERY, description="Validate only, create nothing", type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter('file', openapi.IN_FORM, description="CSV with username,email,password,first_name,last_name columns", type=openapi.TYPE_FILE, required=False),
+    ],
+    responses={
+        200: openapi.Response(
+            'Enrolment report',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'created': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'users': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'errors': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                }
+            )
+        ),
+        400: 'Invalid upload',
+        409: 'Conflicting accounts were created meanwhile'
+    },
+    operation_description="Admin: Enrol a cohort of candidates from a CSV file or a JSON list under 'candidates'"
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def admin_enrol_candidates(request):
+    """Admin view to create many candidate accounts in one request"""
+    upload = request.FILES.get('file')
+    if upload is not None:
+        try:
+            rows = parse_csv(upload.read().decode('utf-8'))
+        except (UnicodeDecodeError, csv.Error):
+            return Response({'error': 'File must be UTF-8 CSV'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        rows = request.data if isinstance(request.data, list) else request.data.get('candidates')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return Response({'error': 'Send a CSV file or a list of candidates'}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = request.GET.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        return Response(enrol(rows, dry_run=dry_run))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError:
+        return Response(
+            {'error': 'Some usernames or emails were registered meanwhile; nothing was created, please retry'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('bucket', openapi.IN_QUERY, description="hour, day (default) or week", type=openapi.TYPE_STRING),
+        openapi.Parameter('days', openapi.IN_QUERY, description="Range in days (default: 30; at most 14 for hourly buckets, 366 otherwise)", type=openapi.TYPE_INTEGER),
+    ],
+    responses={
+        200: openapi.Response(
+            'Completed tests per bucket and score histogram',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'bucket': openapi.Schema(type=openapi.TYPE_STRING),
+                    'start': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
+                    'end': openapi.Schema(type=openapi.TYPE_STRING, format='date-time'),
+                    'series': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'score_histogram': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                }
+            )
+        ),
+        400: 'Invalid bucket or days parameter'
+    },
+    operation_description="Admin: Tests, pass rate and average score over time, with the score distribution (0-20)"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def admin_analytics_timeseries(request):
+    """Admin time series served from the hourly score rollup"""
+    bucket = request.GET.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return Response({'error': 'bucket must be one of hour, day, week'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        return Response({'error': 'Invalid days parameter'}, status=status.HTTP_400_BAD_REQUEST)
+    max_days = 14 if bucket == 'hour' else 366
+    if not 1 <= days <= max_days:
+        return Response({'error': f'days must be between 1 and {max_days}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(time_series(days, bucket))
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('order', openapi.IN_QUERY, description="hardest (default) or easiest", type=openapi.TYPE_STRING),
+        openapi.Parameter('category', openapi.IN_QUERY, description="Only rank questions of this category ID", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Number of questions (default 10, max 100)", type=openapi.TYPE_INTEGER),
+    ],
+    responses={
+        200: openapi.Response(
+            'Questions ranked by success rate',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'order': openapi.Schema(type=openapi.TYPE_STRING),
+                    'category': openapi.Schema(type=openapi.TYPE_INTEGER, x_nullable=True),
+                    'min_attempts': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                }
+            )
+        ),
+        400: 'Invalid order, category or limit parameter'
+    },
+    operation_description="Admin: Hardest or easiest questions, overall or within a category"
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def admin_question_rankings(request):
+    """Top questions by success rate, read from the ranking index"""
+    order = request.GET.get('order', 'hardest')
+    if order not in ('hardest', 'easiest'):
+        return Response({'error': 'order must be hardest or easiest'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 100)
+        category = request.GET.get('category')
+        category = int(category) if category else None
+    except ValueError:
+        return Response({'error': 'Invalid category or limit parameter'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'order': order,
+        'category': category,
+        'min_attempts': min_attempts(),
+        'results': top_questions(limit, hardest=order == 'hardest', category_id=category)
+    })
@@ -10,6 +10,7 @@ class DrivingTestUser(HttpUser):
         self.token = None
         self.test_session_id = None
         self.current_questions = []
+        self.etags = {}
 
     def on_start(self):
         """Login user and get authentication token"""
@@ -30,6 +31,44 @@ class DrivingTestUser(HttpUser):
             else:
                 response.failure(f"Login failed: {response.status_code} - {response.text}")
 
+    def conditional_get(self, url, name=None):
+        """GET with If-None-Match from the last response, so unchanged catalog reads come back as 304"""
+        headers = {}
+        if url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+
+        with self.client.get(url, headers=headers, name=name, catch_response=True) as response:
+            if response.status_code == 200:
+                if response.headers.get("ETag"):
+                    self.etags[url] = response.headers["ETag"]
+                response.success()
+            elif response.status_code == 304:
+                response.success()
+            elif response.status_code == 404:
+                # Question not found is acceptable
+                response.success()
+            else:
+                response.failure(f"{name or url} failed: {response.status_code}")
+
+    @task(3)
+    def view_questions_conditional(self):
+        """Test viewing questions list with a cached ETag"""
+        self.conditional_get("/driving_test/questions/", name="/driving_test/questions/ [conditional]")
+
+    @task(2)
+    def view_categories_conditional(self):
+        """Test viewing question categories with a cached ETag"""
+        self.conditional_get("/driving_test/categories/", name="/driving_test/categories/ [conditional]")
+
+    @task(1)
+    def view_specific_question_conditional(self):
+        """Test viewing a specific question detail with a cached ETag"""
+        question_id = random.randint(1, 20)
+        self.conditional_get(
+            f"/driving_test/questions/{question_id}/",
+            name="/driving_test/questions/[id]/ [conditional]"
+        )
+
     @task(3)
     def view_questions(self):
         """Test viewing questions list"""
@@ -192,4 +231,4 @@ class QuickTestUser(HttpUser):
     @task(1)
     def start_and_abandon_test(self):
         """Start a test but don't submit it (simulates user abandoning test)"""
-        self.client.get("/driving_test/test/start/")
\ No newline at end of file
+        self.client.get("/driving_test/test/start/")
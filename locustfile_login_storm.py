@@ -0,0 +1,41 @@
+"""
+Login storm scenario, kept out of locustfile.py so a plain `locust` run
+keeps its usual load profile. It checks that exam latency holds up while
+the login endpoint is hammered:
+
+    locust -f locustfile_login_storm.py
+
+429 (token bucket) and 503 (hashing capacity used up) are the intended
+load shedding, so they are counted as successes.
+"""
+import random
+from locust import HttpUser, task, between
+# Imported as a module so its user classes are not picked up by this run
+import locustfile
+
+
+class LoginStormUser(HttpUser):
+    """Hammers the login endpoint with no think time"""
+    wait_time = between(0, 0.1)
+    weight = 3
+
+    @task
+    def login(self):
+        login_data = {
+            "email": f"storm{random.randint(1, 1000)}@example.com",
+            "password": "test12345"
+        }
+        with self.client.post("/driving_test/auth/login/", json=login_data, catch_response=True) as response:
+            if response.status_code in (200, 400, 429, 503):
+                response.success()
+            else:
+                response.failure(f"Login failed: {response.status_code}")
+
+
+class ExamTakerUser(locustfile.DrivingTestUser):
+    """Exam traffic only; its latency should not move while LoginStormUser runs"""
+    weight = 1
+    tasks = {
+        locustfile.DrivingTestUser.start_test: 4,
+        locustfile.DrivingTestUser.view_specific_question_conditional: 1,
+    }
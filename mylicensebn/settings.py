@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -19,6 +20,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Hand media transfers to the front server after Django's access check:
+# 'x-accel-redirect' (nginx, internal location at MEDIA_ACCEL_PREFIX aliased
+# to MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd). None streams from Django.
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -45,7 +52,6 @@ INSTALLED_APPS = [
     'drf_yasg',
     'driving_test',
     'corsheaders',
-    'admin_thumbnails',  # Added for image thumbnails in admin
 ]
 
 MIDDLEWARE = [
@@ -57,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'driving_test.hashers.HashingBusyMiddleware',
 ]
 
 # CORS settings for frontend integration
@@ -98,6 +105,67 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared counters and token revocations live here. Point this at a shared
+# backend (Redis/Memcached) when running more than one worker process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mylicensebn',
+    }
+}
+
+
+# Each worker rereads the question bank version (catalog ETags, memoized
+# listings) at most this many seconds after another worker bumps it
+CATALOG_VERSION_TTL = 2
+
+# Token -> user lookups cached per worker (see driving_test/authentication.py);
+# revocations reach the other workers through the default cache
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 300
+
+# Signed access tokens (Authorization: Bearer ...) issued with a refresh token
+# next to the legacy token on login/register when the client sends
+# token_pair=true (see driving_test/tokens.py); False turns them off entirely.
+# Expired and revoked refresh tokens are deleted by purge_sessions.
+SIGNED_ACCESS_TOKENS = True
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=5)
+REFRESH_TOKEN_LIFETIME = timedelta(days=30)
+
+
+# API logins do not create sessions unless asked to; last_login is written at most this often
+LAST_LOGIN_UPDATE_INTERVAL = timedelta(hours=1)
+
+# Questions enter the hardest/easiest rankings after this many attempts
+# (run rebuild_answer_analytics after changing it)
+RANKING_MIN_ATTEMPTS = 20
+
+# user_stats responses are cached under keys built from the user's profile totals, for at most this long
+USER_STATS_CACHE_TTL = 300
+
+# Email logins go through one indexed lookup; usernames use the default backend
+AUTHENTICATION_BACKENDS = [
+    'driving_test.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
+# Password hashing runs on its own bounded pool (driving_test/hashers.py):
+# at most LOGIN_HASH_WORKERS hashes at once per process, LOGIN_HASH_QUEUE more
+# may wait up to LOGIN_HASH_WAIT seconds, the rest get a 503
+PASSWORD_HASHERS = [
+    'driving_test.hashers.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+LOGIN_HASH_WORKERS = 2
+LOGIN_HASH_QUEUE = 8
+LOGIN_HASH_WAIT = 2
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,7 +188,8 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'driving_test.authentication.CachedTokenAuthentication',
+        'driving_test.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -129,6 +198,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
+    # Token buckets on the sign-in endpoints (driving_test/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '60/min',
+        'login_account': '10/min',
+        'register_ip': '20/hour',
+    },
 }
 
 # Swagger settings